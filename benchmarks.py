@@ -0,0 +1,507 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+r"""
+Microbenchmarks of the Submissions steps that run once per student.
+
+End-to-end timings mostly measure the network. These time single steps on
+a synthetic class (roster, records, submission files) of increasing size,
+in a temporary directory, so a change that makes one step slower shows up
+even when the network hides it.
+
+Every benchmark reports the best time of a few rounds. Baselines are kept
+in benchmark_baseline.json by benchmark and roster size; a run fails (exit
+code 1) when a benchmark got more than --threshold slower than its baseline.
+Baselines only compare on the same machine, so save them before a change
+and check after it:
+
+    $ ./benchmarks.py --save           # on the unchanged code
+    $ ./benchmarks.py                  # after the change
+    $ ./benchmarks.py -k json -n 100,10000
+"""
+
+
+__all__ = ["BENCHMARKS", "Workspace", "find_regressions", "load_baseline",
+           "run_benchmarks", "save_baseline", ]
+__author__ = "Travis Janssen, David Tran"
+__credits__ = ["Travis Janssen", "David Tran"]
+__status__ = "Production"
+__version__ = "1.0.0"
+
+
+import argparse
+from collections import OrderedDict
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from process_submissions import Submissions
+
+
+DEFAULT_SIZES = (100, 1000, 5000)
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_REPEAT = 5
+DEFAULT_BASELINE_FILENAME = 'benchmark_baseline.json'
+
+# A round repeats the benchmark until it took at least this long
+MIN_ROUND_SECONDS = 0.05
+
+ASSIGNMENT = 'A3'
+SUBMISSION_FOLDER = os.path.join('submissions', ASSIGNMENT)
+
+# name -> function(workspace) returning the function to time
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(name):
+    r"""
+    Registers a benchmark in BENCHMARKS.
+    """
+
+
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+
+    return register
+
+
+class _Quiet(object):
+    r"""
+    Sends stdout and stderr (where the report logger writes) to devnull.
+    """
+
+
+    def __enter__(self):
+
+        self._streams = sys.stdout, sys.stderr
+        self._devnull = open(os.devnull, 'w')
+        sys.stdout = sys.stderr = self._devnull
+
+
+    def __exit__(self, *_):
+
+        sys.stdout, sys.stderr = self._streams
+        self._devnull.close()
+
+
+class Workspace(object):
+    r"""
+    A synthetic class of size students in a temporary directory, which is the
+    current directory while the workspace is open.
+
+    Every student has a roster line, a record with a few assignments, a
+    submission file in submissions/A3 and a team in team records of 4.
+    """
+
+
+    def __init__(self, size):
+
+        self.size = size
+        self.students = [("Student%05d, First" % index, str(100000 + index),
+                          "gtuser%05d" % index) for index in range(size)]
+
+
+    def __enter__(self):
+
+        self._old_dir = os.getcwd()
+        self.directory = tempfile.mkdtemp(prefix='ta_tools_bench_')
+        os.chdir(self.directory)
+
+        with open('students_full.txt', 'w') as roster_file:
+            for student in self.students:
+                roster_file.write("%s\t%s\t%s\n" % student)
+
+        self.submissions = self.new_submissions()
+        with _Quiet():
+            self.submissions.create_student_json('students_full.txt')
+
+        records = self.submissions._load_json_file(
+          self.submissions.STUDENT_RECORDS_FILENAME)
+        for _, platform_id, _ in self.students:
+            for code in ['A1', 'A2', ASSIGNMENT]:
+                records[platform_id][code] = {
+                  'commitID': '%040x' % int(platform_id),
+                  'Timestamp Submission': 'Ok', 'Repo Sync': 'Ok',
+                  'commitID valid': True,
+                  'Timestamp GitHub': '2018-09-08 10:00:00',
+                  'Submission GitHub': 'Ok', 'Submission Time': 'Ok'}
+        self.submissions._save_json_file(
+          self.submissions.STUDENT_RECORDS_FILENAME, records)
+
+        with open(self.submissions.TEAM_RECORDS_FILENAME, 'w') as team_file:
+            json.dump(dict((gt_id, "Team%03d" % (index // 4))
+                           for index, (_, _, gt_id) in enumerate(self.students)),
+                      team_file)
+
+        os.makedirs(SUBMISSION_FOLDER)
+        for name, platform_id, _ in self.students:
+            filename = self.submissions._get_submission_file_name(name, platform_id)
+            with open(os.path.join(SUBMISSION_FOLDER, filename), 'w') as submission_file:
+                submission_file.write(
+                  '<html><body><p>My commit is %040x, thanks</p></body></html>'
+                  % int(platform_id))
+
+        return self
+
+
+    def __exit__(self, *_):
+
+        os.chdir(self._old_dir)
+        shutil.rmtree(self.directory)
+
+
+    def new_submissions(self, is_team=False):
+        r"""
+        Returns:
+        A Submissions object, without cached files.
+        """
+
+
+        return Submissions(is_team=is_team, should_pull_repo_flag=False)
+
+
+@benchmark('check_submission_file')
+def _bench_check_submission_file(workspace):
+
+    submissions = workspace.submissions
+    files = [(submissions._get_submission_file_name(name, platform_id), name,
+              platform_id) for name, platform_id, _ in workspace.students]
+
+    def run():
+        for submission_file, name, platform_id in files:
+            submissions._check_submission_file(
+              current_assignment={}, base_directory=SUBMISSION_FOLDER,
+              submission_file=submission_file, student_name=name,
+              platform_id=platform_id)
+
+    return run
+
+
+@benchmark('get_student_folders')
+def _bench_get_student_folders(workspace):
+
+    whitelist = [gt_id for _, _, gt_id in workspace.students]
+
+    def run():
+        workspace.submissions._get_student_folders(
+          submission_folder_name=SUBMISSION_FOLDER,
+          student_whitelist=whitelist, assignment_code=ASSIGNMENT)
+
+    return run
+
+
+@benchmark('get_correct_reference_id')
+def _bench_get_correct_reference_id(workspace):
+
+    submissions = workspace.new_submissions(is_team=True)
+    gt_ids = [gt_id for _, _, gt_id in workspace.students]
+
+    def run():
+        for gt_id in gt_ids:
+            submissions._get_correct_reference_id(graded_id=gt_id)
+
+    return run
+
+
+@benchmark('fix_timestamp_t_square')
+def _bench_fix_timestamp_t_square(workspace):
+
+    # Half raw T-Square times, half already converted
+    times = ['201710%02d031150569' % (index % 28 + 1)
+             for index in range(workspace.size)]
+    times[::2] = ['2017-10-06T03:11:50'] * len(times[::2])
+
+    def run():
+        for time_str in times:
+            workspace.submissions._fix_timestamp_t_square(time_str)
+
+    return run
+
+
+@benchmark('read_strict_ISO_format')
+def _bench_read_strict_iso_format(workspace):
+
+    times = ['2017-10-%02d 03:11:50-04:00' % (index % 28 + 1)
+             for index in range(workspace.size)]
+
+    def run():
+        for time_str in times:
+            workspace.submissions._read_strict_ISO_format(time_str)
+
+    return run
+
+
+@benchmark('create_student_json')
+def _bench_create_student_json(workspace):
+
+    # A mid-semester re-run: the roster merges into the existing records
+    def run():
+        with _Quiet():
+            workspace.new_submissions().create_student_json('students_full.txt')
+
+    return run
+
+
+@benchmark('records_json_load')
+def _bench_records_json_load(workspace):
+
+    def run():
+        workspace.submissions._load_json_file(
+          workspace.submissions.STUDENT_RECORDS_FILENAME)
+
+    return run
+
+
+@benchmark('records_json_dump')
+def _bench_records_json_dump(workspace):
+
+    records = workspace.submissions._load_json_file(
+      workspace.submissions.STUDENT_RECORDS_FILENAME)
+
+    def run():
+        workspace.submissions._save_json_file('records_copy.json', records)
+
+    return run
+
+
+@benchmark('generate_report')
+def _bench_generate_report(workspace):
+
+    whitelist = [gt_id for _, _, gt_id in workspace.students]
+
+    def run():
+        with _Quiet():
+            workspace.new_submissions().generate_report(
+              assignment=ASSIGNMENT, student_list=whitelist,
+              report_filename='report.txt')
+
+    return run
+
+
+def _time(func, repeat):
+    r"""
+    Returns:
+    The best time of one call of func, in seconds, over repeat rounds.
+    """
+
+
+    # Calls per round, so a round is long enough to measure
+    number = 1
+    while True:
+        start = time.time()
+        for _ in range(number):
+            func()
+        elapsed = time.time() - start
+
+        if elapsed >= MIN_ROUND_SECONDS or number >= 1000:
+            break
+        number *= 10
+
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.time()
+        for _ in range(number):
+            func()
+        best = min(best, (time.time() - start) / number)
+
+    return best
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, names=None, repeat=DEFAULT_REPEAT,
+                   callback=None):
+    r"""
+    Runs the benchmarks.
+
+    Arguments:
+      sizes:   (list of int) The roster sizes to run every benchmark on.
+
+      names:   (list of str) The benchmarks to run, all of them if None.
+
+      repeat:   (int) How many rounds to time; the best one counts.
+
+      callback:   (function) Called with (name, size, seconds) after every
+        benchmark, e.g. to print it.
+
+    Returns:
+    An OrderedDict 'name@size' -> seconds per call.
+    """
+
+
+    results = OrderedDict()
+
+    for size in sizes:
+        with Workspace(size) as workspace:
+            for name, make_benchmark in BENCHMARKS.items():
+
+                if names is not None and name not in names:
+                    continue
+
+                seconds = _time(make_benchmark(workspace), repeat)
+                results['%s@%d' % (name, size)] = seconds
+
+                if callback is not None:
+                    callback(name, size, seconds)
+
+    return results
+
+
+def load_baseline(filename=DEFAULT_BASELINE_FILENAME):
+    r"""
+    Returns:
+    The saved baseline, 'name@size' -> seconds, empty if there is none.
+    """
+
+
+    try:
+        with open(filename, 'r') as baseline_file:
+            return json.load(baseline_file)
+    except (IOError, ValueError):
+        return {}
+
+
+def save_baseline(results, filename=DEFAULT_BASELINE_FILENAME):
+    r"""
+    Merges results into the saved baseline, keeping the benchmarks that did
+    not run.
+    """
+
+
+    baseline = load_baseline(filename)
+    baseline.update(results)
+
+    with open(filename, 'w') as baseline_file:
+        json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+
+
+def find_regressions(results, baseline, threshold=DEFAULT_THRESHOLD):
+    r"""
+    Arguments:
+      results:   (dict) 'name@size' -> seconds of this run.
+
+      baseline:   (dict) 'name@size' -> seconds of the baseline.
+
+      threshold:   (float) How much slower counts as a regression, 0.25 for
+        25% slower.
+
+    Returns:
+    A list of (key, seconds, baseline seconds) of the regressed benchmarks.
+    Benchmarks without a baseline are skipped.
+    """
+
+
+    regressions = []
+
+    for key, seconds in results.items():
+
+        baseline_seconds = baseline.get(key, None)
+
+        if baseline_seconds and seconds > baseline_seconds * (1 + threshold):
+            regressions.append((key, seconds, baseline_seconds))
+
+    return regressions
+
+
+def _format_seconds(seconds):
+
+    if seconds is None:
+        return '-'
+
+    for unit, scale in [('s', 1.0), ('ms', 1e-3)]:
+        if seconds >= scale:
+            return '%.2f%s' % (seconds / scale, unit)
+
+    return '%.1fus' % (seconds / 1e-6)
+
+
+def parse_main():
+    r"""
+    Reads the user input, runs the benchmarks and compares them with the
+    baseline.
+
+    Returns:
+    The exit code: 1 if a benchmark regressed, 0 otherwise.
+    """
+
+
+    parser = argparse.ArgumentParser(
+      description="Times the per-student steps of Submissions on synthetic "
+                  "rosters")
+
+    parser.add_argument(
+      '-n', '--sizes', default=",".join(map(str, DEFAULT_SIZES)),
+      dest='sizes',
+      help="comma separated roster sizes (default %(default)s)")
+
+    parser.add_argument(
+      '-k', '--filter', default=None, dest='filter',
+      help="only run the benchmarks whose name contains FILTER")
+
+    parser.add_argument(
+      '-r', '--repeat', type=int, default=DEFAULT_REPEAT, dest='repeat',
+      help="rounds per benchmark, the best counts (default %(default)s)")
+
+    parser.add_argument(
+      '-x', '--threshold', type=float, default=DEFAULT_THRESHOLD,
+      dest='threshold',
+      help="fail when a benchmark is this much slower than its baseline "
+           "(default %(default)s, i.e. 25%%)")
+
+    parser.add_argument(
+      '-b', '--baseline', default=DEFAULT_BASELINE_FILENAME, dest='baseline',
+      help="the baseline file (default %(default)s)")
+
+    parser.add_argument(
+      '-s', '--save', action='store_true', dest='save',
+      help="save the results as the new baseline instead of comparing")
+
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline)
+    names = None
+    if args.filter:
+        names = [name for name in BENCHMARKS if args.filter in name]
+
+    print("%-26s %6s %10s %10s %8s" % ('benchmark', 'size', 'time',
+                                       'baseline', 'change'))
+
+    def show(name, size, seconds):
+        baseline_seconds = baseline.get('%s@%d' % (name, size), None)
+        change = ('%+.0f%%' % ((seconds / baseline_seconds - 1) * 100)
+                  if baseline_seconds else '')
+        print("%-26s %6d %10s %10s %8s" % (
+          name, size, _format_seconds(seconds),
+          _format_seconds(baseline_seconds), change))
+        sys.stdout.flush()
+
+    results = run_benchmarks(
+      sizes=[int(size) for size in args.sizes.split(',')], names=names,
+      repeat=args.repeat, callback=show)
+
+    if args.save:
+        save_baseline(results, args.baseline)
+        print("\nSaved %d results to %s" % (len(results), args.baseline))
+        return 0
+
+    if not baseline:
+        print("\nNo baseline in %s yet; run with --save first" % args.baseline)
+        return 0
+
+    regressions = find_regressions(results, baseline, args.threshold)
+
+    if regressions:
+        print("\nREGRESSIONS, more than %.0f%% slower (%d):" % (
+          args.threshold * 100, len(regressions)))
+        for key, seconds, baseline_seconds in regressions:
+            print("\t%s: %s, was %s" % (key, _format_seconds(seconds),
+                                       _format_seconds(baseline_seconds)))
+        return 1
+
+    print("\nNo regressions beyond %.0f%%" % (args.threshold * 100))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(parse_main())
@@ -0,0 +1,449 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+r"""
+Builds and tests the graded commit of every student.
+
+When process_repos is given a build command, every valid commit goes through
+one more stage: the command runs in a temporary worktree of the commit (so
+the grading worktree is never touched and builds of the same repo cannot
+collide), in a process pool, each build
+
+  * in its own process group, killed after timeout_seconds,
+  * with at most cpu_seconds of CPU time (RLIMIT_CPU, where available),
+  * with stdin closed and the output written to a file, so a noisy build
+    cannot fill the memory.
+
+The result (status, test counts read from the output, duration and the last
+lines of the log) goes to the student's assignment record as 'Build', where
+generate_report shows it. Results are cached by commit SHA and command in
+build_cache.json, so an unchanged submission is never built twice (builds
+that timed out are tried again, in case the machine was busy).
+
+Builds run student code: run them as a user that can not reach anything
+worth protecting.
+"""
+
+
+__all__ = ["BuildCache", "BuildRunner", "format_build_result",
+           "parse_test_counts", "run_build", ]
+__author__ = "Travis Janssen, David Tran"
+__credits__ = ["Travis Janssen", "David Tran"]
+__status__ = "Production"
+__version__ = "1.0.0"
+
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from repo_tools import get_commit, run_git
+
+
+DEFAULT_CACHE_FILENAME = 'build_cache.json'
+DEFAULT_TIMEOUT_SECONDS = 10 * 60
+DEFAULT_LOG_LINES = 20
+
+STATUS_PASSED = "Passed"
+STATUS_FAILED = "Failed"
+STATUS_TIMEOUT = "Timeout"
+STATUS_ERROR = "Error"
+
+# JUnit (Maven, Ant, JUnitCore): 'Tests run: 12, Failures: 1, Errors: 0,
+# Skipped: 0'; Maven prints one line per class and the totals last
+JUNIT_PATTERN = re.compile(r'Tests run:\s*(\d+),\s*Failures:\s*(\d+)'
+                           r'(?:,\s*Errors:\s*(\d+))?(?:,\s*Skipped:\s*(\d+))?')
+JUNIT_OK_PATTERN = re.compile(r'^OK \((\d+) tests?\)')
+GRADLE_PATTERN = re.compile(r'(\d+) tests? completed, (\d+) failed')
+# pytest: '==== 2 failed, 10 passed in 0.52s ===='
+PYTEST_PATTERN = re.compile(r'^=+ (.*\d+ (?:passed|failed).*) in [\d.]+s')
+UNITTEST_RAN_PATTERN = re.compile(r'^Ran (\d+) tests? in')
+UNITTEST_FAILED_PATTERN = re.compile(r'^FAILED \((.*)\)')
+
+
+def parse_test_counts(lines):
+    r"""
+    Reads the test counts from the output of a build, as printed by JUnit
+    (Maven, Gradle, Ant), pytest and unittest.
+
+    Arguments:
+      lines:   (iterable of str) The lines of the output.
+
+    Returns:
+    A tuple (passed, failed), (None, None) if the output has no counts. When
+    the output has several summaries, the last one wins.
+    """
+
+
+    passed, failed = None, None
+    unittest_ran = None
+
+    for line in lines:
+
+        line = line.strip()
+
+        match = JUNIT_PATTERN.search(line)
+        if match:
+            run, failures, errors, skipped = [int(value or 0)
+                                              for value in match.groups()]
+            passed, failed = run - failures - errors - skipped, failures + errors
+            continue
+
+        match = JUNIT_OK_PATTERN.search(line)
+        if match:
+            passed, failed = int(match.group(1)), 0
+            continue
+
+        match = GRADLE_PATTERN.search(line)
+        if match:
+            passed = int(match.group(1)) - int(match.group(2))
+            failed = int(match.group(2))
+            continue
+
+        match = PYTEST_PATTERN.search(line)
+        if match:
+            counts = dict((name, int(count)) for count, name in re.findall(
+              r'(\d+) (passed|failed|error)', match.group(1)))
+            passed = counts.get('passed', 0)
+            failed = counts.get('failed', 0) + counts.get('error', 0)
+            continue
+
+        match = UNITTEST_RAN_PATTERN.search(line)
+        if match:
+            unittest_ran = int(match.group(1))
+            passed, failed = unittest_ran, 0
+            continue
+
+        match = UNITTEST_FAILED_PATTERN.search(line)
+        if match and unittest_ran is not None:
+            failed = sum(int(count) for count in re.findall(
+              r'(?:failures|errors)=(\d+)', match.group(1)))
+            passed = unittest_ran - failed
+
+    return passed, failed
+
+
+def format_build_result(result):
+    r"""
+    Returns:
+    A one line summary of a build result for the report, e.g.
+    'Failed: 10 passed, 2 failed in 31.2s (exit code 1)'.
+    """
+
+
+    str_buffer = [result['status']]
+
+    if result['passed'] is not None:
+        str_buffer.append(": %d passed, %d failed" % (result['passed'],
+                                                      result['failed']))
+
+    str_buffer.append(" in %.1fs" % result['seconds'])
+
+    if result['exit_code'] not in (0, None):
+        str_buffer.append(" (exit code %d)" % result['exit_code'])
+
+    return "".join(str_buffer)
+
+
+def _limit_child(cpu_seconds):
+    r"""
+    Returns:
+    The function run in the build process before the command: it starts a
+    new process group, so a timeout kills everything the build started, and
+    sets the CPU limit.
+    """
+
+
+    def limit():
+
+        os.setsid()
+
+        if cpu_seconds:
+            resource.setrlimit(resource.RLIMIT_CPU,
+                               (int(cpu_seconds), int(cpu_seconds)))
+
+    return limit
+
+
+def _kill(process, timed_out):
+
+    timed_out.append(True)
+
+    try:
+        if resource is not None:
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except OSError:
+        pass  # already gone
+
+
+def _make_result(status, exit_code, seconds, log_tail, passed=None,
+                 failed=None):
+
+    return {'status': status, 'exit_code': exit_code, 'passed': passed,
+            'failed': failed, 'seconds': round(seconds, 1),
+            'log_tail': log_tail}
+
+
+def run_build(repo_dir, commit, command, timeout_seconds=DEFAULT_TIMEOUT_SECONDS,
+              cpu_seconds=None, log_lines=DEFAULT_LOG_LINES):
+    r"""
+    Runs a build command on a commit, in a temporary worktree.
+
+    Arguments:
+      repo_dir:   (str) The repo.
+
+      commit:   (str) The commit to build.
+
+      command:   (str) The shell command, run at the root of the worktree.
+
+      timeout_seconds:   (float) The build is killed after this long.
+
+      cpu_seconds:   (int) The CPU time limit of the build, None for none.
+
+      log_lines:   (int) How many lines of output to keep.
+
+    Returns:
+    A dict with 'status' (one of the STATUS_ constants), 'exit_code',
+    'passed' and 'failed' (None if the output has no test counts),
+    'seconds' and 'log_tail'.
+    """
+
+
+    build_dir = tempfile.mkdtemp(prefix='ta_tools_build_')
+    worktree_dir = os.path.join(build_dir, 'worktree')
+    log_filename = os.path.join(build_dir, 'build.log')
+    start = time.time()
+
+    try:
+        try:
+            run_git(repo_dir, ['worktree', 'add', '--quiet', '--detach',
+                               '--force', worktree_dir, commit])
+        except subprocess.CalledProcessError as error:
+            return _make_result(STATUS_ERROR, None, time.time() - start,
+                                error.output.decode('utf-8', 'replace'))
+
+        with open(log_filename, 'wb') as log_file, \
+              open(os.devnull, 'rb') as devnull:
+
+            process = subprocess.Popen(
+              command, shell=True, cwd=worktree_dir, stdin=devnull,
+              stdout=log_file, stderr=subprocess.STDOUT, close_fds=True,
+              env=dict(os.environ, TMPDIR=build_dir, GIT_TERMINAL_PROMPT='0'),
+              preexec_fn=(_limit_child(cpu_seconds) if resource is not None
+                          else None))
+
+            timed_out = []
+            timer = threading.Timer(timeout_seconds, _kill, [process, timed_out])
+            timer.start()
+            try:
+                exit_code = process.wait()
+            finally:
+                timer.cancel()
+
+        with open(log_filename, 'rb') as log_file:
+            passed, failed = parse_test_counts(
+              line.decode('utf-8', 'replace') for line in log_file)
+            log_file.seek(0)
+            tail = deque((line.decode('utf-8', 'replace').rstrip('\r\n')
+                          for line in log_file), maxlen=log_lines)
+
+        # Going over the CPU limit ends in SIGXCPU (or SIGKILL)
+        if timed_out or (resource is not None and
+                         exit_code in (-signal.SIGXCPU, -signal.SIGKILL)):
+            status = STATUS_TIMEOUT
+        elif exit_code == 0 and not failed:
+            status = STATUS_PASSED
+        else:
+            status = STATUS_FAILED
+
+        return _make_result(status, exit_code, time.time() - start,
+                            "\n".join(tail), passed=passed, failed=failed)
+
+    finally:
+        try:
+            run_git(repo_dir, ['worktree', 'remove', '--force', worktree_dir])
+        except subprocess.CalledProcessError:
+            pass  # never added, or already gone
+
+        shutil.rmtree(build_dir, ignore_errors=True)
+
+
+def _make_pool(max_workers):
+    r"""
+    Returns:
+    A ProcessPoolExecutor whose processes are not forked from this one: the
+    pool is started from a pipeline thread, and forking a process that runs
+    other threads can copy a lock that is held forever in the child.
+    """
+
+
+    try:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context(
+          'forkserver' if 'forkserver' in methods else 'spawn')
+        return ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+    except (AttributeError, TypeError):  # Python 2 and before 3.7: fork only
+        return ProcessPoolExecutor(max_workers=max_workers)
+
+
+class BuildCache(object):
+    r"""
+    Build results by commit SHA and command, in a JSON file.
+    """
+
+
+    def __init__(self, filename=DEFAULT_CACHE_FILENAME):
+
+        self.filename = filename
+        self._lock = threading.Lock()
+
+        try:
+            with open(filename, 'r') as cache_file:
+                self.entries = json.load(cache_file)
+        except (IOError, ValueError):
+            self.entries = {}
+
+
+    def get(self, key):
+
+        with self._lock:
+            return self.entries.get(key, None)
+
+
+    def put(self, key, result):
+
+        with self._lock:
+            self.entries[key] = result
+
+
+    def save(self):
+
+        with self._lock:
+            with open(self.filename, 'w') as cache_file:
+                json.dump(self.entries, cache_file)
+
+
+class BuildRunner(object):
+    r"""
+    Runs one build command on many commits in a process pool. run may be
+    called from many threads; a commit being built is built once for all of
+    them.
+    """
+
+
+    def __init__(self, command, cache=None,
+                 timeout_seconds=DEFAULT_TIMEOUT_SECONDS, cpu_seconds=None,
+                 max_workers=None, log_lines=DEFAULT_LOG_LINES):
+        r"""
+        Arguments:
+          command:   (str) The shell command, run at the root of the
+            worktree, e.g. './gradlew test'.
+
+          cache:   (BuildCache) The results cache; a new one on
+            DEFAULT_CACHE_FILENAME if None.
+
+          timeout_seconds:   (float) Each build is killed after this long.
+
+          cpu_seconds:   (int) The CPU time limit of each build, None for
+            timeout_seconds.
+
+          max_workers:   (int) How many builds run at the same time, the
+            number of CPUs if None. 1 builds in this process.
+
+          log_lines:   (int) How many lines of output to keep per build.
+
+        """
+
+
+        self.command = command
+        self.cache = cache if cache is not None else BuildCache()
+        self.timeout_seconds = timeout_seconds
+        self.cpu_seconds = cpu_seconds or int(timeout_seconds)
+        self.max_workers = max_workers or multiprocessing.cpu_count()
+        self.log_lines = log_lines
+
+        self._command_key = hashlib.sha1(command.encode('utf-8')).hexdigest()[:12]
+        self._executor = None
+        self._lock = threading.Lock()
+        self._running = {}  # cache key -> Future
+
+
+    def run(self, repo_dir, commit):
+        r"""
+        Builds a commit, unless its result is cached.
+
+        Arguments:
+          repo_dir:   (str) The repo.
+
+          commit:   (str) The commit, may be abbreviated.
+
+        Returns:
+        The run_build result. Errors (e.g. an unknown commit) and timeouts
+        are not cached.
+        """
+
+
+        sha = get_commit(repo_dir, commit)
+        if sha is None:
+            return _make_result(STATUS_ERROR, None, 0.0,
+                                "Unknown commit %s" % commit)
+
+        key = '%s|%s' % (sha, self._command_key)
+
+        with self._lock:
+
+            result = self.cache.get(key)
+            if result is not None:
+                return result
+
+            future = self._running.get(key, None)
+
+            if future is None and self.max_workers > 1:
+                if self._executor is None:
+                    self._executor = _make_pool(self.max_workers)
+                future = self._running[key] = self._executor.submit(
+                  run_build, repo_dir, sha, self.command, self.timeout_seconds,
+                  self.cpu_seconds, self.log_lines)
+
+        if future is not None:
+            result = future.result()
+        else:
+            result = run_build(repo_dir, sha, self.command,
+                               self.timeout_seconds, self.cpu_seconds,
+                               self.log_lines)
+
+        with self._lock:
+            self._running.pop(key, None)
+            if result['status'] not in (STATUS_ERROR, STATUS_TIMEOUT):
+                self.cache.put(key, result)
+
+        return result
+
+
+    def close(self):
+        r"""
+        Waits for the pool to stop and saves the cache.
+        """
+
+
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+        self.cache.save()
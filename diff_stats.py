@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+r"""
+How much every student changed between two assignment tags.
+
+Submissions._check_commitID tags the graded commit of every repo with the
+assignment code (A2, A3, ...). This runs 'git diff --numstat' between two
+of those tags in every repo, a few repos at a time, and prints one table for
+the whole class: files changed, lines inserted and deleted, and optionally
+the numbers of every path.
+
+The numbers only depend on the two commits, so they are cached by SHA pair
+in diff_stats_cache.json; a re-run only diffs the repos whose tags moved.
+
+Run it from the grading directory:
+
+    $ ./diff_stats.py A2 A3
+    $ ./diff_stats.py A2 A3 --paths -o changes_A3.txt
+"""
+
+
+__all__ = ["DiffStatCache", "collect_diff_stats", "format_diff_stats",
+           "get_numstat", ]
+__author__ = "Travis Janssen, David Tran"
+__credits__ = ["Travis Janssen", "David Tran"]
+__status__ = "Production"
+__version__ = "1.0.0"
+
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+
+from repo_cache import RepoCache
+from repo_tools import get_commit, run_git
+
+
+DEFAULT_CACHE_FILENAME = 'diff_stats_cache.json'
+DEFAULT_MAX_WORKERS = 8
+
+
+def get_numstat(repo_dir, old_commit, new_commit):
+    r"""
+    Diffs two commits of a repo.
+
+    Arguments:
+      repo_dir:   (str) The repo.
+
+      old_commit:   (str) The commit SHA to diff from.
+
+      new_commit:   (str) The commit SHA to diff to.
+
+    Returns:
+    A dict with 'files', 'insertions' and 'deletions' (binary files count as
+    changed files without lines), and 'paths', a list of
+    [path, insertions, deletions] with None lines for binary files.
+    """
+
+
+    output = run_git(repo_dir, ['diff', '--numstat', '-z', '--no-renames',
+                                old_commit, new_commit])
+
+    stats = {'files': 0, 'insertions': 0, 'deletions': 0, 'paths': []}
+
+    # '<insertions>\t<deletions>\t<path>\0', with '-' for binary files
+    for entry in output.split(b'\0'):
+
+        if not entry:
+            continue
+
+        insertions, deletions, path = entry.decode('utf-8', 'replace').split(
+          '\t', 2)
+        insertions = None if insertions == '-' else int(insertions)
+        deletions = None if deletions == '-' else int(deletions)
+
+        stats['files'] += 1
+        stats['insertions'] += insertions or 0
+        stats['deletions'] += deletions or 0
+        stats['paths'].append([path, insertions, deletions])
+
+    return stats
+
+
+class DiffStatCache(object):
+    r"""
+    Diff statistics by pair of commit SHAs, in a JSON file.
+    """
+
+
+    def __init__(self, filename=DEFAULT_CACHE_FILENAME):
+
+        self.filename = filename
+
+        try:
+            with open(filename, 'r') as cache_file:
+                self.entries = json.load(cache_file)
+        except (IOError, ValueError):
+            self.entries = {}
+
+
+    def get(self, old_commit, new_commit):
+
+        return self.entries.get('%s..%s' % (old_commit, new_commit), None)
+
+
+    def put(self, old_commit, new_commit, stats):
+
+        self.entries['%s..%s' % (old_commit, new_commit)] = stats
+
+
+    def save(self):
+
+        with open(self.filename, 'w') as cache_file:
+            json.dump(self.entries, cache_file)
+
+
+def collect_diff_stats(old_tag, new_tag, main_repo_dir='student_repo',
+                       cache=None, max_workers=DEFAULT_MAX_WORKERS):
+    r"""
+    Diffs two assignment tags in every student repo.
+
+    Arguments:
+      old_tag:   (str) The earlier assignment code, e.g. 'A2'.
+
+      new_tag:   (str) The later assignment code, e.g. 'A3'.
+
+      main_repo_dir:   (str) The directory holding the student repos.
+
+      cache:   (DiffStatCache) The statistics cache; a new one on
+        DEFAULT_CACHE_FILENAME if None. It is saved at the end.
+
+      max_workers:   (int) How many repos to diff at the same time.
+
+    Returns:
+    A tuple (stats, missing): repo name -> the get_numstat dict, and the
+    sorted names of the repos missing one of the tags.
+    """
+
+
+    if cache is None:
+        cache = DiffStatCache()
+
+    stats, to_diff, missing = {}, [], []
+
+    for repo_name in RepoCache(main_repo_dir).list_repos():
+
+        repo_dir = os.path.join(main_repo_dir, repo_name)
+        old_commit = get_commit(repo_dir, old_tag)
+        new_commit = get_commit(repo_dir, new_tag)
+
+        if old_commit is None or new_commit is None:
+            missing.append(repo_name)
+        elif cache.get(old_commit, new_commit) is not None:
+            stats[repo_name] = cache.get(old_commit, new_commit)
+        else:
+            to_diff.append((repo_name, repo_dir, old_commit, new_commit))
+
+    if to_diff:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            diffed = list(executor.map(lambda job: get_numstat(*job[1:]),
+                                       to_diff))
+
+        for (repo_name, _, old_commit, new_commit), repo_stats in zip(
+              to_diff, diffed):
+            cache.put(old_commit, new_commit, repo_stats)
+            stats[repo_name] = repo_stats
+
+        cache.save()
+
+    return stats, sorted(missing)
+
+
+def format_diff_stats(old_tag, new_tag, stats, missing, show_paths=False):
+    r"""
+    Arguments:
+      old_tag:   (str) The earlier assignment code.
+
+      new_tag:   (str) The later assignment code.
+
+      stats:   (dict) repo name -> the get_numstat dict.
+
+      missing:   (list of str) The repos missing one of the tags.
+
+      show_paths:   (bool) Whether to list every changed path under its repo.
+
+    Returns:
+    The class-wide table as a string.
+    """
+
+
+    name_width = max([len(name) for name in stats] + [len('repo')])
+    row_format = "%%-%ds  %%6s  %%8s  %%8s" % name_width
+
+    str_buffer = ["CHANGES from %s to %s (%d repos):" % (
+      old_tag, new_tag, len(stats))]
+    str_buffer.append(row_format % ('repo', 'files', '+', '-'))
+
+    for repo_name in sorted(stats):
+
+        repo_stats = stats[repo_name]
+        str_buffer.append(row_format % (
+          repo_name, repo_stats['files'], repo_stats['insertions'],
+          repo_stats['deletions']))
+
+        if show_paths:
+            for path, insertions, deletions in repo_stats['paths']:
+                str_buffer.append("\t%s\t%s\t%s" % (
+                  '-' if insertions is None else insertions,
+                  '-' if deletions is None else deletions, path))
+
+    if stats:
+        str_buffer.append(row_format % (
+          'total',
+          sum(repo_stats['files'] for repo_stats in stats.values()),
+          sum(repo_stats['insertions'] for repo_stats in stats.values()),
+          sum(repo_stats['deletions'] for repo_stats in stats.values())))
+
+    str_buffer.append("\nNOT COMPARED, missing %s or %s (%d):\n\t%s" % (
+      old_tag, new_tag, len(missing), ", ".join(missing)))
+
+    return "\n".join(str_buffer)
+
+
+def parse_main():
+    r"""
+    Reads the user input, diffs the repos and prints the table.
+    """
+
+
+    parser = argparse.ArgumentParser(
+      description="Counts the changes of every student between two "
+                  "assignment tags")
+
+    parser.add_argument(
+      'old_tag',
+      help="the earlier assignment code, e.g. A2")
+
+    parser.add_argument(
+      'new_tag',
+      help="the later assignment code, e.g. A3")
+
+    parser.add_argument(
+      '-p', '--paths', action='store_true', dest='show_paths',
+      help="list the changes of every path")
+
+    parser.add_argument(
+      '-w', '--workers', type=int, default=DEFAULT_MAX_WORKERS,
+      dest='max_workers',
+      help="how many repos to diff at the same time (default %d)" %
+           DEFAULT_MAX_WORKERS)
+
+    parser.add_argument(
+      '-r', '--repo_dir', default='student_repo', dest='repo_dir',
+      help="the directory holding the student repos (default student_repo)")
+
+    parser.add_argument(
+      '-o', '--output', default=None, dest='output',
+      help="also write the table to this file")
+
+    args = parser.parse_args()
+
+    stats, missing = collect_diff_stats(
+      old_tag=args.old_tag, new_tag=args.new_tag, main_repo_dir=args.repo_dir,
+      max_workers=args.max_workers)
+
+    report = format_diff_stats(args.old_tag, args.new_tag, stats, missing,
+                               show_paths=args.show_paths)
+    print(report)
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(report + "\n")
+
+
+if __name__ == "__main__":
+    parse_main()
@@ -23,7 +23,8 @@ Do not forget about datetime's isoformat to get this result!
 """
 
 
-__all__ = ["get_assignment_info", "process_assignment", ]
+__all__ = ["get_assignment_info", "merge_assignment_shards",
+           "prefetch_assignment", "process_assignment", ]
 __author__ = "Travis Janssen, David Tran"
 __credits__ = ["Travis Janssen", "David Tran"]
 __status__ = "Production"
@@ -31,15 +32,32 @@ __version__ = "1.0.0"
 
 
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 import inspect
 from itertools import product
 
-from process_submissions import Submissions
+import shutil
+import sys
+
+try:
+    from StringIO import StringIO  # Python 2
+except ImportError:
+    from io import StringIO
+
+import grader_sheet
+import planner
+import prefetch
+from process_submissions import Submissions, wait_for_pending_writes
+import repo_cache
+from result_set import ResultSet
+import sharding
 
 
 def process_assignment(
   assignment_name, assignment_code, deadline, report_filename, student_whitelist=None,
-  should_pull_repo_flag=True, is_team=False, should_create_json_files=False):
+  should_pull_repo_flag=True, is_team=False, should_create_json_files=False,
+  shard=None, cache_budget=None, build_command=None, priority_students=None,
+  resume=False, sparse_paths=None):
     r"""
     Calls the backend to do the processing.
 
@@ -61,6 +79,26 @@ def process_assignment(
 
       is_team:   (boolean) States if the assignment is a group one.
 
+      shard:   (tuple of int) (i, N) to only process slice i of N of the
+        students (or teams). Results go to shard-local records and report
+        files; see merge_assignment_shards.
+
+      cache_budget:   (int) If set, the least recently used repos are
+        evicted into bundles afterwards until student_repo/ fits in this many
+        bytes.
+
+      build_command:   (str) If set, this shell command is run on every
+        valid commit and its result is reported; see build_runner.
+
+      priority_students:   (list of str) Students (or teams) whose work is
+        scheduled ahead of the others; see Submissions.PRIORITY_BOOST.
+
+      resume:   (boolean) Continue an interrupted run of the assignment
+        instead of starting over; see journal.
+
+      sparse_paths:   (list of str) If set, only these directories of the
+        repos are checked out, e.g. ['Assignment4'].
+
     """
 
 
@@ -74,12 +112,115 @@ def process_assignment(
     if should_create_json_files and is_team:
         submissions.create_team_json('teams_full.txt')  # don't try to create team JSONs at the beginning; teams are not normally available at semester start
 
-    submissions.process_repos(
-      submission_folder_name=('./submissions/%s' % assignment_name),
-      deadline=deadline,
-      assignment_code=assignment_code,
-      student_whitelist=student_whitelist,
-      should_pull=should_pull_repo_flag)
+    if shard is not None:
+        shard_index, shard_count = shard
+
+        if not student_whitelist:
+            student_whitelist = submissions.get_roster()
+
+        student_whitelist = sharding.filter_shard(
+          student_whitelist, shard_index, shard_count)
+
+        # Work on a copy of the records so shards never write the same file
+        shard_records_filename = sharding.get_shard_filename(
+          submissions.STUDENT_RECORDS_FILENAME, shard_index, shard_count)
+        wait_for_pending_writes(submissions.STUDENT_RECORDS_FILENAME)
+        shutil.copyfile(submissions.STUDENT_RECORDS_FILENAME,
+                        shard_records_filename)
+        submissions.STUDENT_RECORDS_FILENAME = shard_records_filename
+
+        report_filename = sharding.get_shard_filename(
+          report_filename, shard_index, shard_count)
+
+        print("process_assignment: shard %d/%d has %d of the %s" % (
+          shard_index, shard_count, len(student_whitelist),
+          'teams' if is_team else 'students'))
+
+        if not student_whitelist:
+            return
+
+    # The report is written student by student, in the order of the list,
+    # from the same in-memory records the results are streamed from
+    results = ResultSet()
+
+    # On a terminal the progress line keeps redrawing on stderr, which would
+    # garble the report: it is only shown once the run is done (the report
+    # file is still written as the students come in)
+    console = None
+    if submissions.SHOW_PROGRESS and sys.stderr.isatty():
+        console = StringIO()
+
+    try:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+
+            reporting = executor.submit(
+              submissions.generate_report,
+              assignment=assignment_name,
+              student_list=student_whitelist,
+              report_filename=report_filename,
+              results=results,
+              console=console)
+
+            # Raises the error of a failed run; leaving early (Ctrl-C)
+            # cancels it, keeping the journal to resume from
+            for _ in submissions.iter_results(
+              submission_folder_name=('./submissions/%s' % assignment_name),
+              deadline=deadline,
+              assignment_code=assignment_code,
+              student_whitelist=student_whitelist,
+              should_pull=should_pull_repo_flag,
+              build_command=build_command,
+              priority_students=priority_students,
+              resume=resume,
+              sparse_paths=sparse_paths,
+              results=results):
+                pass
+
+            reporting.result()
+
+    finally:
+        if console is not None:
+            sys.stderr.write(console.getvalue())
+            sys.stderr.flush()
+
+    if cache_budget is not None:
+        submissions.enforce_repo_budget(budget_bytes=cache_budget)
+
+
+def merge_assignment_shards(
+  assignment_name, shard_count, report_filename, student_whitelist=None,
+  is_team=False, **_):
+    r"""
+    Combines the results of "--shard i/N" runs into the records file and
+    writes one consolidated report.
+
+    Arguments:
+      assignment_name:   (str) This is the name of the assignment.
+
+      shard_count:   (int) N, the number of shards.
+
+      report_filename:   (str) The consolidated report.
+
+      student_whitelist:   (list of str) The students (or teams) to report,
+        all of them if None.
+
+      is_team:   (boolean) States if the assignment is a group one.
+
+      _:   The other keys of get_assignment_info are ignored.
+
+    """
+
+
+    submissions = Submissions(is_team=is_team, should_pull_repo_flag=False)
+
+    missing_shards = sharding.merge_shards(
+      submissions=submissions, assignment_alias=assignment_name,
+      count=shard_count)
+
+    if missing_shards:
+        print("WARNING: No records for shards %s of %d; their students are "
+              "reported with their previous results" % (
+                ", ".join(map(str, missing_shards)), shard_count))
 
     submissions.generate_report(
       assignment=assignment_name,
@@ -87,8 +228,87 @@ def process_assignment(
       report_filename=report_filename)
 
 
+def plan_assignment(assignment_name, assignment_code, student_whitelist=None,
+                    should_pull_repo_flag=True, is_team=False, **_):
+    r"""
+    Prints what process_assignment would do and how long it should take,
+    without fetching, checking out or writing anything.
+
+    Arguments:
+      assignment_name:   (str) This is the name of the assignment.
+
+      assignment_code:   (str) This is the two letter name for the assignment.
+
+      student_whitelist:   (list of str) The students (or teams) to plan
+        for, all of them if None.
+
+      should_pull_repo_flag:   (boolean) Whether existing repos are pulled.
+
+      is_team:   (boolean) States if the assignment is a group one.
+
+      _:   The other keys of get_assignment_info are ignored.
+
+    """
+
+
+    submissions = Submissions(is_team=is_team,
+                              should_pull_repo_flag=should_pull_repo_flag)
+
+    plan = submissions.plan_repos(
+      submission_folder_name=('./submissions/%s' % assignment_name),
+      assignment_code=assignment_code,
+      student_whitelist=student_whitelist,
+      should_pull=should_pull_repo_flag)
+
+    entries = submissions.repo_cache.get_entries()
+
+    estimate = planner.estimate_plan(
+      plan=plan, entries=entries,
+      requests_per_second=submissions.GIT_REQUESTS_PER_SECOND,
+      max_concurrency=submissions.host_controller.max_concurrency,
+      checkout_workers=submissions.PIPELINE_WORKERS['verify'])
+
+    print(planner.format_plan(
+      assignment_code=assignment_code, plan=plan, estimate=estimate,
+      timings=planner.get_past_timings(entries.values())))
+
+
+def prefetch_assignment(deadline, student_whitelist=None, is_team=False,
+                        window_hours=prefetch.DEFAULT_WINDOW_HOURS):
+    r"""
+    Keeps the repos warm until the deadline so process_assignment only pulls
+    a small delta afterwards.
+
+    Arguments:
+      deadline:   (str) This is the deadline for the assignment in UTC. The
+        format is: 'YYYY-MM-DD HH:MM:SS'
+
+      student_whitelist:   (list of str) The students (or teams) whose repos
+        we fetch. None fetches the whole roster.
+
+      is_team:   (boolean) States if the assignment is a group one.
+
+      window_hours:   (float) How many hours before the deadline we start
+        fetching.
+
+    """
+
+
+    submissions = Submissions(is_team=is_team, should_pull_repo_flag=True)
+
+    for fetch_time in prefetch.get_prefetch_schedule(
+      deadline=deadline, window_hours=window_hours):
+        print("prefetch_assignment: planned fetch at %s UTC" %
+              fetch_time.strftime(prefetch.DATETIME_PATTERN))
+
+    prefetch.run_prefetch(submissions=submissions, deadline=deadline,
+                          student_whitelist=student_whitelist,
+                          window_hours=window_hours)
+
+
 def get_assignment_info(assignment_name, should_pull_repo_flag=None,
-                        is_batch_run=False):
+                        is_batch_run=False, grader=None, sheet_source=None,
+                        priority_grader=None):
     r"""
     Converts the parser input into a complete Python dictionary to call the
     backend.
@@ -111,6 +331,18 @@ def get_assignment_info(assignment_name, should_pull_repo_flag=None,
       is_batch_run:   (boolean) States if this is a batch run. Prints are
         suppressed if they are.
 
+      grader:   (str) If set, the student whitelist is taken from the grader
+        assignment sheet, filtered to this grader, instead of from
+        students_XX.txt. The sheet is cached locally in
+        grader_sheet.DEFAULT_CACHE_FILENAME.
+
+      sheet_source:   (grader_sheet.GoogleSheetSource or LocalSheetSource)
+        Where the grader sheet is read from. Defaults to the course's
+        Google Sheet.
+
+      priority_grader:   (str) If set, the students of this grader in the
+        grader sheet are processed first (priority_students).
+
     Returns:
       A dictionary with keys that can be used for the backside.
       The keys include:
@@ -138,6 +370,9 @@ def get_assignment_info(assignment_name, should_pull_repo_flag=None,
         IDs that we will whitelist. That is to say all students in the list
         will not be ignored.
 
+      priority_students:   (list of str) Only with priority_grader: the
+        students to process first.
+
     """
 
 
@@ -175,8 +410,55 @@ def get_assignment_info(assignment_name, should_pull_repo_flag=None,
             return None
 
 
+    def get_students_list_from_sheet(range_name, grader):
+        r"""
+        Gets the students assigned to the grader in the grader sheet.
+
+        Arguments:
+          range_name:   (str) The sheet range of this assignment, in A1
+            notation. None if the assignment has no known tab.
+
+          grader:   (str) The grader's name in the sheet.
+
+        Return:
+        A list of students that should be whitelisted, or None if the sheet
+        could not be read.
+        """
+
+
+        if range_name is None:
+            print("WARNING: Set 'grader_sheet_range' on '%s' in "
+                  "download_submission.py to use the grader sheet" %
+                  assignment_name)
+            return None
+
+        source = sheet_source
+        if source is None:
+            source = grader_sheet.GoogleSheetSource()
+
+        try:
+            student_whitelist = grader_sheet.get_grader_whitelist(
+              source=source, range_name=range_name, grader=grader,
+              cache=grader_sheet.SheetCache())
+
+        except Exception as error:  # ImportError, network or API errors
+
+            print("WARNING: Could not read the grader sheet: %s" % error)
+
+            return None
+
+        if not student_whitelist and not is_batch_run:
+            print("WARNING: No students for grader '%s' in '%s'" %
+                  (grader, range_name))
+
+        return student_whitelist or None
+
+
     # Deadline info is EST + 4 hours = UTC, which is the T-Square deadline
     # Anywhere on Earth time is UTC-12. Worst case: UTC+12 (like Wake Island) --> midnight AoE = +2 days at midnight, so 1/26/2018 midnight = 1/28/2018 midnight
+    # An assignment may also set 'grader_sheet_range', 'build_command' and
+    # 'sparse_paths', e.g. 'sparse_paths' : ['Assignment4'], to only check
+    # out that directory of the repos
     assignment_dict = {
       'A1': {
         'deadline' : '2018-08-28 03:59:00',
@@ -283,7 +565,26 @@ def get_assignment_info(assignment_name, should_pull_repo_flag=None,
     else:
         student_filename = 'students_%s.txt' % assignment_name
 
-    student_whitelist = get_students_list_from_file(filename=student_filename)
+    # The sheet tab of each individual assignment, unless set with
+    # 'grader_sheet_range'. The project deliverables (I_D1, T_D2, ...) have
+    # no such default and need 'grader_sheet_range' to use the sheet.
+    default_range = None
+    if not is_multi_assignment:
+        default_range = 'Assignment %s!A5:D' % assignment_name[1:]
+
+    grader_sheet_range = assignment_info.pop('grader_sheet_range', default_range)
+
+    student_whitelist = None
+    if grader:
+        student_whitelist = get_students_list_from_sheet(
+          range_name=grader_sheet_range, grader=grader)
+
+    if student_whitelist is None:
+        student_whitelist = get_students_list_from_file(filename=student_filename)
+
+    if priority_grader:
+        assignment_info['priority_students'] = get_students_list_from_sheet(
+          range_name=grader_sheet_range, grader=priority_grader)
 
     assignment_info['is_team'] = is_team
     assignment_info['report_filename'] = report_filename
@@ -321,6 +622,15 @@ def parse_main(submission_target=None):
     # None is auto, True is always, False is never
     pull_from_github = None
     create_json_files = None
+    prefetch_window_hours = None
+    grader = None
+    shard = None
+    merge_shard_count = None
+    cache_budget = None
+    build_command = None
+    should_plan = False
+    priority_grader = None
+    should_resume = False
 
 
     # Remember in Python, range starts from the first value but ends in
@@ -379,6 +689,90 @@ def parse_main(submission_target=None):
             help='create the json files required for storing student semester data. Requires students_full.txt'
         )
 
+        parser.add_argument(
+            '-f', '--prefetch', type=float, nargs='?',
+            const=prefetch.DEFAULT_WINDOW_HOURS,
+            default=None,
+            dest='prefetch_window_hours',
+            metavar='HOURS',
+            help=('fetch every repo periodically during the HOURS before the '
+                  'deadline (default %s) instead of processing the '
+                  'assignment' % prefetch.DEFAULT_WINDOW_HOURS)
+        )
+
+        parser.add_argument(
+            '-g', '--grader',
+            default=None,
+            dest='grader',
+            help=('take the student list from the grader assignment sheet, '
+                  'filtered to this grader (cached locally in %s)' %
+                  grader_sheet.DEFAULT_CACHE_FILENAME)
+        )
+
+        parser.add_argument(
+            '-s', '--shard',
+            type=sharding.parse_shard,
+            default=None,
+            dest='shard',
+            metavar='i/N',
+            help=('only process slice i of N of the students (or teams), '
+                  'writing shard-local records and report')
+        )
+
+        parser.add_argument(
+            '-m', '--merge_shards', type=int,
+            default=None,
+            dest='merge_shard_count',
+            metavar='N',
+            help=('merge the records of N shards into student_records.json '
+                  'and write one consolidated report')
+        )
+
+        parser.add_argument(
+            '-b', '--cache_budget',
+            type=repo_cache.parse_size,
+            default=None,
+            dest='cache_budget',
+            metavar='SIZE',
+            help=('after processing, pack the least recently used repos into '
+                  'bundles until student_repo/ fits in SIZE (e.g. 20G); they '
+                  'are restored automatically when needed again')
+        )
+
+        parser.add_argument(
+            '-c', '--build_command',
+            default=None,
+            dest='build_command',
+            metavar='COMMAND',
+            help=('build and test every valid commit with this shell command '
+                  '(e.g. "./gradlew test"); overrides the assignment\'s '
+                  '\'build_command\'')
+        )
+
+        parser.add_argument(
+            '-n', '--plan', action='store_true',
+            dest='should_plan',
+            help=('only print what the run would do (clones, pulls, '
+                  'checkouts, submission reads) with a time and size '
+                  'estimate; nothing is fetched or changed')
+        )
+
+        parser.add_argument(
+            '-P', '--priority_grader',
+            default=None,
+            dest='priority_grader',
+            metavar='GRADER',
+            help=('process the students of this grader in the grader sheet '
+                  'first, e.g. on a full-class run')
+        )
+
+        parser.add_argument(
+            '-r', '--resume', action='store_true',
+            dest='should_resume',
+            help=('continue an interrupted run: students already done are '
+                  'kept from its journal and not processed again')
+        )
+
         args = parser.parse_args()
         assignment_name = args.assignment_name
 
@@ -397,6 +791,15 @@ def parse_main(submission_target=None):
             pull_from_github = None
 
         create_json_files = args.create_json_files
+        prefetch_window_hours = args.prefetch_window_hours
+        grader = args.grader
+        shard = args.shard
+        merge_shard_count = args.merge_shard_count
+        cache_budget = args.cache_budget
+        build_command = args.build_command
+        should_plan = args.should_plan
+        priority_grader = args.priority_grader
+        should_resume = args.should_resume
 
         if create_json_files not in [True, None, False]:
             create_json_files = bool(create_json_files)
@@ -416,13 +819,37 @@ def parse_main(submission_target=None):
 
         assignment_info = get_assignment_info(
           assignment_name=assignment_name,
-          should_pull_repo_flag=pull_from_github
+          should_pull_repo_flag=pull_from_github,
+          grader=grader,
+          priority_grader=priority_grader
           )
 
         if not assignment_info:
             return -1
 
+        if prefetch_window_hours is not None:
+            prefetch_assignment(
+              deadline=assignment_info['deadline'],
+              student_whitelist=assignment_info['student_whitelist'],
+              is_team=assignment_info['is_team'],
+              window_hours=prefetch_window_hours)
+            return 0
+
+        if merge_shard_count is not None:
+            merge_assignment_shards(shard_count=merge_shard_count,
+                                    **assignment_info)
+            return 0
+
+        if should_plan:
+            plan_assignment(**assignment_info)
+            return 0
+
         assignment_info['should_create_json_files'] = create_json_files
+        assignment_info['shard'] = shard
+        assignment_info['cache_budget'] = cache_budget
+        assignment_info['resume'] = should_resume
+        if build_command:
+            assignment_info['build_command'] = build_command
 
         # ** Converts a dictionary to match all keywords in a function
         # declaration.
@@ -446,9 +873,21 @@ def parse_main(submission_target=None):
             assignment_info = get_assignment_info(
               assignment_name=assignment_code,
               should_pull_repo_flag=pull_from_github,
-              is_batch_run=True)
+              is_batch_run=True,
+              grader=grader,
+              priority_grader=priority_grader)
+
+            if assignment_info and should_plan:
+
+                plan_assignment(**assignment_info)
+
+            elif assignment_info:
 
-            if assignment_info:
+                assignment_info['shard'] = shard
+                assignment_info['cache_budget'] = cache_budget
+                assignment_info['resume'] = should_resume
+                if build_command:
+                    assignment_info['build_command'] = build_command
 
                 print("\n\n%s: Starting run for '%s'" % (
                   func_name, assignment_code))
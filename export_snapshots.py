@@ -0,0 +1,370 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+r"""
+Exports the graded snapshot of every student into per-grader folders.
+
+Graders want the files of the submission as a plain directory (or tarball),
+without git state. For each student in the grader assignment sheet this
+streams 'git archive <assignment tag>' (the tag set by
+Submissions._check_commitID) straight into
+
+    export/A3/<grader>/6300Fall18username/        (or .tar.gz with -z)
+
+Repos are exported in a process pool. Files identical to a file of the
+course template are not written again: they are hardlinked to one shared
+read-only copy in export/A3/.template/, so exporting a whole class mostly
+costs the files students actually wrote. Since the shared copies are
+read-only, a grader editing one of those files gets an error instead of
+changing it for every student.
+
+Run it from the grading directory:
+
+    $ ./export_snapshots.py A3 --template ../starter_code
+    $ ./export_snapshots.py A3 -g Travis -z
+"""
+
+
+__all__ = ["export_snapshots", "read_template", ]
+__author__ = "Travis Janssen, David Tran"
+__credits__ = ["Travis Janssen", "David Tran"]
+__status__ = "Production"
+__version__ = "1.0.0"
+
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import os
+import shutil
+import stat
+import subprocess
+import tarfile
+
+import grader_sheet
+from repo_tools import (get_blob_sha, get_commit, get_worker_state,
+                        init_worker, iter_template_files)
+
+
+DEFAULT_OUTPUT_DIR = 'export'
+TEMPLATE_DIR_NAME = '.template'
+
+
+def read_template(template_dir, shared_dir):
+    r"""
+    Stores one read-only copy of every template file, named by its hash.
+
+    Arguments:
+      template_dir:   (str) A directory with the starter code, e.g. a
+        checkout of the template repo. None for no template.
+
+      shared_dir:   (str) Where the shared copies go.
+
+    Returns:
+    A dict blob SHA -> shared copy filename.
+    """
+
+
+    shared = {}
+
+    if template_dir is None:
+        return shared
+
+    if not os.path.isdir(shared_dir):
+        os.makedirs(shared_dir)
+
+    for _, data, blob_sha in iter_template_files(template_dir):
+
+        shared_filename = os.path.join(shared_dir, blob_sha)
+
+        if not os.path.exists(shared_filename):
+            with open(shared_filename, 'wb') as shared_file:
+                shared_file.write(data)
+            os.chmod(shared_filename, stat.S_IRUSR | stat.S_IRGRP |
+                     stat.S_IROTH)
+
+        shared[blob_sha] = shared_filename
+
+    return shared
+
+
+def _remove(path):
+
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def _export_snapshot(repo_dir, commit, destination, as_tarball):
+    r"""
+    Exports a repo at a commit. The export is built next to destination and
+    renamed into place, so an interrupted export never looks complete.
+
+    Arguments:
+      repo_dir:   (str) The repo.
+
+      commit:   (str) The commit SHA to export.
+
+      destination:   (str) The directory, or tarball filename, to create. An
+        existing one is replaced.
+
+      as_tarball:   (bool) Whether to write a .tar.gz instead of a directory.
+
+    Returns:
+    A tuple (files written, files hardlinked to the template).
+    """
+
+
+    partial = destination + '.partial'
+    _remove(partial)
+
+    if as_tarball:
+
+        with open(partial, 'wb') as tarball:
+            subprocess.check_call(['git', 'archive', '--format=tar.gz', commit],
+                                  cwd=repo_dir, stdout=tarball)
+
+        _remove(destination)
+        os.rename(partial, destination)
+
+        return 1, 0
+
+    # Given to init_worker, so the template is sent to each process once
+    shared = get_worker_state() or {}
+    written, linked = 0, 0
+    os.makedirs(partial)
+
+    process = subprocess.Popen(['git', 'archive', '--format=tar', commit],
+                               cwd=repo_dir, stdout=subprocess.PIPE)
+
+    # 'r|' reads the archive as a stream, one member at a time
+    with tarfile.open(fileobj=process.stdout, mode='r|') as archive:
+
+        for member in archive:
+
+            parts = member.name.rstrip('/').split('/')
+            if member.name.startswith('/') or '..' in parts:
+                continue
+
+            path = os.path.join(partial, *parts)
+
+            if member.isdir():
+                if not os.path.isdir(path):
+                    os.makedirs(path)
+                continue
+
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+
+            if member.issym():
+                try:
+                    os.symlink(member.linkname, path)
+                except (AttributeError, NotImplementedError, OSError):
+                    pass  # no symlinks on this system
+                continue
+
+            if not member.isfile():
+                continue
+
+            data = archive.extractfile(member).read()
+            shared_filename = shared.get(get_blob_sha(data), None)
+
+            if shared_filename is not None:
+                try:
+                    os.link(shared_filename, path)
+                    linked += 1
+                    continue
+                except OSError:
+                    pass  # e.g. another file system; copy it instead
+
+            with open(path, 'wb') as output_file:
+                output_file.write(data)
+
+            if member.mode & stat.S_IXUSR:
+                os.chmod(path, 0o755)
+
+            written += 1
+
+    process.stdout.close()
+    if process.wait() != 0:
+        raise subprocess.CalledProcessError(process.returncode, 'git archive')
+
+    _remove(destination)
+    os.rename(partial, destination)
+
+    return written, linked
+
+
+def _get_folder_name(grader):
+
+    return "_".join(grader.split()) or "unassigned"
+
+
+def export_snapshots(assignment_code, graders, main_repo_dir='student_repo',
+                     output_dir=DEFAULT_OUTPUT_DIR, template_dir=None,
+                     folder_prefix="6300Fall18", as_tarball=False,
+                     max_workers=None):
+    r"""
+    Exports the graded snapshot of every student of every grader.
+
+    Arguments:
+      assignment_code:   (str) The tag of the graded commits, e.g. 'A3'.
+
+      graders:   (dict) grader -> list of GT usernames, as returned by
+        grader_sheet.get_grader_assignments.
+
+      main_repo_dir:   (str) The directory holding the student repos.
+
+      output_dir:   (str) The exports go to output_dir/assignment_code.
+
+      template_dir:   (str) The starter code, whose files are hardlinked to a
+        shared copy, or None.
+
+      folder_prefix:   (str) The repo name prefix, e.g. '6300Fall18'.
+
+      as_tarball:   (bool) Whether to write .tar.gz files instead of
+        directories. Tarballs are not de-duplicated.
+
+      max_workers:   (int) The size of the process pool. 1 exports in this
+        process.
+
+    Returns:
+    A tuple (exported, missing): the list of (destination, files written,
+    files hardlinked), and the sorted repo names without a clone or without
+    the tag.
+    """
+
+
+    assignment_dir = os.path.join(output_dir, assignment_code)
+    shared = {}
+    if not as_tarball:
+        shared = read_template(template_dir, os.path.join(
+          assignment_dir, TEMPLATE_DIR_NAME))
+
+    jobs, missing = [], []
+
+    for grader in sorted(graders):
+
+        grader_dir = os.path.join(assignment_dir, _get_folder_name(grader))
+
+        for username in graders[grader]:
+
+            repo_name = "%s%s" % (folder_prefix, username)
+            repo_dir = os.path.join(main_repo_dir, repo_name)
+
+            commit = None
+            if os.path.isdir(os.path.join(repo_dir, '.git')):
+                commit = get_commit(repo_dir, assignment_code)
+
+            if commit is None:
+                missing.append(repo_name)
+                continue
+
+            if not os.path.isdir(grader_dir):
+                os.makedirs(grader_dir)
+
+            jobs.append((repo_dir, commit, os.path.join(
+              grader_dir, repo_name + ('.tar.gz' if as_tarball else ''))))
+
+    arguments = ([job[0] for job in jobs], [job[1] for job in jobs],
+                 [job[2] for job in jobs], [as_tarball] * len(jobs))
+
+    if max_workers == 1:
+        init_worker(shared)
+        counts = list(map(_export_snapshot, *arguments))
+    elif jobs:
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 initializer=init_worker,
+                                 initargs=(shared,)) as executor:
+            counts = list(executor.map(_export_snapshot, *arguments))
+    else:
+        counts = []
+
+    exported = [(job[2], written, linked)
+                for job, (written, linked) in zip(jobs, counts)]
+
+    return exported, sorted(missing)
+
+
+def parse_main():
+    r"""
+    Reads the user input, reads the grader sheet and exports the snapshots.
+    """
+
+
+    parser = argparse.ArgumentParser(
+      description="Exports the graded snapshot of every student into "
+                  "per-grader folders")
+
+    parser.add_argument(
+      'assignment_code',
+      help="the tag of the graded commits, e.g. A3")
+
+    parser.add_argument(
+      '-g', '--grader', default=None, dest='grader',
+      help="only export the students of this grader")
+
+    parser.add_argument(
+      '-t', '--template', default=None, dest='template_dir',
+      help="a directory with the starter code, whose files are hardlinked "
+           "to one shared copy")
+
+    parser.add_argument(
+      '-z', '--tarball', action='store_true', dest='as_tarball',
+      help="write a .tar.gz per student instead of a directory")
+
+    parser.add_argument(
+      '-o', '--output_dir', default=DEFAULT_OUTPUT_DIR, dest='output_dir',
+      help="where to export to (default %s)" % DEFAULT_OUTPUT_DIR)
+
+    parser.add_argument(
+      '-s', '--sheet', default=None, dest='sheet_filename',
+      help="read the grader assignments from this tab separated file "
+           "instead of the grader sheet")
+
+    parser.add_argument(
+      '--range', default=None, dest='range_name',
+      help="the sheet range (default 'Assignment N!A5:D')")
+
+    parser.add_argument(
+      '-r', '--repo_dir', default='student_repo', dest='repo_dir',
+      help="the directory holding the student repos (default student_repo)")
+
+    args = parser.parse_args()
+
+    if args.sheet_filename:
+        source = grader_sheet.LocalSheetSource(args.sheet_filename)
+    else:
+        source = grader_sheet.GoogleSheetSource()
+
+    range_name = args.range_name or 'Assignment %s!A5:D' % (
+      args.assignment_code[1:])
+    graders = grader_sheet.get_grader_assignments(
+      source=source, range_name=range_name, cache=grader_sheet.SheetCache())
+
+    if args.grader:
+        graders = dict((grader, usernames)
+                       for grader, usernames in graders.items()
+                       if grader.lower() == args.grader.strip().lower())
+
+    if not graders:
+        print("ERROR: No grader assignments in '%s'" % range_name)
+        return
+
+    exported, missing = export_snapshots(
+      assignment_code=args.assignment_code, graders=graders,
+      main_repo_dir=args.repo_dir, output_dir=args.output_dir,
+      template_dir=args.template_dir, as_tarball=args.as_tarball)
+
+    print("Exported %d snapshots to %s (%d files written, %d hardlinked to "
+          "the template)" % (
+            len(exported), os.path.join(args.output_dir, args.assignment_code),
+            sum(written for _, written, _ in exported),
+            sum(linked for _, _, linked in exported)))
+
+    if missing:
+        print("\nNOT EXPORTED, no repo or no %s tag (%d):\n\t%s" % (
+          args.assignment_code, len(missing), ", ".join(missing)))
+
+
+if __name__ == "__main__":
+    parse_main()
@@ -0,0 +1,350 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+r"""
+Builds a grader's student whitelist from the grader assignment Google Sheet.
+
+Every assignment tab of the sheet lists one row per student with the GT
+username in column B and the grader in column D (see sheets_test.py). Rather
+than pasting those into students_XX.txt by hand, get_grader_whitelist reads
+the rows for one grader.
+
+The rows are cached in a local snapshot (SheetCache):
+
+  * within max_age_seconds of the last check the snapshot is used as is, so
+    repeated runs start instantly,
+  * after that the sheet's revision is checked and the rows are only
+    downloaded again if the sheet changed; if the revision cannot be read
+    (credentials with the Sheets scope only, Drive API turned off) the rows
+    are downloaded every time,
+  * when the sheet cannot be reached (offline, expired credentials) the last
+    snapshot is used.
+
+GoogleSheetSource talks to the Sheets API; the Google client libraries are
+only imported when it is used. LocalSheetSource reads a tab separated file
+with the same rows instead and stands in for the API in tests.
+"""
+
+
+__all__ = ["GoogleSheetSource", "LocalSheetSource", "SheetCache",
+           "get_grader_assignments", "get_grader_whitelist", "get_sheet_rows", ]
+__author__ = "Travis Janssen, David Tran"
+__credits__ = ["Travis Janssen", "David Tran"]
+__status__ = "Production"
+__version__ = "1.0.0"
+
+
+import hashlib
+import json
+import time
+
+
+DEFAULT_SPREADSHEET_ID = '11uIKklyxFll0PicBJxls9TwTtysda5aGWThOrd6Xvns'
+DEFAULT_CACHE_FILENAME = 'grader_sheet_cache.json'
+DEFAULT_MAX_AGE_SECONDS = 10 * 60
+
+# Columns of the assignment tabs
+USERNAME_COLUMN = 1
+GRADER_COLUMN = 3
+
+
+class GoogleSheetSource(object):
+    r"""
+    Reads rows from a Google Sheet through the Sheets API.
+    """
+
+
+    SCOPES = ('https://www.googleapis.com/auth/spreadsheets.readonly '
+              'https://www.googleapis.com/auth/drive.metadata.readonly')
+
+
+    def __init__(self, spreadsheet_id=DEFAULT_SPREADSHEET_ID,
+                 credentials_filename='credentials.json',
+                 client_secret_filename='client_secret.json'):
+        r"""
+        Arguments:
+          spreadsheet_id:   (str) The ID of the sheet, from its URL.
+
+          credentials_filename:   (str) Where the OAuth token is stored.
+
+          client_secret_filename:   (str) The OAuth client secret, used the
+            first time to authorize.
+
+        """
+
+
+        self.spreadsheet_id = spreadsheet_id
+        self.cache_key = spreadsheet_id
+        self.credentials_filename = credentials_filename
+        self.client_secret_filename = client_secret_filename
+        self._http = None
+
+
+    def _authorize(self):
+
+        if self._http is None:
+
+            # Optional dependencies, only needed when the sheet is used
+            from httplib2 import Http
+            from oauth2client import client, file, tools
+
+            store = file.Storage(self.credentials_filename)
+            creds = store.get()
+            if not creds or creds.invalid:
+                flow = client.flow_from_clientsecrets(
+                  self.client_secret_filename, self.SCOPES)
+                # Without flags, run_flow parses sys.argv: the arguments of
+                # download_submission.py would make it exit
+                creds = tools.run_flow(flow, store,
+                                       flags=tools.argparser.parse_args([]))
+
+            self._http = creds.authorize(Http())
+
+        return self._http
+
+
+    def get_revision(self):
+        r"""
+        Returns:
+        The sheet's current revision from the Drive API, which changes on
+        every edit.
+        """
+
+
+        from apiclient.discovery import build
+
+        service = build('drive', 'v3', http=self._authorize())
+        metadata = service.files().get(
+          fileId=self.spreadsheet_id, fields='version').execute()
+
+        return metadata.get('version', None)
+
+
+    def get_rows(self, range_name):
+        r"""
+        Arguments:
+          range_name:   (str) The range in A1 notation, e.g.
+            'Assignment 3!A5:D'.
+
+        Returns:
+        A list of rows, each a list of cell strings.
+        """
+
+
+        from apiclient.discovery import build
+
+        service = build('sheets', 'v4', http=self._authorize())
+        result = service.spreadsheets().values().get(
+          spreadsheetId=self.spreadsheet_id, range=range_name).execute()
+
+        return result.get('values', [])
+
+
+class LocalSheetSource(object):
+    r"""
+    Reads rows from a tab separated file laid out like the sheet.
+
+    The range is ignored: the file holds the rows of one tab.
+    """
+
+
+    def __init__(self, filename):
+        r"""
+        Arguments:
+          filename:   (str) The tab separated file.
+
+        """
+
+
+        self.filename = filename
+        self.cache_key = filename
+
+
+    def get_revision(self):
+
+        with open(self.filename, 'rb') as sheet_file:
+            return hashlib.sha1(sheet_file.read()).hexdigest()
+
+
+    def get_rows(self, range_name):
+
+        with open(self.filename, 'r') as sheet_file:
+            return [line.rstrip('\r\n').split('\t') for line in sheet_file
+                    if line.strip()]
+
+
+class SheetCache(object):
+    r"""
+    A local JSON snapshot of sheet rows, by sheet and range.
+    """
+
+
+    def __init__(self, filename=DEFAULT_CACHE_FILENAME):
+        r"""
+        Arguments:
+          filename:   (str) The JSON file holding the snapshots.
+
+        """
+
+
+        self.filename = filename
+
+        try:
+            with open(filename, 'r') as cache_file:
+                self.entries = json.load(cache_file)
+        except (IOError, ValueError):
+            self.entries = {}
+
+
+    def get(self, key):
+        r"""
+        Returns:
+        The snapshot {'revision', 'rows', 'checked'} for key, or None.
+        """
+
+
+        return self.entries.get(key, None)
+
+
+    def put(self, key, revision, rows, checked):
+        r"""
+        Stores a snapshot and writes the cache file.
+        """
+
+
+        self.entries[key] = {'revision': revision, 'rows': rows,
+                             'checked': checked}
+
+        with open(self.filename, 'w') as cache_file:
+            json.dump(self.entries, cache_file)
+
+
+def get_sheet_rows(source, range_name, cache,
+                   max_age_seconds=DEFAULT_MAX_AGE_SECONDS, clock=time.time):
+    r"""
+    Gets the rows of a range, from the cache whenever it is still valid.
+
+    Arguments:
+      source:   (GoogleSheetSource or LocalSheetSource) Where the rows live.
+
+      range_name:   (str) The range in A1 notation.
+
+      cache:   (SheetCache) The local snapshots.
+
+      max_age_seconds:   (float) A snapshot checked more recently than this
+        is used without contacting the sheet.
+
+      clock:   (function) Returns the current time in seconds.
+
+    Returns:
+    A list of rows. Raises the source's error if the sheet cannot be reached
+    and there is no snapshot.
+    """
+
+
+    key = "%s|%s" % (source.cache_key, range_name)
+    cached = cache.get(key)
+    now = clock()
+
+    if cached is not None and now - cached['checked'] < max_age_seconds:
+        return cached['rows']
+
+    try:
+        revision = source.get_revision()
+
+    except Exception as error:  # the client libraries raise many types
+
+        # The rows may still be readable, just not compared with the snapshot
+        print("get_sheet_rows: cannot check the sheet's revision (%s), "
+              "downloading it" % error)
+        revision = None
+
+    try:
+        if (cached is not None and revision is not None and
+              cached['revision'] == revision):
+            rows = cached['rows']
+        else:
+            rows = source.get_rows(range_name)
+
+    except Exception as error:
+
+        if cached is None:
+            raise
+
+        print("get_sheet_rows: sheet unavailable (%s), using the snapshot "
+              "from %s" % (error, time.ctime(cached['checked'])))
+        return cached['rows']
+
+    cache.put(key, revision, rows, now)
+
+    return rows
+
+
+def get_grader_assignments(source, range_name, cache, **kwargs):
+    r"""
+    Lists the students of every grader.
+
+    Arguments:
+      source:   (GoogleSheetSource or LocalSheetSource) Where the rows live.
+
+      range_name:   (str) The range in A1 notation, e.g. 'Assignment 3!A5:D'.
+
+      cache:   (SheetCache) The local snapshots.
+
+      kwargs:   Passed to get_sheet_rows.
+
+    Returns:
+    A dict grader -> list of GT usernames, in the order of the sheet. Graders
+    written with a different case or surrounding spaces are merged under the
+    first spelling.
+    """
+
+
+    assignments = {}
+    spellings = {}
+
+    for row in get_sheet_rows(source, range_name, cache, **kwargs):
+
+        if len(row) <= max(USERNAME_COLUMN, GRADER_COLUMN):
+            continue
+
+        username = row[USERNAME_COLUMN].strip()
+        grader = row[GRADER_COLUMN].strip()
+
+        if not username or not grader:
+            continue
+
+        grader = spellings.setdefault(grader.lower(), grader)
+        assignments.setdefault(grader, []).append(username)
+
+    return assignments
+
+
+def get_grader_whitelist(source, range_name, grader, cache, **kwargs):
+    r"""
+    Lists the students assigned to a grader.
+
+    Arguments:
+      source:   (GoogleSheetSource or LocalSheetSource) Where the rows live.
+
+      range_name:   (str) The range in A1 notation, e.g. 'Assignment 3!A5:D'.
+
+      grader:   (str) The grader's name as written in the sheet. Case and
+        surrounding spaces are ignored.
+
+      cache:   (SheetCache) The local snapshots.
+
+      kwargs:   Passed to get_sheet_rows.
+
+    Returns:
+    A list of GT usernames.
+    """
+
+
+    grader = grader.strip().lower()
+
+    for name, usernames in get_grader_assignments(
+          source, range_name, cache, **kwargs).items():
+        if name.lower() == grader:
+            return usernames
+
+    return []
@@ -0,0 +1,389 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+r"""
+Keeps the traffic to the git host within what it will accept.
+
+The enterprise GitHub host throttles or rejects bursts of clones. Every
+network git command goes through a HostController, which:
+
+  * caps the request rate with a token bucket,
+  * retries transient failures with jittered exponential backoff,
+  * adapts the number of commands in flight with AIMD (additive increase,
+    multiplicative decrease): every success slowly raises the limit, every
+    transient failure or latency spike halves it.
+
+Latency spikes are judged against the typical latency of the same kind of
+command (a clone takes much longer than a fetch). Interactive commands are
+not timed at all, since they include someone typing a password.
+
+The controller is generic: it runs any callable and is told by the caller
+which results count as transient failures. is_transient_git_error holds the
+knowledge about git's error messages.
+
+There is one controller per host so that every Submissions object in a
+process shares the same budget; see get_host_controller.
+"""
+
+
+__all__ = ["HostController", "RateLimiter", "get_host_controller",
+           "is_transient_git_error", ]
+__author__ = "Travis Janssen, David Tran"
+__credits__ = ["Travis Janssen", "David Tran"]
+__status__ = "Production"
+__version__ = "1.0.0"
+
+
+import random
+import re
+import threading
+import time
+
+
+# Messages from git/curl that mean "try again later" rather than "this repo
+# or commit does not exist". "Could not resolve host" is left out: it is
+# almost always a mistyped host, which no amount of retrying fixes.
+TRANSIENT_ERROR_REGEX = re.compile(
+  r"(failed to connect|connection (timed out|reset|"
+  r"refused)|operation timed out|timed out|early eof|rpc failed|"
+  r"remote end hung up|returned error: (429|5[0-9]{2})|too many requests|"
+  r"rate limit|temporarily unavailable|service unavailable|"
+  r"gnutls|ssl_|tls connection)", re.IGNORECASE)
+
+
+def is_transient_git_error(error_output):
+    r"""
+    Checks if a failed git command is worth retrying.
+
+    Arguments:
+      error_output:   (str) What git printed to stderr.
+
+    Returns:
+    True if the failure looks like a network or throttling problem.
+    """
+
+
+    return TRANSIENT_ERROR_REGEX.search(error_output or "") is not None
+
+
+class RateLimiter(object):
+    r"""
+    A thread-safe token bucket.
+
+    Tokens are refilled at requests_per_second up to burst tokens; acquire
+    blocks until a token is available.
+    """
+
+
+    def __init__(self, requests_per_second, burst=None, clock=time.time,
+                 sleep=time.sleep):
+        r"""
+        Arguments:
+          requests_per_second:   (float) The sustained request rate. None or 0
+            disables the limit.
+
+          burst:   (int) How many requests may be sent back to back. Defaults
+            to one second worth of requests (at least 1).
+
+          clock:   (function) Returns the current time in seconds.
+
+          sleep:   (function) Waits for a number of seconds.
+
+        """
+
+
+        self.requests_per_second = requests_per_second
+        self.burst = burst or max(1, int(requests_per_second or 1))
+        self.clock = clock
+        self.sleep = sleep
+
+        self._tokens = float(self.burst)
+        self._last_refill = clock()
+        self._lock = threading.Lock()
+
+
+    def acquire(self):
+        r"""
+        Takes a token, waiting for one if needed.
+
+        Returns:
+        The number of seconds we waited.
+        """
+
+
+        if not self.requests_per_second:
+            return 0.0
+
+        with self._lock:
+
+            now = self.clock()
+            self._tokens = min(
+              self.burst,
+              self._tokens + (now - self._last_refill) * self.requests_per_second)
+            self._last_refill = now
+
+            # Reserve the token now, waiting for it to be refilled if we
+            # went below zero, so concurrent callers queue up fairly.
+            self._tokens -= 1
+            wait = max(0.0, -self._tokens / self.requests_per_second)
+
+        if wait > 0:
+            self.sleep(wait)
+
+        return wait
+
+
+class HostController(object):
+    r"""
+    Runs commands against one host within a rate limit and an adaptive
+    concurrency limit, retrying transient failures.
+    """
+
+
+    def __init__(self, requests_per_second=2.0, initial_concurrency=4,
+                 min_concurrency=1, max_concurrency=16, max_retries=4,
+                 backoff_base=1.0, backoff_max=60.0, latency_factor=3.0,
+                 clock=time.time, sleep=time.sleep, random_func=random.random):
+        r"""
+        Arguments:
+          requests_per_second:   (float) Cap on new commands per second.
+
+          initial_concurrency:   (int) Commands in flight before any feedback.
+
+          min_concurrency:   (int) The limit never drops below this.
+
+          max_concurrency:   (int) The limit never grows above this. This is
+            also the size callers should give their worker pools.
+
+          max_retries:   (int) How many times a transient failure is retried.
+
+          backoff_base:   (float) The first backoff ceiling, in seconds. It
+            doubles on every retry.
+
+          backoff_max:   (float) The largest backoff ceiling, in seconds.
+
+          latency_factor:   (float) A command slower than this many times the
+            typical latency counts as a sign of congestion.
+
+          clock, sleep, random_func:   Injected for testing.
+
+        """
+
+
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.latency_factor = latency_factor
+
+        self.clock = clock
+        self.sleep = sleep
+        self.random_func = random_func
+
+        self.rate_limiter = RateLimiter(requests_per_second, clock=clock,
+                                        sleep=sleep)
+
+        self.limit = float(max(min_concurrency,
+                               min(max_concurrency, initial_concurrency)))
+        self.latency_ewmas = {}  # operation -> typical latency in seconds
+        self.LATENCY_ALPHA = 0.2
+        self.MIN_LATENCY_SAMPLES = 5
+
+        self.stats = {'requests': 0, 'retries': 0, 'transient_failures': 0,
+                      'decreases': 0}
+
+        self._in_flight = 0
+        self._latency_samples = {}  # operation -> number of samples
+        self._last_decrease = None
+        self._condition = threading.Condition()
+
+
+    def run(self, func, is_transient, operation=None, interactive=False):
+        r"""
+        Runs func under the rate and concurrency limits, retrying it with
+        backoff while is_transient says the result is a transient failure.
+
+        Arguments:
+          func:   (function) Takes no arguments and returns a result.
+
+          is_transient:   (function) Takes func's result and returns True if
+            it is a transient failure that should be retried.
+
+          operation:   (str) The kind of command, e.g. 'clone' or 'fetch';
+            its latency is only compared with that of the same kind.
+
+          interactive:   (bool) func may wait for the user, so its latency
+            says nothing about the host and is not used.
+
+        Returns:
+        The last result of func.
+        """
+
+
+        attempt = 0
+
+        while True:
+
+            self._acquire_slot()
+
+            try:
+                self.rate_limiter.acquire()
+                start = self.clock()
+                result = func()
+                latency = self.clock() - start
+            finally:
+                self._release_slot()
+
+            with self._condition:
+                self.stats['requests'] += 1
+
+            if not is_transient(result):
+                if not interactive:
+                    self._on_completion(latency, operation)
+                return result
+
+            self._on_congestion(transient=True, operation=operation)
+
+            if attempt >= self.max_retries:
+                return result
+
+            attempt += 1
+            with self._condition:
+                self.stats['retries'] += 1
+
+            self.sleep(self.get_backoff(attempt))
+
+
+    def get_backoff(self, attempt):
+        r"""
+        Computes a "full jitter" backoff: a random wait between zero and an
+        exponentially growing ceiling, so retries from many workers spread
+        out instead of hitting the host together.
+
+        Arguments:
+          attempt:   (int) The retry number, starting at 1.
+
+        Returns:
+        The number of seconds to wait.
+        """
+
+
+        ceiling = min(self.backoff_max,
+                      self.backoff_base * (2 ** (attempt - 1)))
+
+        return self.random_func() * ceiling
+
+
+    def get_concurrency(self):
+        r"""
+        Returns:
+        The number of commands currently allowed in flight.
+        """
+
+
+        return int(self.limit)
+
+
+    def _acquire_slot(self):
+
+        with self._condition:
+
+            while self._in_flight >= int(self.limit):
+                self._condition.wait()
+
+            self._in_flight += 1
+
+
+    def _release_slot(self):
+
+        with self._condition:
+
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+
+    def _on_completion(self, latency, operation=None):
+        r"""
+        Feeds a latency sample of an operation back: a latency spike is
+        treated like congestion, anything else earns an additive increase.
+        """
+
+
+        with self._condition:
+
+            samples = self._latency_samples[operation] = (
+              self._latency_samples.get(operation, 0) + 1)
+            latency_ewma = self.latency_ewmas.get(operation)
+
+            is_slow = (samples > self.MIN_LATENCY_SAMPLES and
+                       latency > self.latency_factor * latency_ewma)
+
+            if not is_slow:
+
+                if latency_ewma is None:
+                    self.latency_ewmas[operation] = latency
+                else:
+                    self.latency_ewmas[operation] = latency_ewma + (
+                      self.LATENCY_ALPHA * (latency - latency_ewma))
+
+                # +1 per "round" of limit commands, like TCP congestion
+                # avoidance
+                self.limit = min(self.max_concurrency,
+                                 self.limit + 1.0 / self.limit)
+                self._condition.notify_all()
+
+        if is_slow:
+            self._on_congestion(transient=False, operation=operation)
+
+
+    def _on_congestion(self, transient, operation=None):
+        r"""
+        Halves the limit. Failures that land together (a burst rejected at
+        once) only count as one signal, so we wait about one typical
+        latency of the operation between decreases.
+        """
+
+
+        with self._condition:
+
+            if transient:
+                self.stats['transient_failures'] += 1
+
+            now = self.clock()
+            cooldown = max(1.0, self.latency_ewmas.get(operation) or 0.0)
+
+            if (self._last_decrease is not None and
+                  now - self._last_decrease < cooldown):
+                return
+
+            self._last_decrease = now
+            self.stats['decreases'] += 1
+            self.limit = max(self.min_concurrency, self.limit / 2.0)
+
+
+_HOST_CONTROLLERS = {}
+_HOST_CONTROLLERS_LOCK = threading.Lock()
+
+
+def get_host_controller(host, **kwargs):
+    r"""
+    Gets the shared controller for a host, creating it on first use.
+
+    Arguments:
+      host:   (str) The git host, e.g. Submissions.GIT_DOMAIN.
+
+      kwargs:   Passed to HostController when it is created.
+
+    Returns:
+    The HostController for the host.
+    """
+
+
+    with _HOST_CONTROLLERS_LOCK:
+
+        controller = _HOST_CONTROLLERS.get(host, None)
+
+        if controller is None:
+            controller = _HOST_CONTROLLERS[host] = HostController(**kwargs)
+
+    return controller
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+r"""
+An append-only journal of the students process_repos is done with.
+
+The records file is only written once every student is processed, so a run
+that dies half way (laptop asleep, VPN dropped, Ctrl-C on an authentication
+prompt) used to lose everything. process_repos now appends each student's
+record to a journal next to the records file as soon as it is done:
+
+    {"assignment": "Assignment 3", "deadline": "2018-09-02 12:05:00"}
+    {"folder": "...", "platform_id": "11111", "record": {...}}
+    {"folder": "...", "platform_id": "22222", "record": {...}}
+
+The first line says which run the journal belongs to. A run started with
+resume replays the journal of the same assignment and deadline and skips
+the students in it; any other run starts a new journal. The journal is
+removed once the records file is written, unless another run has written to
+it since (the records are saved in the background).
+
+A line cut short by a crash is ignored, so the worst case is processing that
+one student again.
+"""
+
+
+__all__ = ["Journal", "get_journal_filename", "read_journal", ]
+__author__ = "Travis Janssen, David Tran"
+__credits__ = ["Travis Janssen", "David Tran"]
+__status__ = "Production"
+__version__ = "1.0.0"
+
+
+from collections import OrderedDict
+import json
+import os
+
+
+def get_journal_filename(records_filename):
+    r"""
+    Arguments:
+      records_filename:   (str) The records file, e.g. 'student_records.json'.
+
+    Returns:
+    The journal of that records file, e.g. 'student_records.journal'.
+    """
+
+
+    return os.path.splitext(records_filename)[0] + '.journal'
+
+
+def read_journal(filename, header):
+    r"""
+    Arguments:
+      filename:   (str) The journal file.
+
+      header:   (dict) The first line the journal must have to belong to
+        this run.
+
+    Returns:
+    An OrderedDict submission folder -> (platform_id, record) of the students
+    in the journal, empty if there is no journal for this run.
+    """
+
+
+    entries = OrderedDict()
+
+    try:
+        with open(filename, 'r') as journal_file:
+            lines = journal_file.read().splitlines()
+    except IOError:
+        return entries
+
+    try:
+        if not lines or json.loads(lines[0]) != header:
+            return entries
+    except ValueError:
+        return entries
+
+    for line in lines[1:]:
+
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            # Cut short by a crash
+            continue
+
+        entries[entry['folder']] = (entry['platform_id'], entry['record'])
+
+    return entries
+
+
+class Journal(object):
+    r"""
+    The journal of one process_repos run.
+    """
+
+
+    def __init__(self, filename, header, resume=False):
+        r"""
+        Arguments:
+          filename:   (str) The journal file.
+
+          header:   (dict) Identifies the run, e.g. the assignment and the
+            deadline; a journal with another header is never resumed.
+
+          resume:   (bool) Keep the students of a journal of this run. If
+            False, or if there is no such journal, a new one is started.
+
+        """
+
+
+        self.filename = filename
+        self._written = None  # the file as this run last left it
+        self.entries = read_journal(filename, header) if resume else OrderedDict()
+
+        if self.entries:
+            self._file = open(filename, 'a')
+
+            # Ends a line cut short by a crash, so the next one stays whole
+            self._file.write('\n')
+            self._sync()
+
+        else:
+            self._file = open(filename, 'w')
+            self._write(header)
+
+
+    def append(self, folder, platform_id, record):
+        r"""
+        Adds a processed student; it is on disk when this returns.
+
+        Arguments:
+          folder:   (str) The student's submission folder.
+
+          platform_id:   (str) The student's platform ID.
+
+          record:   (dict) The student's updated record.
+
+        """
+
+
+        self._write({'folder': folder, 'platform_id': platform_id,
+                     'record': record})
+
+
+    def close(self):
+        r"""
+        Closes the file, keeping the journal for a later resume.
+        """
+
+
+        if not self._file.closed:
+            self._file.close()
+
+
+    def remove(self):
+        r"""
+        Closes and deletes the journal, once its students are saved. A
+        journal another run has started or resumed since is kept.
+        """
+
+
+        self.close()
+
+        try:
+            if _get_identity(os.stat(self.filename)) == self._written:
+                os.remove(self.filename)
+        except OSError:
+            pass
+
+
+    def _write(self, line_dict):
+
+        self._file.write(json.dumps(line_dict) + '\n')
+        self._sync()
+
+
+    def _sync(self):
+
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._written = _get_identity(os.fstat(self._file.fileno()))
+
+
+def _get_identity(stat_result):
+
+    return (stat_result.st_dev, stat_result.st_ino, stat_result.st_size,
+            stat_result.st_mtime)
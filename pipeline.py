@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+r"""
+A staged pipeline of worker threads with bounded queues between the stages.
+
+process_repos handles every student in steps that wait on different things:
+reading the submission (disk), syncing the repo (network), verifying the
+commit and comparing timestamps (local git). Running them as a pipeline
+lets the steps of different students overlap, so the disk and CPU keep
+working while repos download, and the network keeps working during
+checkouts:
+
+    items -> [stage 1] -> queue -> [stage 2] -> queue -> ... -> sink
+
+Every stage has its own number of worker threads, and every queue holds at
+most queue_size items, so a slow stage holds the earlier ones back instead of
+letting work pile up in memory. The sink runs on the calling thread, one
+item at a time, so it can update shared records without locking.
+
+Items may finish in a different order than they were given.
+"""
+
+
+__all__ = ["Pipeline", "Stage", ]
+__author__ = "Travis Janssen, David Tran"
+__credits__ = ["Travis Janssen", "David Tran"]
+__status__ = "Production"
+__version__ = "1.0.0"
+
+
+from collections import namedtuple
+import threading
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+
+# func is called with one item and returns the item for the next stage
+Stage = namedtuple('Stage', ['name', 'func', 'workers'])
+
+# Marks the end of the items in a queue
+_DONE = object()
+
+
+class Pipeline(object):
+    r"""
+    Runs items through stages of worker threads.
+    """
+
+
+    def __init__(self, stages, queue_size=16):
+        r"""
+        Arguments:
+          stages:   (list of Stage) The stages, in order.
+
+          queue_size:   (int) How many items may wait between two stages.
+
+        """
+
+
+        self.stages = stages
+        self.queue_size = queue_size
+
+        self._lock = threading.Lock()
+        self._errors = []
+
+
+    def run(self, items, sink):
+        r"""
+        Pushes items through the stages and hands each result to sink.
+
+        An item whose stage raises is dropped and the other items carry on;
+        the first error is raised once every item went through.
+
+        Arguments:
+          items:   (iterable) The items to process. It is consumed lazily.
+
+          sink:   (function) Called on the calling thread with each item
+            that went through every stage.
+
+        """
+
+
+        queues = [queue.Queue(maxsize=self.queue_size)
+                  for _ in range(len(self.stages) + 1)]
+        threads = [threading.Thread(target=self._feed, args=(items, queues[0]),
+                                    name="pipeline feed")]
+
+        for index, stage in enumerate(self.stages):
+
+            # The last worker of a stage to finish tells the next stage
+            remaining = [stage.workers]
+            next_workers = (self.stages[index + 1].workers
+                            if index + 1 < len(self.stages) else 1)
+
+            for number in range(stage.workers):
+                threads.append(threading.Thread(
+                  target=self._work,
+                  args=(stage, queues[index], queues[index + 1], remaining,
+                        next_workers),
+                  name="pipeline %s %d" % (stage.name, number)))
+
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        while True:
+
+            item = queues[-1].get()
+
+            if item is _DONE:
+                break
+
+            try:
+                sink(item)
+            except Exception as error:
+                self._add_error(error)
+
+        for thread in threads:
+            thread.join()
+
+        if self._errors:
+            raise self._errors[0]
+
+
+    def _feed(self, items, output_queue):
+
+        try:
+            for item in items:
+                output_queue.put(item)
+        except Exception as error:
+            self._add_error(error)
+        finally:
+            for _ in range(self.stages[0].workers if self.stages else 1):
+                output_queue.put(_DONE)
+
+
+    def _work(self, stage, input_queue, output_queue, remaining, next_workers):
+
+        while True:
+
+            item = input_queue.get()
+
+            if item is _DONE:
+                break
+
+            try:
+                output_queue.put(stage.func(item))
+            except Exception as error:
+                self._add_error(error)
+
+        with self._lock:
+            remaining[0] -= 1
+            is_last = not remaining[0]
+
+        if is_last:
+            for _ in range(next_workers):
+                output_queue.put(_DONE)
+
+
+    def _add_error(self, error):
+
+        with self._lock:
+            self._errors.append(error)
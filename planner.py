@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+r"""
+Estimates what a run will cost before it starts.
+
+Submissions.plan_repos works out what process_repos would do (clones,
+pulls, checkouts, submission reads) from the local files only. This module
+turns that into an estimate of the time and download size, from the
+timings of past runs kept in the repo cache index (the last clone, pull and
+checkout of every repo, see Submissions._execute_tracked_command and
+_checkout_assignment):
+
+  * a repo is expected to take as long as last time; repos without history
+    take the median of the class,
+  * without any history, DEFAULT_SECONDS are used and the size is unknown,
+  * the network part is limited by the requests per second and the number
+    of concurrent requests of the host controller, the checkouts by the
+    verify workers; the pipeline overlaps both, so the slower one counts.
+
+It is a rough guide, not a promise: a busy GitHub or a student who just
+committed a 200MB dataset will not show up in it.
+
+The same predictions order the work of process_repos, slowest first (see
+Submissions._order_student_jobs).
+"""
+
+
+__all__ = ["estimate_plan", "format_plan", "get_past_timings",
+           "predict_repo_seconds", "predict_seconds", ]
+__author__ = "Travis Janssen, David Tran"
+__credits__ = ["Travis Janssen", "David Tran"]
+__status__ = "Production"
+__version__ = "1.0.0"
+
+
+from progress import format_bytes, format_seconds
+
+
+DEFAULT_SECONDS = {'clone': 10.0, 'pull': 2.0, 'checkout': 0.5}
+RESTORE_SECONDS = 1.0  # cloning a local bundle
+
+# Network requests per repo action: a clone (or restore) is followed by a pull
+REQUESTS = {'clone': 2, 'restore': 1, 'pull': 1, 'local': 0}
+
+
+def _median(values):
+
+    values = sorted(values)
+
+    if not values:
+        return None
+
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+
+    return (values[middle - 1] + values[middle]) / 2.0
+
+
+def get_past_timings(entries):
+    r"""
+    Arguments:
+      entries:   (list of dict) The repo cache index entries.
+
+    Returns:
+    A dict 'clone'/'pull'/'checkout' -> dict with 'count' (how many repos
+    recorded one), 'seconds' and 'bytes' (the medians, None without
+    history).
+    """
+
+
+    timings = {}
+
+    for fetch_type in ['clone', 'pull', 'checkout']:
+
+        seconds = [entry['%s_seconds' % fetch_type] for entry in entries
+                   if entry.get('%s_seconds' % fetch_type) is not None]
+
+        timings[fetch_type] = {
+          'count': len(seconds),
+          'seconds': _median(seconds),
+          'bytes': _median([entry['%s_bytes' % fetch_type] for entry in entries
+                            if entry.get('%s_bytes' % fetch_type) is not None]),
+        }
+
+    return timings
+
+
+def predict_seconds(operation, entry, timings):
+    r"""
+    Arguments:
+      operation:   (str) 'clone', 'pull' or 'checkout'.
+
+      entry:   (dict) The repo's cache index entry.
+
+      timings:   (dict) The result of get_past_timings.
+
+    Returns:
+    How long the operation should take on the repo: as long as last time,
+    else the class median, else DEFAULT_SECONDS.
+    """
+
+
+    own_seconds = entry.get('%s_seconds' % operation)
+    if own_seconds is not None:
+        return own_seconds
+
+    if timings[operation]['seconds'] is not None:
+        return timings[operation]['seconds']
+
+    return DEFAULT_SECONDS[operation]
+
+
+def predict_repo_seconds(action, entry, timings):
+    r"""
+    Arguments:
+      action:   (str) What happens to the repo: 'clone', 'restore', 'pull' or
+        'local', as in Submissions.plan_repos.
+
+      entry:   (dict) The repo's cache index entry.
+
+      timings:   (dict) The result of get_past_timings.
+
+    Returns:
+    How long syncing the repo should take.
+    """
+
+
+    if action == 'local':
+        return 0.0
+
+    seconds = predict_seconds('pull', entry, timings)
+
+    if action == 'clone':
+        seconds += predict_seconds('clone', entry, timings)
+    elif action == 'restore':
+        seconds += RESTORE_SECONDS
+
+    return seconds
+
+
+def estimate_plan(plan, entries, requests_per_second, max_concurrency,
+                  checkout_workers):
+    r"""
+    Arguments:
+      plan:   (dict) The result of Submissions.plan_repos.
+
+      entries:   (dict) repo name -> repo cache index entry.
+
+      requests_per_second:   (float) The host controller's rate limit.
+
+      max_concurrency:   (int) The host controller's concurrent requests.
+
+      checkout_workers:   (int) The verify workers of the pipeline.
+
+    Returns:
+    A dict with 'requests', 'seconds' and 'bytes' (None if there is no
+    history to estimate it from).
+    """
+
+
+    timings = get_past_timings(list(entries.values()))
+
+    requests, fetch_seconds, total_bytes = 0, 0.0, 0
+    has_bytes = True
+
+    for repo_name, action in plan['repos'].items():
+
+        requests += REQUESTS[action]
+        fetch_seconds += predict_repo_seconds(
+          action, entries.get(repo_name, {}), timings)
+
+        if action == 'local':
+            continue
+
+        for fetch_type in (['clone', 'pull'] if action == 'clone' else ['pull']):
+            if timings[fetch_type]['bytes'] is None:
+                has_bytes = False
+            else:
+                total_bytes += timings[fetch_type]['bytes']
+
+    network_seconds = max(requests / float(requests_per_second),
+                          fetch_seconds / max(1, max_concurrency))
+    checkout_seconds = (plan['checkouts'] *
+                        predict_seconds('checkout', {}, timings) /
+                        max(1, checkout_workers))
+
+    return {'requests': requests,
+            'seconds': max(network_seconds, checkout_seconds),
+            'bytes': total_bytes if has_bytes else None}
+
+
+def format_plan(assignment_code, plan, estimate, timings):
+    r"""
+    Arguments:
+      assignment_code:   (str) The assignment.
+
+      plan:   (dict) The result of Submissions.plan_repos.
+
+      estimate:   (dict) The result of estimate_plan.
+
+      timings:   (dict) The result of get_past_timings.
+
+    Returns:
+    The plan as a string.
+    """
+
+
+    actions = list(plan['repos'].values())
+
+    def describe(fetch_type):
+        timing = timings[fetch_type]
+        if not timing['count']:
+            return "no history, ~%.0fs each assumed" % DEFAULT_SECONDS[fetch_type]
+        return "~%.1fs%s each, from %d past %ss" % (
+          timing['seconds'] or 0,
+          ", %s" % format_bytes(timing['bytes']) if timing['bytes'] is not None else "",
+          timing['count'], fetch_type)
+
+    str_buffer = [
+      "PLAN for %s (dry run, nothing was fetched or changed):" % assignment_code,
+      "\tsubmission reads: %d of %d in the whitelist, from %s" % (
+        plan['students'], plan['whitelist'], plan['submission_folder']),
+      "\trepos: %d" % len(actions),
+      "\t\tclone: %d (%s)" % (actions.count('clone'), describe('clone')),
+      "\t\trestore from bundle, then pull: %d" % actions.count('restore'),
+      "\t\tpull: %d (%s)" % (actions.count('pull'), describe('pull')),
+      "\t\tlocal only: %d" % actions.count('local'),
+      "\tcheckouts: %d (%d already checked out, %d submissions without a "
+      "commit)" % (plan['checkouts'], plan['checked_out'],
+                   plan['students'] - plan['commits']),
+      "\testimate: ~%s, %d git requests, %s downloaded" % (
+        format_seconds(estimate['seconds']), estimate['requests'],
+        "~%s" % format_bytes(estimate['bytes'])
+        if estimate['bytes'] is not None else "unknown size"),
+    ]
+
+    return "\n".join(str_buffer)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+r"""
+Warms the student repos in the hours before a deadline.
+
+Most of the network cost of a grading run is the clone or pull of every
+repo right after the deadline. Fetching the whole roster periodically while
+the deadline approaches means the post-deadline process_repos run only has to
+pull the last few commits of each repo.
+
+The fetches are spread over a window before the deadline. Students push most
+right before the deadline, so the interval between fetches shrinks as the
+deadline gets closer: it is a fixed fraction of the time remaining, bounded
+by a minimum and a maximum interval.
+
+See download_submission.parse_main (--prefetch) for the command line entry.
+"""
+
+
+__all__ = ["get_prefetch_interval", "get_prefetch_schedule", "run_prefetch", ]
+__author__ = "Travis Janssen, David Tran"
+__credits__ = ["Travis Janssen", "David Tran"]
+__status__ = "Production"
+__version__ = "1.0.0"
+
+
+from datetime import datetime, timedelta
+import time
+
+
+DATETIME_PATTERN = '%Y-%m-%d %H:%M:%S'
+
+DEFAULT_WINDOW_HOURS = 12
+DEFAULT_TAPER_RATIO = 0.25
+DEFAULT_MIN_INTERVAL = timedelta(minutes=10)
+DEFAULT_MAX_INTERVAL = timedelta(hours=2)
+
+
+def get_prefetch_interval(time_remaining, taper_ratio=DEFAULT_TAPER_RATIO,
+                          min_interval=DEFAULT_MIN_INTERVAL,
+                          max_interval=DEFAULT_MAX_INTERVAL):
+    r"""
+    Computes how long to wait before the next fetch.
+
+    Arguments:
+      time_remaining:   (timedelta) The time left until the deadline.
+
+      taper_ratio:   (float) The fraction of the remaining time we wait.
+
+      min_interval:   (timedelta) The shortest wait allowed, so the host is
+        not hammered right before the deadline.
+
+      max_interval:   (timedelta) The longest wait allowed.
+
+    Returns:
+    The wait as a timedelta.
+    """
+
+
+    interval = timedelta(
+      seconds=time_remaining.total_seconds() * taper_ratio)
+
+    return max(min_interval, min(max_interval, interval))
+
+
+def get_prefetch_schedule(deadline, now=None,
+                          window_hours=DEFAULT_WINDOW_HOURS, **kwargs):
+    r"""
+    Lists the times at which the roster will be fetched.
+
+    Arguments:
+      deadline:   (str) This is the deadline of the assignment in UTC, in
+        the format 'YYYY-MM-DD HH:MM:SS'.
+
+      now:   (datetime) The current UTC time. Defaults to datetime.utcnow().
+
+      window_hours:   (float) How many hours before the deadline we start
+        fetching.
+
+      kwargs:   Passed to get_prefetch_interval.
+
+    Returns:
+    A list of UTC datetimes, strictly before the deadline.
+    """
+
+
+    deadline = datetime.strptime(deadline, DATETIME_PATTERN)
+
+    if now is None:
+        now = datetime.utcnow()
+
+    fetch_time = max(now, deadline - timedelta(hours=window_hours))
+    schedule = []
+
+    while fetch_time < deadline:
+        schedule.append(fetch_time)
+        fetch_time += get_prefetch_interval(deadline - fetch_time, **kwargs)
+
+    return schedule
+
+
+def run_prefetch(submissions, deadline, student_whitelist=None,
+                 window_hours=DEFAULT_WINDOW_HOURS, sleep=time.sleep,
+                 **kwargs):
+    r"""
+    Fetches the roster on the tapering schedule until the deadline passes.
+
+    The next fetch is scheduled from when the previous one finished, so a
+    slow fetch never causes runs to pile up.
+
+    Arguments:
+      submissions:   (Submissions) The backend used to fetch the repos.
+
+      deadline:   (str) This is the deadline of the assignment in UTC, in
+        the format 'YYYY-MM-DD HH:MM:SS'.
+
+      student_whitelist:   (list of str) The students (or teams) to fetch.
+        None fetches the whole roster.
+
+      window_hours:   (float) How many hours before the deadline we start
+        fetching.
+
+      sleep:   (function) Called with a number of seconds to wait.
+
+      kwargs:   Passed to get_prefetch_interval.
+
+    Returns:
+    The number of fetch rounds that were run.
+    """
+
+
+    deadline_time = datetime.strptime(deadline, DATETIME_PATTERN)
+    window_start = deadline_time - timedelta(hours=window_hours)
+    rounds = 0
+
+    wait = (window_start - datetime.utcnow()).total_seconds()
+    if wait > 0:
+        print("run_prefetch: waiting until %s UTC to start fetching" %
+              window_start.strftime(DATETIME_PATTERN))
+        sleep(wait)
+
+    while datetime.utcnow() < deadline_time:
+
+        rounds += 1
+        print("run_prefetch: round %d at %s UTC" % (
+          rounds, datetime.utcnow().strftime(DATETIME_PATTERN)))
+
+        submissions.prefetch_repos(student_whitelist=student_whitelist)
+
+        now = datetime.utcnow()
+        next_time = now + get_prefetch_interval(deadline_time - now, **kwargs)
+
+        if next_time >= deadline_time:
+            break
+
+        sleep((next_time - now).total_seconds())
+
+    print("run_prefetch: done after %d rounds" % rounds)
+
+    return rounds
@@ -13,25 +13,184 @@ TODO:
 """
 
 
-__all__ = ["Submissions", ] # Controls what can be imported
+__all__ = ["Submissions", "wait_for_pending_writes", ] # Controls what can be imported
 __author__ = "Travis Janssen, David Tran"
 __credits__ = ["Travis Janssen", "David Tran"]
 __status__ = "Production"
 __version__ = "1.0.0"
 
 
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+import functools
 import inspect
 import json
 import itertools
 import os
 import platform
 import re
+import shutil
+import signal
 import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from build_runner import (BuildCache, BuildRunner, STATUS_PASSED,
+                          format_build_result)
+from host_controller import get_host_controller, is_transient_git_error
+from journal import Journal, get_journal_filename
+from pipeline import Pipeline, Stage
+import planner
+from progress import NullProgress, ProgressReporter
+from repo_cache import RepoCache, count_objects
+from result_set import ResultSet, StudentResult
+import roster
+from submission_source import FolderSource, open_submission_source
 
 import logging
 logger = logging.getLogger(__name__)
 
+# The outcome of a shell command whose error output we need to inspect
+CommandResult = namedtuple('CommandResult', ['returncode', 'output', 'error_output',
+                                             'timed_out', 'seconds'])
+
+# Records files being written in the background, by filename
+_pending_writes = {}
+_pending_writes_lock = threading.Lock()
+
+
+def wait_for_pending_writes(filename=None):
+    r"""
+    Waits for the records files written in the background to be on disk.
+
+    Arguments:
+      filename:   (str) Only wait for this file. None waits for all of them.
+
+    """
+
+
+    with _pending_writes_lock:
+        if filename is None:
+            threads = list(_pending_writes.values())
+        else:
+            threads = [_pending_writes.get(filename, None)]
+
+    for thread in threads:
+        if thread is not None:
+            thread.join()
+
+
+def _write_json_file(filename, file_dict):
+    r"""
+    Writes a dictionary as JSON atomically: readers, and a run that dies
+    half way, see the old file or the new one, never a part of it.
+
+    Arguments:
+      filename:   (str) The name of the file we will write.
+
+      file_dict:   (dict) The data to write, or the JSON text of it.
+
+    """
+
+
+    temp_fd, temp_filename = tempfile.mkstemp(
+      dir=os.path.dirname(os.path.abspath(filename)),
+      prefix=os.path.basename(filename) + '.', suffix='.tmp')
+
+    try:
+        with os.fdopen(temp_fd, 'w') as output_file:
+            if isinstance(file_dict, dict):
+                json.dump(file_dict, output_file)
+            else:
+                output_file.write(file_dict)
+            output_file.flush()
+            os.fsync(output_file.fileno())
+
+        # os.rename does not replace an existing file on Windows
+        getattr(os, 'replace', os.rename)(temp_filename, filename)
+
+    except BaseException:
+        os.remove(temp_filename)
+        raise
+
+def _run_command(command, timeout_seconds=None, env=None, capture_errors=True):
+    r"""
+    Runs a shell command under a watchdog: once timeout_seconds are up, the
+    command and everything it started are killed.
+
+    Arguments:
+      command:   (str) The shell command, or a list of arguments to run
+        without a shell (nothing to quote, the same on every OS).
+
+      timeout_seconds:   (float) The time limit, None for no limit. Without
+        a limit the command keeps the terminal, so git can prompt on it.
+
+      env:   (dict) The environment, the current one if None.
+
+      capture_errors:   (bool) Capture the error output instead of letting
+        it through to the console.
+
+    Returns:
+    A CommandResult; output and error_output are bytes (error_output is None
+    if not captured), seconds is how long the command ran.
+    """
+
+
+    # A new session gets the whole process group killed on a timeout, but
+    # loses the terminal, so only commands with a limit get one
+    new_session = bool(timeout_seconds) and os.name == 'posix'
+
+    # preexec_fn is not safe with threads (the pipeline runs commands from
+    # several), start_new_session is; Python 2 only has the former
+    if not new_session:
+        session_kwargs = {}
+    elif sys.version_info[0] >= 3:
+        session_kwargs = {'start_new_session': True}
+    else:
+        session_kwargs = {'preexec_fn': os.setsid}
+
+    start_time = time.time()
+    process = subprocess.Popen(
+      command, shell=not isinstance(command, list), env=env,
+      stdout=subprocess.PIPE,
+      stderr=subprocess.PIPE if capture_errors else None, **session_kwargs)
+
+    timed_out = []
+    timer = None
+
+    if timeout_seconds:
+        timer = threading.Timer(timeout_seconds, _kill_command,
+                                [process, new_session, timed_out])
+        timer.daemon = True
+        timer.start()
+
+    try:
+        output, error_output = process.communicate()
+    finally:
+        if timer is not None:
+            timer.cancel()
+
+    return CommandResult(returncode=process.returncode, output=output,
+                         error_output=error_output, timed_out=bool(timed_out),
+                         seconds=time.time() - start_time)
+
+
+def _kill_command(process, new_session, timed_out):
+
+    timed_out.append(True)
+
+    try:
+        if new_session:
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except OSError:
+        pass  # already gone
+
 class Submissions(object):
     r"""
     The purpose of this class is to download and process students' submissions.
@@ -76,16 +235,47 @@ class Submissions(object):
         self.TIMESTAMP_FILENAME = 'timestamp.txt'
 
         self.MAIN_REPO_DIR = 'student_repo'
+        self.WORKTREE_DIR = 'worktrees'  # in MAIN_REPO_DIR
+        self.GIT_REQUESTS_PER_SECOND = 2.0
+
+        # Every git command is killed after this many seconds, by operation
+        # ('local' for the commands that do not fetch), so one stalled
+        # transfer cannot hold up the run. Transfers also give up when they
+        # stay under GIT_LOW_SPEED_LIMIT bytes per second for
+        # GIT_LOW_SPEED_SECONDS. Students hit by either get STR_TIMEOUT.
+        self.GIT_TIMEOUT_SECONDS = {'clone': 15 * 60, 'pull': 10 * 60,
+                                    'fetch': 10 * 60, 'local': 5 * 60}
+        self.GIT_LOW_SPEED_LIMIT = 1000
+        self.GIT_LOW_SPEED_SECONDS = 60
+        self.SHOW_PROGRESS = True
+
+        # Worker threads per process_repos stage (see _gen_pipeline) and how
+        # many students may wait between two stages. None for 'sync' follows
+        # the host controller, None for 'build' the build processes.
+        self.PIPELINE_WORKERS = {'parse': 2, 'sync': None, 'verify': 4,
+                                 'compare': 4, 'build': None}
+        self.PIPELINE_QUEUE_SIZE = 16
+
+        # Builds of the graded commits, when process_repos gets a command
+        self.BUILD_CACHE_FILENAME = 'build_cache.json'
+        self.BUILD_TIMEOUT_SECONDS = 10 * 60
+        self.BUILD_WORKERS = None  # processes, None for the number of CPUs
+
+        # process_repos starts with the slowest repos; the predicted time of
+        # a priority student (e.g. the grader's own) is multiplied by this
+        self.PRIORITY_BOOST = 10.0
         self.PLATFORM = edtech_platform
         self.PLATFORMS_VALID = ["CANVAS", "TSQUARE"]
         self.ENCODING = "utf-8"
 
         # Stored to be used in later logic, so typos between copies don't exist
+        self.STR_FAILED = "Failed"
         self.STR_INVALID = "Invalid"
         self.STR_LATE = "Late"
         self.STR_MISSING = "Missing"
         self.STR_NA = "N/A"
         self.STR_OK = "Ok"
+        self.STR_TIMEOUT = "Timeout"
         self.BAD_STR_LIST = [self.STR_INVALID, self.STR_MISSING]
 
         # Actual non-constant attributes
@@ -94,6 +284,20 @@ class Submissions(object):
         self.cached_file_dicts = {}  # Cache dictionary pulls
         self.cached_teams_pulled = set() # Cache pulled teams
 
+        # Where submission files are read from; replaced by a ZipSource
+        # while a bulk download ZIP is processed
+        self.submission_source = FolderSource()
+
+        # Replaced by a ProgressReporter while a run is tracked
+        self.progress = NullProgress()
+
+        # Shared by every Submissions object talking to the same host
+        self.host_controller = get_host_controller(
+          self.GIT_DOMAIN, requests_per_second=self.GIT_REQUESTS_PER_SECOND)
+
+        # Tracks repo use so cold repos can be evicted into bundles
+        self.repo_cache = RepoCache(self.MAIN_REPO_DIR)
+
         self.OS_TYPE = platform.system()
 
         self.is_team = is_team
@@ -101,19 +305,24 @@ class Submissions(object):
 
 
     def process_repos(self, submission_folder_name,
-                      assignment_code, deadline, student_whitelist=None, should_pull=True):
+                      assignment_code, deadline, student_whitelist=None, should_pull=True,
+                      results=None, build_command=None,
+                      priority_students=None, resume=False, cancel=None,
+                      pipeline_workers=None, sparse_paths=None):
         """
         This is the core function that will automate the download of
         student submissions.
 
-        There is a sister function called _process_team_repos that focuses
-        on teams that is executed after this code. The logic contained
-        here mostly applies to both set of submissions.
+        For team assignments each member's submission is processed like an
+        individual one, and the team's repo is set to the team's most recent
+        commit as soon as its last member is done (see _resolve_team_commit).
 
         Arguments:
           submission_folder_name:   (str) This is the directory for all
-            submissions that we will download. This must exist and will throw
-            an IOError if it does not exist.
+            submissions that we will download. This may also be the bulk
+            download ZIP itself (or the directory name with the ZIP next to
+            it as '<name>.zip'), which is read without extracting it. One of
+            them must exist, otherwise we will throw an IOError.
 
           assignment_code:   (str) This is the two letter name for the
             assignment.
@@ -129,64 +338,474 @@ class Submissions(object):
             in the list will not be ignored. If set to None or empty list,
             we will grab all students.
 
+          results:   (ResultSet) Receives each student's record as soon as
+            it is processed, so generate_report can run in another thread
+            while we work. A new one is made if None.
+
+          build_command:   (str) If set, this shell command (e.g.
+            './gradlew test') is run on every valid commit and the result is
+            stored as 'Build' in the student's record; see build_runner.
+
+          priority_students:   (list of str) Students (or teams) to process
+            ahead of their turn, e.g. the grader's own on a full-class run;
+            see _order_student_jobs.
+
+          resume:   (bool) Continue an interrupted run of this assignment:
+            the students in its journal keep their results and are not
+            processed again; see journal.
+
+          cancel:   (threading.Event) Once set, no more students are
+            started. The students in progress are finished; the records file
+            is not written, but the journal is kept to resume from.
+
+          pipeline_workers:   (dict) Stage name -> worker threads, replacing
+            those of PIPELINE_WORKERS for this run.
+
+          sparse_paths:   (list of str) If set, the assignment's worktrees
+            only check out these directories of the repo (e.g.
+            ['Assignment4']); see _checkout_assignment.
+
+        Returns:
+        The ResultSet, closed. The records file is written in the background;
+        see wait_for_pending_writes.
         """
 
 
-        result = re.match(self.REGEX_PATTERN, deadline)
-        if result is None:
-            str_buffer = (
-              "%s: input deadline is not a properly formatted ISO 8601 date\n"
-              "Please enter it as 'YYYY-MM-DDTHH:MM:SS'\n"
-              "Don't forget to convert that to UTC time has Python 2.X does "
-              " not natively support it."
-            )
-            print(str_buffer % inspect.currentframe().f_code.co_name)
+        if results is None:
+            results = ResultSet()
 
-            return
+        build_runner = None
+        journal = None
 
+        try:
+            result = re.match(self.REGEX_PATTERN, deadline)
+            if result is None:
+                str_buffer = (
+                  "%s: input deadline is not a properly formatted ISO 8601 date\n"
+                  "Please enter it as 'YYYY-MM-DDTHH:MM:SS'\n"
+                  "Don't forget to convert that to UTC time has Python 2.X does "
+                  " not natively support it."
+                )
+                print(str_buffer % inspect.currentframe().f_code.co_name)
 
-        assignment_alias = submission_folder_name.split('/')[-1]
+                return results
 
-        if not os.path.isdir(self.MAIN_REPO_DIR):
-            os.makedirs(self.MAIN_REPO_DIR)
 
-        if not os.path.isdir(submission_folder_name):
+            if not os.path.isdir(self.MAIN_REPO_DIR):
+                os.makedirs(self.MAIN_REPO_DIR)
 
-            raise IOError(
-              ("%s: Submission folder name '%s' not found. "
-               "Please download this from %s before continuing. "
-               "Exiting.") %
-              (inspect.currentframe().f_code.co_name, submission_folder_name, self.PLATFORM.capitalize()))
+            try:
+                self.submission_source, submission_folder_name = (
+                  open_submission_source(submission_folder_name))
 
+            except IOError:
 
-        # Guarantee that we will process something if we have an empty list
-        if not student_whitelist:
+                raise IOError(
+                  ("%s: Submission folder name '%s' not found. "
+                   "Please download this from %s before continuing. "
+                   "Exiting.") %
+                  (inspect.currentframe().f_code.co_name, submission_folder_name, self.PLATFORM.capitalize()))
+
+            assignment_alias = submission_folder_name.split('/')[-1]
+
+
+            # Guarantee that we will process something if we have an empty list
+            if not student_whitelist:
+                student_whitelist = self.get_roster() # Get all students
+
+
+            team_records = team_members = student_aliases = None
 
             if self.is_team:
-                student_aliases = self._get_file_dict(filename=self.TEAM_MEMBERS_FILENAME, caller_name=inspect.currentframe().f_code.co_name)
-            else:
-                student_aliases = self._get_file_dict(
-                  filename=self.STUDENT_ALIAS_FILENAME,
+                team_records = self._get_file_dict(
+                  filename=self.TEAM_RECORDS_FILENAME,
                   caller_name=inspect.currentframe().f_code.co_name)
+                team_members = self._get_file_dict(
+                    filename = self.TEAM_MEMBERS_FILENAME,
+                    caller_name=inspect.currentframe().f_code.co_name)
+                student_aliases = self._get_file_dict(
+                    filename=self.STUDENT_ALIAS_FILENAME,
+                    caller_name=inspect.currentframe().f_code.co_name)
 
-            student_whitelist = student_aliases.keys() # Get all students
+            # The records (and journal) of an earlier run of this object may
+            # still be being saved
+            wait_for_pending_writes(self.STUDENT_RECORDS_FILENAME)
 
+            student_records = self._get_file_dict(
+              filename=self.STUDENT_RECORDS_FILENAME,
+              caller_name=inspect.currentframe().f_code.co_name,
+              epilog="Run create_student_json first.")
 
-        if self.is_team:
-            team_records = self._get_file_dict(
-              filename=self.TEAM_RECORDS_FILENAME,
-              caller_name=inspect.currentframe().f_code.co_name)
-            team_members = self._get_file_dict(
-                filename = self.TEAM_MEMBERS_FILENAME,
-                caller_name=inspect.currentframe().f_code.co_name)
-            student_aliases = self._get_file_dict(
-                filename=self.STUDENT_ALIAS_FILENAME,
-                caller_name=inspect.currentframe().f_code.co_name)
 
-        student_records = self._get_file_dict(
-          filename=self.STUDENT_RECORDS_FILENAME,
-          caller_name=inspect.currentframe().f_code.co_name,
-          epilog="Run create_student_json first.")
+            student_jobs = self._get_student_jobs(
+              submission_folder_name=submission_folder_name,
+              assignment_code=assignment_code,
+              student_whitelist=student_whitelist,
+              student_records=student_records,
+              team_records=team_records, team_members=team_members,
+              student_aliases=student_aliases)
+
+            # Every student done is journaled, so an interrupted run can
+            # resume where it stopped
+            journal_filename = get_journal_filename(self.STUDENT_RECORDS_FILENAME)
+
+            if not resume and os.path.isfile(journal_filename):
+                print("%s: replacing the journal of an interrupted run in "
+                      "'%s' (resume to continue it instead)" % (
+                        inspect.currentframe().f_code.co_name,
+                        journal_filename))
+
+            journal = Journal(
+              filename=journal_filename,
+              header={'assignment': assignment_alias, 'deadline': deadline},
+              resume=resume)
+
+            if journal.entries:
+
+                for platform_id, student_record in journal.entries.values():
+                    student_records[platform_id] = student_record
+
+                student_jobs = [job for job in student_jobs
+                                if job[0] not in journal.entries]
+
+                print("%s: resuming, %d done before, %d left" % (
+                  inspect.currentframe().f_code.co_name,
+                  len(journal.entries), len(student_jobs)))
+
+            elif resume:
+                print("%s: nothing to resume for '%s', starting over" % (
+                  inspect.currentframe().f_code.co_name, assignment_code))
+
+            student_jobs = self._order_student_jobs(
+              student_jobs=student_jobs, should_pull=should_pull,
+              priority_students=priority_students)
+
+
+            # Reports may now read the records; the students below are
+            # published one by one as they are done
+            results.start(student_records=student_records,
+                          pending_ids=[job[1] for job in student_jobs])
+
+            for platform_id, student_record in journal.entries.values():
+                results.put(platform_id, student_record)
+
+            # Teams still waiting for members in this pass, and their commits
+            team_pending, team_commits = {}, {}
+
+            if (self.is_team and
+                  not self._should_process_team_submissions(assignment_code)):
+                team_pending, team_commits = self._init_team_commits(
+                  student_jobs=student_jobs, teams=student_whitelist,
+                  team_records=team_records, team_members=team_members,
+                  student_aliases=student_aliases, student_records=student_records,
+                  assignment_alias=assignment_alias)
+
+
+            # Every student goes through the stages of _gen_pipeline; the
+            # results are recorded here, on this thread, as they come out.
+            # NOTE: You'll need to authenticate with Github here and
+            # debuggers may not work properly
+            run = {
+              'submission_folder_name': submission_folder_name,
+              'assignment_alias': assignment_alias,
+              'assignment_code': assignment_code,
+              'deadline': deadline,
+              'should_pull': should_pull,
+              'lock': threading.Lock(),
+              'repo_syncs': {},  # repo suffix -> (threading.Event, [status])
+              'repo_locks': {},  # repo suffix -> threading.Lock
+              'checked_out': {},  # repo suffix -> commit in the worktree
+              'build_runner': None,
+              'pipeline_workers': pipeline_workers or {},
+              'sparse_paths': sparse_paths,
+            }
+
+            if build_command:
+                build_runner = run['build_runner'] = BuildRunner(
+                  command=build_command,
+                  cache=BuildCache(self.BUILD_CACHE_FILENAME),
+                  timeout_seconds=self.BUILD_TIMEOUT_SECONDS,
+                  max_workers=self.BUILD_WORKERS)
+
+            def record(job):
+
+                (folder, platform_id, current_student, gt_username,
+                 student_name) = job
+                current_assignment = current_student[assignment_alias]
+
+                # Save Result
+                if self._should_process_team_submissions(assignment_code) and platform_id != '-1':
+                    # save records for team on the submitters record; we need to pull this from existing records since team submissions don't need it
+                    current_student['gt_id'] = student_records[platform_id]['gt_id']
+                    current_student['name'] = student_records[platform_id]['name']
+
+                student_records[platform_id] = current_student
+                journal.append(folder, platform_id, current_student)
+                results.put(platform_id, current_student)
+
+                # Once a team's last member is done, its repo is set to the
+                # most recent commit right away
+                team = team_records[gt_username] if team_pending else None
+
+                if team in team_pending:
+
+                    self._add_team_commit(
+                      commit_list=team_commits[team],
+                      current_assignment=current_assignment)
+
+                    team_pending[team] -= 1
+
+                    if not team_pending[team]:
+                        del team_pending[team]
+                        self._resolve_team_commit(
+                          team=team, commit_list=team_commits[team],
+                          assignment_code=assignment_code,
+                          checked_out_commit=run['checked_out'].get(team),
+                          sparse_paths=sparse_paths)
+
+                self.progress.advance()
+
+            with self._track_progress(
+              label=inspect.currentframe().f_code.co_name,
+              total=len(student_jobs)):
+
+                # The first repo (the quickest, see _order_student_jobs) is
+                # synced on its own so an authentication prompt happens once
+                # and the credential helper can cache the answer for the rest;
+                # the others may not prompt
+                if student_jobs:
+                    self._sync_repo_once(gt_username=student_jobs[0][3], run=run,
+                                         interactive=True)
+
+                # Stops handing out students once cancelled
+                self._gen_pipeline(run).run(
+                  itertools.takewhile(
+                    lambda job: cancel is None or not cancel.is_set(),
+                    student_jobs),
+                  sink=record)
+
+            print("%s: synced %d repos with %s (%d requests, %d retries, "
+                  "concurrency now %d)" % (
+                    inspect.currentframe().f_code.co_name,
+                    len(run['repo_syncs']), self.GIT_DOMAIN,
+                    self.host_controller.stats['requests'],
+                    self.host_controller.stats['retries'],
+                    self.host_controller.get_concurrency()))
+
+            if cancel is not None and cancel.is_set():
+                self.repo_cache.save()
+                print("%s: cancelled for '%s'; resume to process the other "
+                      "students" % (inspect.currentframe().f_code.co_name,
+                                    assignment_code))
+                return results
+
+            # Teams without any member submission in this run
+            for team in sorted(team_pending):
+                self._resolve_team_commit(
+                  team=team, commit_list=team_commits[team],
+                  assignment_code=assignment_code, sparse_paths=sparse_paths)
+
+            if student_records is not None:
+
+                # Save info, without holding up the report; the journal
+                # goes once the records are on disk
+                journal.close()
+                self._save_json_file_async(self.STUDENT_RECORDS_FILENAME,
+                                           student_records,
+                                           on_saved=journal.remove)
+
+            self.repo_cache.save()
+
+            print("\n\n>>>>>%s: complete for '%s'<<<<<\n\n" %
+                  (inspect.currentframe().f_code.co_name, assignment_code))
+
+        finally:
+            if build_runner is not None:
+                build_runner.close()
+
+            if journal is not None:
+                journal.close()
+
+            self.submission_source.close()
+            self.submission_source = FolderSource()
+
+            # Never leave a generate_report waiting for results
+            results.close()
+
+        return results
+
+
+    def iter_results(self, submission_folder_name, assignment_code, deadline,
+                     student_whitelist=None, should_pull=True,
+                     build_command=None, priority_students=None, resume=False,
+                     pipeline_workers=None, cancel=None, results=None,
+                     sparse_paths=None):
+        r"""
+        Runs process_repos in a background thread and yields each student's
+        result as soon as it is done, e.g.:
+
+            for result in submissions.iter_results('./submissions/A3', 'A3',
+                                                   '2018-09-02 12:05:00'):
+                if not result.commit_valid:
+                    print(result.gt_username)
+
+        Leaving the loop early (break, an error, Ctrl-C) cancels the run:
+        the students in progress are finished and the journal is kept, so a
+        later run can resume. The records file is written as by
+        process_repos once every student is done.
+
+        Arguments:
+          submission_folder_name, assignment_code, deadline,
+          student_whitelist, should_pull, build_command, priority_students,
+          resume, sparse_paths:   As for process_repos.
+
+          pipeline_workers:   (dict) Stage name -> worker threads for this
+            run, e.g. {'sync': 4, 'build': 2}; see _gen_pipeline.
+
+          cancel:   (threading.Event) Set it (from any thread) to stop
+            starting students; the iteration ends after the ones in
+            progress.
+
+          results:   (ResultSet) Also receives the records, e.g. for a
+            generate_report in another thread. A new one is made if None.
+
+        Returns:
+        A generator of result_set.StudentResult, in the order the students
+        are done. The error of a failed run is raised at its end.
+        """
+
+
+        if results is None:
+            results = ResultSet()
+
+        if cancel is None:
+            cancel = threading.Event()
+
+        assignment_alias = None
+        errors = []
+
+        def process():
+            try:
+                self.process_repos(
+                  submission_folder_name=submission_folder_name,
+                  assignment_code=assignment_code, deadline=deadline,
+                  student_whitelist=student_whitelist, should_pull=should_pull,
+                  results=results, build_command=build_command,
+                  priority_students=priority_students, resume=resume,
+                  cancel=cancel, pipeline_workers=pipeline_workers,
+                  sparse_paths=sparse_paths)
+            except Exception as error:
+                errors.append(error)
+
+        thread = threading.Thread(target=process, name="iter_results")
+        thread.daemon = True
+        thread.start()
+
+        is_done = False
+
+        try:
+            for platform_id, student_record in results.iter_completed():
+
+                # The assignment is stored under the submission folder name
+                if assignment_alias is None:
+                    assignment_alias = self._get_assignment_alias(
+                      submission_folder_name)
+
+                yield self._get_student_result(platform_id, student_record,
+                                               assignment_alias)
+
+            is_done = True
+
+        finally:
+            # The caller stopped early
+            if not is_done:
+                cancel.set()
+
+            thread.join()
+
+        if errors:
+            raise errors[0]
+
+
+    def _get_assignment_alias(self, submission_folder_name):
+        r"""
+        Arguments:
+          submission_folder_name:   (str) As for process_repos.
+
+        Returns:
+        The name results are stored under in the student records, as
+        process_repos picks it.
+        """
+
+
+        source, submission_folder_name = open_submission_source(
+          submission_folder_name)
+        source.close()
+
+        return submission_folder_name.split('/')[-1]
+
+
+    def _get_student_result(self, platform_id, student_record,
+                            assignment_alias):
+        r"""
+        Arguments:
+          platform_id:   (str) The student's platform ID.
+
+          student_record:   (dict) The student's record.
+
+          assignment_alias:   (str) The assignment name results are stored
+            under.
+
+        Returns:
+        The StudentResult of the student.
+        """
+
+
+        result = student_record.get(assignment_alias, {})
+        commit_id = result.get('commitID')
+
+        return StudentResult(
+          platform_id=platform_id,
+          gt_username=student_record.get('gt_id'),
+          name=student_record.get('name'),
+          commit_id=(commit_id if self._is_commit_present(commit_status=commit_id)
+                     else None),
+          commit_valid=result.get('commitID valid') is True,
+          is_late=self.STR_LATE in [result.get('Submission Time'),
+                                    result.get('Submission GitHub')],
+          repo_sync=result.get('Repo Sync'),
+          build=result.get('Build'),
+          result=result,
+          record=student_record)
+
+
+    def _get_student_jobs(self, submission_folder_name, assignment_code,
+                          student_whitelist, student_records,
+                          team_records=None, team_members=None,
+                          student_aliases=None):
+        r"""
+        Lists the students process_repos will work on, from the submission
+        folders.
+
+        Arguments:
+          submission_folder_name:   (str) The submission folder, read through
+            self.submission_source.
+
+          assignment_code:   (str) This is the two letter name for the
+            assignment.
+
+          student_whitelist:   (list of str) The students (or teams) to
+            process.
+
+          student_records:   (dict) The student records.
+
+          team_records, team_members, student_aliases:   (dict) The team
+            files, for team assignments only.
+
+        Returns:
+        A list of (folder, platform_id, current_student, gt_username,
+        student_name) tuples.
+        """
 
 
         # TSQUARE VERSION
@@ -196,6 +815,8 @@ class Submissions(object):
           assignment_code=assignment_code)
 
 
+        student_jobs = []
+
         for folder in directory_listing:
             """
             need 4 bits of information before processing the submission: 
@@ -227,369 +848,1426 @@ class Submissions(object):
                    ):
                     continue
 
-            # Checking repeated results on calls to simplify them
-            base_directory = self._get_submission_folder(submission_folder_name, folder)
-            current_assignment = current_student[assignment_alias] = {}
+            student_jobs.append(
+              (folder, platform_id, current_student, gt_username, student_name))
 
-            current_submission_file = self._get_submission_file_name(student_name, platform_id)
+        return student_jobs
 
-            # TODO: These methods below should be combined together?
 
-            # Update submission text
-            self._check_submission_file(
-              current_assignment=current_assignment,
-              base_directory=base_directory,
-              submission_file=current_submission_file,
-              student_name=student_name,
-              platform_id=platform_id)
+    def _order_student_jobs(self, student_jobs, should_pull=True,
+                            priority_students=None):
+        r"""
+        Orders the jobs of process_repos longest first, so the slow repos
+        start early instead of holding up the end of the run.
 
-            # Update t-square timestamp
-            self._set_timestamp_t_square(
-              current_assignment=current_assignment,
-              base_directory=base_directory)
+        The time of a job is predicted from the repo cache index (see
+        planner.predict_repo_seconds): its sync, as long as that repo's
+        last clone or pull took (or the class median), plus its checkout.
+        The time of a priority student counts PRIORITY_BOOST times.
 
-            # Clone repo if needed
-            # NOTE: You'll need to authenticate with Github here and
-            # debuggers may not work properly
-            self._setup_student_repo(gt_username=gt_username, should_pull=should_pull)
+        The quickest job still goes first: process_repos syncs the first
+        repo on its own for the authentication prompt, and nothing should
+        wait on it long.
 
-            # Only check commit ID validity with GitHub timestamp
-            if self._is_commit_present(
-              commit_status=current_assignment['commitID']):
+        Arguments:
+          student_jobs:   (list of tuple) As returned by _get_student_jobs.
 
-                # Try to check out commit ID
-                self._check_commitID(
-                  current_assignment=current_assignment,
-                  assignment_code=assignment_code,
-                  gt_username=gt_username)
+          should_pull:   (bool) As for process_repos.
 
-                self._compare_timestamp_github(
-                  current_assignment=current_assignment,
-                  gt_username=gt_username, deadline=deadline)
+          priority_students:   (list of str) Students (or teams) whose jobs
+            are boosted.
 
-            # Check T-Square timestamp against deadline
-            self._compare_timestamp_t_square(
-              current_assignment=current_assignment,
-              deadline=deadline)
+        Returns:
+        The jobs, as a new list.
+        """
+
+
+        if len(student_jobs) < 2:
+            return list(student_jobs)
+
+        entries = self.repo_cache.get_entries()
+        timings = planner.get_past_timings(list(entries.values()))
+        priority_students = set(priority_students or [])
+
+        team_records = {}
+        if self.is_team:
+            team_records = self._get_file_dict(
+              filename=self.TEAM_RECORDS_FILENAME,
+              caller_name=inspect.currentframe().f_code.co_name)
 
-            # Reset the repo ptr to master if needed
-            #repo_suffix = self._get_correct_reference_id(
-            #  graded_id=gt_username)
-            #self._execute_command(
-            #  'cd %s; git checkout master &> /dev/null' %
-            #  self._gen_prefixed_dir(prefix_str=repo_suffix))
+        def get_cost(job):
 
-            # Save Result
-            if self._should_process_team_submissions(assignment_code) and platform_id != '-1':
-                # save records for team on the submitters record; we need to pull this from existing records since team submissions don't need it
-                current_student['gt_id'] = student_records[platform_id]['gt_id']
-                current_student['name'] = student_records[platform_id]['name']
+            gt_username = job[3]
 
-            student_records[platform_id] = current_student
+            # As _get_correct_reference_id, without its error: the pipeline
+            # reports students without a team
+            repo_suffix = gt_username
+            if self.is_team and gt_username.find("Team") != 0:
+                repo_suffix = team_records.get(gt_username)
 
+            if repo_suffix is None:
+                return 0.0
 
-        if student_records is not None:
+            entry = entries.get(self._get_repo_name(repo_suffix), {})
 
-            # Save info
-            with open(self.STUDENT_RECORDS_FILENAME, 'w') as output_file:
-                json.dump(student_records, output_file)
+            seconds = (
+              planner.predict_repo_seconds(
+                self._get_repo_action(repo_suffix, should_pull), entry,
+                timings) +
+              planner.predict_seconds('checkout', entry, timings))
 
-        if self.is_team and student_whitelist:
-            self._process_team_repos(
-              assignment_alias=assignment_alias,
-              assignment_code=assignment_code,
-              student_whitelist=student_whitelist)
+            if gt_username in priority_students or repo_suffix in priority_students:
+                seconds *= self.PRIORITY_BOOST
+
+            return seconds
+
+        costs = [get_cost(job) for job in student_jobs]
+
+        # sorted is stable, so equal jobs keep the folder order
+        order = sorted(range(len(student_jobs)), key=lambda index: -costs[index])
+        order.insert(0, order.pop())
 
+        return [student_jobs[index] for index in order]
 
-        print("\n\n>>>>>%s: complete for '%s'<<<<<\n\n" %
-              (inspect.currentframe().f_code.co_name, assignment_code))
 
+    def _init_team_commits(self, student_jobs, teams, team_records,
+                           team_members, student_aliases, student_records,
+                           assignment_alias):
+        r"""
+        Prepares the team commit resolution of process_repos.
+
+        Arguments:
+          student_jobs:   (list of tuple) The members processed in this pass,
+            as built by process_repos.
+
+          teams:   (list of str) The teams of the whitelist.
+
+          team_records:   (dict) GT username -> team.
+
+          team_members:   (dict) team -> list of GT usernames.
+
+          student_aliases:   (dict) GT username -> platform ID.
+
+          student_records:   (dict) platform ID -> student record.
+
+          assignment_alias:   (str) The assignment name results are stored
+            under.
+
+        Returns:
+        A tuple of dictionaries (team_pending, team_commits): how many members
+        of each team are processed in this pass, and the commits already
+        known for each team, i.e. the stored results of the members without
+        a submission in this pass.
+        """
+
+
+        team_pending = dict((team, 0) for team in teams)
+        job_members = set()
+
+        for job in student_jobs:
+            gt_username = job[3]
+            job_members.add(gt_username)
+            team = team_records[gt_username]
+            team_pending[team] = team_pending.get(team, 0) + 1
+
+        team_commits = {}
+
+        for team in team_pending:
+
+            commit_list = team_commits[team] = []
+
+            for gt_username in team_members.get(team, []):
+
+                if gt_username in job_members:
+                    continue
+
+                try:
+                    current_assignment = (
+                      student_records[student_aliases[gt_username]][assignment_alias])
+                except KeyError:
+                    continue
+
+                self._add_team_commit(commit_list=commit_list,
+                                      current_assignment=current_assignment)
+
+        return team_pending, team_commits
+
+
+    def _add_team_commit(self, commit_list, current_assignment):
+        r"""
+        Adds a member's commit to the team's candidates if it can be used.
+
+        Arguments:
+          commit_list:   (list of tuple) The team's (timestamp, commitID)
+            candidates.
+
+          current_assignment:   (dict) The member's result.
 
-    def _process_team_repos(self, assignment_alias, assignment_code,
-                            student_whitelist):
         """
-        This is the extension process_repos that focuses only on teams.
-        As such this should only be called on team repos.
+
+
+        commitID = current_assignment.get('commitID', self.STR_MISSING)
+        commit_time = current_assignment.get('Timestamp GitHub', self.STR_NA)
+
+        if (self._is_commit_present(commit_status=commitID) and
+              commit_time != self.STR_NA and
+              current_assignment.get('commitID valid', True)):
+
+            commit_list.append((commit_time, commitID))
+
+
+    def _resolve_team_commit(self, team, commit_list, assignment_code,
+                             checked_out_commit=None, sparse_paths=None):
+        r"""
+        Checks out and tags the most recent commit of a team.
 
         Arguments:
-          assignment_alias:   (str) This is the name of the assignment, i.e.
-            the submission name.
+          team:   (str) The team, which is also its repo suffix.
+
+          commit_list:   (list of tuple) The team's (timestamp, commitID)
+            candidates.
 
           assignment_code:   (str) This is the two letter name for the
             assignment.
 
-          student_whitelist:   (list of str) This is the list of student
-            username IDs that we will whitelist. That is to say all students
-            in the list will not be ignored. If set to None or empty list,
-            we will grab all students.
+          checked_out_commit:   (str) The commit the team's worktree is on
+            already, if known; it is not checked out again.
+
+          sparse_paths:   (list of str) Only check out these directories.
 
         """
 
 
-        student_aliases = self._get_file_dict(
-          filename=self.STUDENT_ALIAS_FILENAME,
-          caller_name=inspect.currentframe().f_code.co_name)
+        if not commit_list:
+            print("%s: No valid commit for team '%s'!" % (
+              inspect.currentframe().f_code.co_name, team))
+            return
 
+        # The timestamps are ISO formatted so the most recent sorts last
+        _, most_recent_commit = max(commit_list)
 
-        student_records = self._get_file_dict(
-          filename=self.STUDENT_RECORDS_FILENAME,
-          caller_name=inspect.currentframe().f_code.co_name,
-          epilog="Run _create_student_json first.")
+        if most_recent_commit == checked_out_commit:
+            return
 
-        team_records = self._get_file_dict(
-          filename=self.TEAM_MEMBERS_FILENAME,
-          caller_name=inspect.currentframe().f_code.co_name)
+        with self.progress.operation(team, 'checkout'):
+            _ = self._checkout_assignment(
+              repo_suffix=team, commit=most_recent_commit,
+              assignment_code=assignment_code, sparse_paths=sparse_paths)
+
+
+    def generate_report(self, assignment, student_list=None,
+                        report_filename=None, results=None, console=None):
+        r"""
+        This generates the final report that can be used by a grader.
+
+        The result is outputted to a file (report_filename) and to stdout.
+
+        Arguments:
+          assignment:   (str) This is the name of the assignment we are
+            comparing against.
+
+          student_list:   (list of str) This is a list of students that we
+            will analyze and prints the results.
+
+          report_filename:   (str) This is the filename of the report will
+            generate, in addition to stdout. To disable this feature, pass in
+            None.
+
+          results:   (ResultSet) The records handed over by process_repos,
+            instead of reading the records file. When process_repos is still
+            running in another thread, each student is reported as soon as
+            it is done. Nothing is reported if process_repos failed before
+            publishing its records.
+
+          console:   (file) Where the report is shown besides the file,
+            stderr if None.
+
+        Returns:
+        A file, if set, with the results and the output to stdout.
+        """
+
+
+        student_aliases = self._get_file_dict(
+          filename=self.STUDENT_ALIAS_FILENAME,
+          caller_name=inspect.currentframe().f_code.co_name)
+
+        if results is None:
+
+            student_records = self._get_file_dict(
+              filename=self.STUDENT_RECORDS_FILENAME,
+              caller_name=inspect.currentframe().f_code.co_name,
+              epilog="Run process_repos first.")
+
+            get_student_info = student_records.get
+
+        elif results.wait_started():
+
+            get_student_info = results.get
+
+        else:
+
+            return
+
+
+        bad_commit, late_github, late_submission, missing, not_in_json = [], [], [], [], []
+        sync_failed, build_failed, timed_out = [], [], []
+        has_builds = False
+
+        _init_log(log_filename=report_filename, stream=console)
+        logger.info("Report: %s\n", assignment)
+
+        if self.is_team:
+
+            team_records = self._get_file_dict(
+              filename=self.TEAM_MEMBERS_FILENAME,
+              caller_name=inspect.currentframe().f_code.co_name)
+
+            new_student_list = []
+
+            if student_list == None:
+                student_list = self._get_file_dict(filename=self.TEAM_MEMBERS_FILENAME, caller_name=inspect.currentframe().f_code.co_name).keys()
+
+            for team in student_list:
+
+                members_list = team_records[team]
+
+                new_student_list.append(team)
+                new_student_list.extend(members_list)
+
+            student_list = new_student_list
+
+        elif not student_list:
+
+            student_list = student_aliases.keys() # Get all students
+
+        #else:
+          # We are passed a fixed set of students and this is not a team.
+
+        # Parse the student list for bad elements
+        stripped_list = map(str.strip, map(str, student_list))
+        final_list = list(filter(bool, stripped_list))
+
+        # This is a filter to get bad students in different spots
+        bad_student_dict = {
+          'Submission GitHub': (self.STR_LATE, late_github),
+          'Submission Time': (self.STR_LATE, late_submission),
+          'commitID': (self.STR_MISSING, missing),
+          'commitID valid': (False, bad_commit),
+          'Repo Sync': (self.STR_FAILED, sync_failed),
+        }
+
+        not_in_json = []  # bad_student_dict assumes a student was found; this will track students not in JSON files
+
+        for student in final_list:
+
+            if self.is_team and 'Team' in student:
+                logger.info("\n========== %s ==========", student)
+                continue
+
+            # Waits while the student is still being processed
+            student_info = None
+            if student in student_aliases:
+                student_info = get_student_info(student_aliases[student])
+
+            logger.info(student)
+
+            if student_info is None:
+                if self.is_team:
+                    continue
+                else:
+                    not_in_json.append(student)
+                    logger.info("\tMissing in JSON files")
+                    continue
+
+            if assignment not in student_info:
+
+                logger.info('\tNo records found')
+                missing.append(student)
+                continue
+
+            student_info_assignment = student_info[assignment]
+
+            for key in sorted(student_info_assignment.keys(), reverse=True):
+
+                student_info_assignment_value = student_info_assignment[key]
+
+                if key == 'Build':
+                    self._log_build_result(student, student_info_assignment_value,
+                                           build_failed)
+                    has_builds = True
+                    continue
+
+                logger.info('\t%s: %s', key, student_info_assignment_value)
+
+                # git was killed (see GIT_TIMEOUT_SECONDS): the repo or the
+                # commit may well be fine, so it is not reported as bad
+                if (key in ['Repo Sync', 'Checkout'] and
+                      student_info_assignment_value == self.STR_TIMEOUT):
+                    if student not in timed_out:
+                        timed_out.append(student)
+                    continue
+
+                if (key == 'commitID valid' and
+                      student_info_assignment.get('Checkout') == self.STR_TIMEOUT):
+                    continue
+
+                try:
+                    target_value, target_list = bad_student_dict[key]
+                    if target_value == student_info_assignment_value:
+                        target_list.append(student)
+
+                except KeyError:
+                    pass
+
+
+        logger.info("\n========== RESULTS ==========")
+        str_buffer = ["\nLATE SUBMISSIONS:"]
+        for fmt_str, data in [("\tSubmission (%d): %s", late_submission),
+                              ("\tGitHub (%d): %s", late_github),
+                              ("\nMISSING SUBMISSIONS (%s): %s", missing),
+                              ("\nBAD COMMITS (%s):\n\t%s", bad_commit),
+                              ("\nREPO SYNC FAILURES (%s):\n\t%s", sync_failed),
+                              ("\nGIT TIMEOUTS (%s):\n\t%s", timed_out),
+                              ("MISSING FROM JSON (%s):\n\t%s", not_in_json)]:
+
+            str_buffer.append(fmt_str % (len(data), ", ".join(data)))
+
+        if has_builds:
+            str_buffer.append("BUILD FAILURES (%s):\n\t%s" % (
+              len(build_failed), ", ".join(build_failed)))
+
+        logger.info("\n".join(str_buffer))
+
+
+    def _log_build_result(self, student, build_result, build_failed):
+        r"""
+        Reports a student's build: the summary, and the end of the log if it
+        did not pass.
+
+        Arguments:
+          student:   (str) The student.
+
+          build_result:   (dict) The 'Build' entry of the assignment record.
+
+          build_failed:   (list of str) Gets the student if the build did not
+            pass.
+
+        """
+
+
+        logger.info('\tBuild: %s', format_build_result(build_result))
+
+        if build_result['status'] != STATUS_PASSED:
+            build_failed.append(student)
+
+            for line in build_result['log_tail'].splitlines():
+                logger.info('\t\t%s', line)
+
+
+    def plan_repos(self, submission_folder_name, assignment_code,
+                   student_whitelist=None, should_pull=True):
+        r"""
+        Works out what process_repos would do, without doing it: the
+        submissions and the local repos are only read, nothing is fetched,
+        checked out or written.
+
+        Arguments:
+          submission_folder_name:   (str) As for process_repos.
+
+          assignment_code:   (str) This is the two letter name for the
+            assignment.
+
+          student_whitelist:   (list of str) As for process_repos.
+
+          should_pull:   (bool) As for process_repos.
+
+        Returns:
+        A dict with
+          'submission_folder': the folder (or ZIP) the submissions are read
+            from,
+          'whitelist': how many students (or teams) were asked for,
+          'students': how many of them have a submission,
+          'commits': how many submissions name a commit,
+          'repos': repo name -> 'clone', 'restore' (from its bundle), 'pull'
+            or 'local',
+          'checkouts': how many of the commits have to be checked out,
+          'checked_out': how many are in their worktree already.
+        """
+
+
+        source, submission_folder_name = open_submission_source(
+          submission_folder_name)
+
+        if not student_whitelist:
+            student_whitelist = self.get_roster()
+
+        team_records = team_members = student_aliases = None
+
+        if self.is_team:
+            team_records = self._get_file_dict(
+              filename=self.TEAM_RECORDS_FILENAME,
+              caller_name=inspect.currentframe().f_code.co_name)
+            team_members = self._get_file_dict(
+              filename=self.TEAM_MEMBERS_FILENAME,
+              caller_name=inspect.currentframe().f_code.co_name)
+            student_aliases = self._get_file_dict(
+              filename=self.STUDENT_ALIAS_FILENAME,
+              caller_name=inspect.currentframe().f_code.co_name)
+
+        student_records = self._get_file_dict(
+          filename=self.STUDENT_RECORDS_FILENAME,
+          caller_name=inspect.currentframe().f_code.co_name,
+          epilog="Run create_student_json first.")
+
+        plan = {'submission_folder': getattr(source, 'zip_filename',
+                                             submission_folder_name),
+                'whitelist': len(student_whitelist),
+                'students': 0, 'commits': 0, 'repos': {}, 'checkouts': 0,
+                'checked_out': 0}
+
+        old_source, self.submission_source = self.submission_source, source
+
+        try:
+            student_jobs = self._get_student_jobs(
+              submission_folder_name=submission_folder_name,
+              assignment_code=assignment_code,
+              student_whitelist=student_whitelist,
+              student_records=student_records, team_records=team_records,
+              team_members=team_members, student_aliases=student_aliases)
+
+            for (folder, platform_id, _, gt_username,
+                 student_name) in student_jobs:
+
+                plan['students'] += 1
+
+                # A scratch record: the real one is left alone
+                current_assignment = {}
+                self._check_submission_file(
+                  current_assignment=current_assignment,
+                  base_directory=self._get_submission_folder(
+                    submission_folder_name, folder),
+                  submission_file=self._get_submission_file_name(
+                    student_name, platform_id),
+                  student_name=student_name,
+                  platform_id=platform_id)
+
+                repo_suffix = self._get_correct_reference_id(
+                  graded_id=gt_username)
+
+                if repo_suffix is None:
+                    continue
+
+                repo_name = self._get_repo_name(repo_suffix)
+
+                if repo_name not in plan['repos']:
+                    plan['repos'][repo_name] = self._get_repo_action(
+                      repo_suffix, should_pull)
+
+                commit = current_assignment['commitID']
+
+                if not self._is_commit_present(commit_status=commit):
+                    continue
+
+                plan['commits'] += 1
+
+                if self._read_worktree_commit(
+                  repo_suffix, assignment_code) == commit.lower():
+                    plan['checked_out'] += 1
+                else:
+                    plan['checkouts'] += 1
+
+        finally:
+            source.close()
+            self.submission_source = old_source
+
+        return plan
+
+
+    def _get_repo_action(self, repo_suffix, should_pull=True):
+        r"""
+        Arguments:
+          repo_suffix:   (str) The student ID or team ID of the repo.
+
+          should_pull:   (bool) As for process_repos.
+
+        Returns:
+        What syncing the repo takes: 'restore' (from its bundle), 'clone',
+        'pull' or 'local' (nothing).
+        """
+
+
+        if self.repo_cache.is_evicted(self._get_repo_name(repo_suffix)):
+            return 'restore'
+
+        if not os.path.isdir(self._gen_prefixed_dir(repo_suffix)):
+            return 'clone'
+
+        if should_pull and self.should_pull_repo_flag:
+            return 'pull'
+
+        return 'local'
+
+
+    def _read_worktree_commit(self, repo_suffix, assignment_code):
+        r"""
+        Reads the commit checked out in an assignment worktree from its files,
+        without running git.
+
+        Arguments:
+          repo_suffix:   (str) The student ID or team ID of the repo.
+
+          assignment_code:   (str) This is the two letter name for the
+            assignment.
+
+        Returns:
+        The commit SHA, or None if there is no detached worktree.
+        """
+
+
+        git_dir = self._read_worktree_git_dir(repo_suffix, assignment_code)
+
+        try:
+            with open(os.path.join(git_dir, 'HEAD'), 'r') as head_file:
+                head = head_file.read().strip()
+
+        except (IOError, OSError, TypeError):
+            return None
+
+        return None if head.startswith('ref:') else head.lower()
+
+
+    def _read_worktree_git_dir(self, repo_suffix, assignment_code):
+        r"""
+        Arguments:
+          repo_suffix:   (str) The student ID or team ID of the repo.
+
+          assignment_code:   (str) This is the two letter name for the
+            assignment.
+
+        Returns:
+        The admin directory of the assignment worktree in the clone's .git
+        (its HEAD, index, config.worktree), or None if there is no worktree.
+        """
+
+
+        worktree_dir = self._gen_worktree_dir(repo_suffix, assignment_code)
+
+        try:
+            # A worktree's .git file reads 'gitdir: <its admin directory>'
+            with open(os.path.join(worktree_dir, '.git'), 'r') as git_file:
+                git_dir = git_file.read().strip()[len('gitdir: '):]
+
+        except (IOError, OSError):
+            return None
+
+        return os.path.join(worktree_dir, git_dir)
+
+
+    def _is_sparse_worktree(self, repo_suffix, assignment_code):
+        r"""
+        Arguments:
+          repo_suffix:   (str) The student ID or team ID of the repo.
+
+          assignment_code:   (str) This is the two letter name for the
+            assignment.
+
+        Returns:
+        True if the assignment worktree has a sparse checkout turned on.
+        """
+
+
+        git_dir = self._read_worktree_git_dir(repo_suffix, assignment_code)
+
+        try:
+            # Written by 'git sparse-checkout set' (and 'disable')
+            with open(os.path.join(git_dir, 'config.worktree'), 'r') as config_file:
+                config = config_file.read().lower()
+
+        except (IOError, OSError, TypeError):
+            return False
+
+        return re.search(r'sparsecheckout\s*=\s*true', config) is not None
+
+
+    def _setup_student_repo(self, gt_username, should_pull=True,
+                            interactive=False):
+        r"""
+        Checks if the student Git repo is downloaded and cleans it up for the
+        grader.
+
+        Assignment:
+          gt_username:   (str) The student ID we will use download the repo.
+
+          interactive:   (bool) Let git prompt for credentials, without a
+            time limit. Otherwise a repo that needs a prompt fails right away.
+
+        Returns:
+        STR_OK if the repo is on disk and up to date, STR_TIMEOUT if git was
+        killed after GIT_TIMEOUT_SECONDS, STR_FAILED if git failed.
+        """
+
+
+        just_cloned_repo = None
+        repo_suffix = self._get_correct_reference_id(graded_id=gt_username)
+
+        if repo_suffix == None:
+            return self.STR_FAILED  # bad suffix - don't process
+
+        if self._restore_evicted_repo(repo_suffix=repo_suffix):
+
+            just_cloned_repo = True
+
+        elif not os.path.isdir(self._gen_prefixed_dir(prefix_str=repo_suffix)):
+            __ = self._execute_command("pwd")
+
+            command = self._gen_clone_command(repo_suffix=repo_suffix)
+            output = self._execute_tracked_command(
+              command=command, repo_suffix=repo_suffix,
+              description='clone', interactive=interactive)
+
+            if output == "timeout":
+                return self.STR_TIMEOUT
+            if output == "failed":
+                return self.STR_FAILED
+
+            self.cached_teams_pulled.add(repo_suffix)
+            just_cloned_repo = True
+
+        else:
+
+            just_cloned_repo = False
+
+
+        # Revert any local changes and pull from remote
+        try:
+
+            pull_flag = ''
+
+            if self._should_pull_repo(repo_suffix, should_pull) or just_cloned_repo:
+
+                pull_flag = 'git pull origin master -a && '
+
+            command = (
+              ('cd %s && %s'
+               'git reset --hard && cd - &> /dev/null') % (
+                 self._gen_prefixed_dir(prefix_str=repo_suffix), pull_flag))
+
+            if pull_flag:
+                output = self._execute_tracked_command(
+                  command=command, repo_suffix=repo_suffix,
+                  description='pull', interactive=interactive)
+            else:
+                output = self._execute_command(command=command)
+
+            if output == "timeout":
+                return self.STR_TIMEOUT
+            if output == "failed":
+                return self.STR_FAILED
+
+
+        # TODO: Unneeded?
+        except subprocess.CalledProcessError as error:
+
+            try:
+                print("%s: student '%s' subprocess.CalledProcessError: %s\n" % (
+                  inspect.currentframe().f_code.co_name,
+                  gt_username, str(error.output)))
+
+            except UnicodeDecodeError:
+                print(("%s: student '%s' subprocess.CalledProcessError: "
+                       "UnicodeDecodeError\n") % (
+                         inspect.currentframe().f_code.co_name, gt_username))
+
+            return self.STR_FAILED
+
+        self.repo_cache.touch(self._get_repo_name(repo_suffix))
+
+        return self.STR_OK
+
+
+    def _get_repo_name(self, repo_suffix):
+        r"""
+        Returns:
+        The name of the repo directory in MAIN_REPO_DIR, e.g. '6300Fall18user'.
+        """
+
+
+        return "%s%s" % (self.FOLDER_PREFIX, repo_suffix)
+
+
+    def _restore_evicted_repo(self, repo_suffix):
+        r"""
+        Rehydrates a repo evicted by enforce_repo_budget from its bundle. The
+        caller still has to pull, which only fetches the commits made since
+        the eviction.
+
+        Arguments:
+          repo_suffix:   (str) The student ID or team ID of the repo.
+
+        Returns:
+        True if the repo was restored, False if it was not evicted or could
+        not be restored (it is then cloned as usual).
+        """
+
+
+        repo_name = self._get_repo_name(repo_suffix)
+
+        if not self.repo_cache.is_evicted(repo_name):
+            return False
+
+        with self.progress.operation(repo_suffix, 'rehydrate'):
+            return self.repo_cache.rehydrate(repo_name)
+
+
+    def enforce_repo_budget(self, budget_bytes):
+        r"""
+        Evicts the least recently used repos into bundles until MAIN_REPO_DIR
+        fits in the budget. Evicted repos are restored transparently the next
+        time they are processed.
+
+        Arguments:
+          budget_bytes:   (int) The disk budget for MAIN_REPO_DIR.
+
+        Returns:
+        The list of evicted repo names.
+        """
+
+
+        evicted = self.repo_cache.enforce_budget(budget_bytes)
+
+        print("%s: evicted %d repos%s" % (
+          inspect.currentframe().f_code.co_name, len(evicted),
+          (": " + ", ".join(evicted)) if evicted else ""))
+
+        return evicted
+
+
+    def _gen_pipeline(self, run):
+        r"""
+        Builds the stages every student goes through in process_repos:
+
+          parse:   reads the submission file and its timestamp (disk),
+          sync:   clones or pulls the repo (network),
+          verify:   checks the commit out in the assignment worktree (git),
+          compare:   compares the timestamps with the deadline (git),
+          build:   builds the commit, if run has a build runner (CPU).
+
+        Each stage has its own concurrency limit in PIPELINE_WORKERS, or in
+        the pipeline_workers of the run; the host controller still limits the
+        requests to GIT_DOMAIN.
+
+        Arguments:
+          run:   (dict) The state shared by the stages of one process_repos
+            call.
+
+        Returns:
+        A Pipeline taking the student jobs of process_repos.
+        """
+
+
+        workers = dict(self.PIPELINE_WORKERS, **run['pipeline_workers'])
+        if workers['sync'] is None:
+            workers['sync'] = self.host_controller.max_concurrency
+
+        stages = [
+          Stage('parse', functools.partial(self._parse_stage, run=run),
+                workers['parse']),
+          Stage('sync', functools.partial(self._sync_stage, run=run),
+                workers['sync']),
+          Stage('verify', functools.partial(self._verify_stage, run=run),
+                workers['verify']),
+          Stage('compare', functools.partial(self._compare_stage, run=run),
+                workers['compare']),
+        ]
+
+        if run['build_runner'] is not None:
+            if workers['build'] is None:
+                workers['build'] = run['build_runner'].max_workers
+            stages.append(
+              Stage('build', functools.partial(self._build_stage, run=run),
+                    workers['build']))
+
+        return Pipeline(stages, queue_size=self.PIPELINE_QUEUE_SIZE)
+
+
+    def _parse_stage(self, job, run):
+
+        (folder, platform_id, current_student, gt_username,
+         student_name) = job
+
+        # Checking repeated results on calls to simplify them
+        base_directory = self._get_submission_folder(
+          run['submission_folder_name'], folder)
+        current_assignment = current_student[run['assignment_alias']] = {}
+
+        current_submission_file = self._get_submission_file_name(student_name, platform_id)
+
+        # Update submission text
+        self._check_submission_file(
+          current_assignment=current_assignment,
+          base_directory=base_directory,
+          submission_file=current_submission_file,
+          student_name=student_name,
+          platform_id=platform_id)
+
+        # Update t-square timestamp
+        self._set_timestamp_t_square(
+          current_assignment=current_assignment,
+          base_directory=base_directory)
+
+        return job
+
+
+    def _sync_stage(self, job, run):
+
+        current_assignment = job[2][run['assignment_alias']]
+
+        # A repo we could not clone or pull is reported on its own
+        # rather than just showing up as a bad commit
+        current_assignment['Repo Sync'] = self._sync_repo_once(
+          gt_username=job[3], run=run)
+
+        return job
+
+
+    def _verify_stage(self, job, run):
+
+        current_assignment = job[2][run['assignment_alias']]
+        gt_username = job[3]
+
+        # Only check commit ID validity with GitHub timestamp
+        if not self._is_commit_present(
+          commit_status=current_assignment['commitID']):
+            return job
+
+        repo_suffix = self._get_correct_reference_id(graded_id=gt_username)
+
+        with run['lock']:
+            repo_lock = run['repo_locks'].setdefault(repo_suffix, threading.Lock())
+
+        # Team members share the team's worktree
+        with repo_lock:
+
+            # Try to check out commit ID
+            self._check_commitID(
+              current_assignment=current_assignment,
+              assignment_code=run['assignment_code'],
+              gt_username=gt_username, sparse_paths=run['sparse_paths'])
+
+            if current_assignment['commitID valid']:
+                run['checked_out'][repo_suffix] = current_assignment['commitID']
+
+        return job
+
+
+    def _compare_stage(self, job, run):
+
+        current_assignment = job[2][run['assignment_alias']]
+
+        if self._is_commit_present(
+          commit_status=current_assignment['commitID']):
+
+            self._compare_timestamp_github(
+              current_assignment=current_assignment,
+              gt_username=job[3], deadline=run['deadline'])
+
+        # Check T-Square timestamp against deadline
+        self._compare_timestamp_t_square(
+          current_assignment=current_assignment,
+          deadline=run['deadline'])
+
+        return job
+
+
+    def _build_stage(self, job, run):
+
+        current_assignment = job[2][run['assignment_alias']]
+
+        if current_assignment.get('commitID valid') is not True:
+            return job
+
+        repo_suffix = self._get_correct_reference_id(graded_id=job[3])
+
+        current_assignment['Build'] = run['build_runner'].run(
+          repo_dir=os.path.join(self.MAIN_REPO_DIR,
+                                self._get_repo_name(repo_suffix)),
+          commit=current_assignment['commitID'])
+
+        return job
+
+
+    def _sync_repo_once(self, gt_username, run, interactive=False):
+        r"""
+        Clones or pulls a student's repo, once per process_repos call. Team
+        members share a repo, so the members after the first wait for its
+        result instead of syncing again.
+
+        Arguments:
+          gt_username:   (str) The student (or team) whose repo we sync.
+
+          run:   (dict) The state shared by the stages of one process_repos
+            call.
+
+          interactive:   (bool) As for _setup_student_repo.
+
+        Returns:
+        The sync status, as returned by _setup_student_repo.
+        """
+
+
+        repo_suffix = self._get_correct_reference_id(graded_id=gt_username)
+
+        with run['lock']:
+            is_first = repo_suffix not in run['repo_syncs']
+            if is_first:
+                run['repo_syncs'][repo_suffix] = (threading.Event(),
+                                                  [self.STR_FAILED])
+            synced, status = run['repo_syncs'][repo_suffix]
+
+        if is_first:
+            try:
+                status[0] = self._setup_student_repo(
+                  gt_username=gt_username, should_pull=run['should_pull'],
+                  interactive=interactive)
+            finally:
+                synced.set()
+        else:
+            synced.wait()
+
+        return status[0]
+
+
+    def _map_repos_parallel(self, func, items, label, max_workers=None,
+                            first_func=None):
+        r"""
+        Calls func on every item using a thread pool, keeping the order.
+
+        Arguments:
+          func:   (function) Takes one item. It must not prompt (see
+            _get_git_env), as the items run at the same time.
+
+          items:   (list) The items to process.
+
+          label:   (str) The name shown in the progress line.
+
+          max_workers:   (int) The pool size. Defaults to the host
+            controller's maximum concurrency, which does the real limiting.
+
+          first_func:   (function) If set, called instead of func on the
+            first item, on its own before the others start: it may prompt
+            for credentials, which the credential helper then caches for
+            the rest.
+
+        Returns:
+        A list of func's (and first_func's) results, in the order of items.
+        """
+
+
+        if not items:
+            return []
+
+        if max_workers is None:
+            max_workers = self.host_controller.max_concurrency
+
+        def func_with_progress(item):
+            result = func(item)
+            self.progress.advance()
+            return result
+
+        with self._track_progress(label=label, total=len(items)):
+
+            results = []
+            if first_func is not None:
+                results.append(first_func(items[0]))
+                self.progress.advance()
+
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results.extend(executor.map(func_with_progress,
+                                            items[len(results):]))
+
+        return results
+
+
+    @contextmanager
+    def _track_progress(self, label, total):
+        r"""
+        Shows live progress for the duration of the with block; the methods
+        called inside report to self.progress.
+
+        Arguments:
+          label:   (str) The name shown in the progress line.
+
+          total:   (int) The number of items the block will process.
+
+        """
+
+
+        if not self.SHOW_PROGRESS:
+            yield self.progress
+            return
+
+        self.progress = ProgressReporter(label=label, total=total).start()
+
+        try:
+            yield self.progress
+        finally:
+            self.progress.close()
+            self.progress = NullProgress()
+
+
+    def get_roster(self):
+        r"""
+        Lists everyone we grade when no whitelist is given.
+
+        Returns:
+        A list of all GT usernames, or of all team names for team
+        assignments.
+        """
+
+
+        if self.is_team:
+            roster_filename = self.TEAM_MEMBERS_FILENAME
+        else:
+            roster_filename = self.STUDENT_ALIAS_FILENAME
+
+        return list(self._get_file_dict(
+          filename=roster_filename,
+          caller_name=inspect.currentframe().f_code.co_name,
+          epilog=" Run create_student_json first.").keys())
+
+
+    def prefetch_repos(self, student_whitelist=None, max_workers=None):
+        r"""
+        Fetches every repo on the roster ahead of time so a later call to
+        process_repos only has to pull a small delta.
+
+        Missing repos are cloned. Existing repos only get their remote refs
+        updated; the working tree is left alone so graders are not disturbed.
+
+        Arguments:
+          student_whitelist:   (list of str) This is the list of student
+            username IDs (or team names for team assignments) to fetch. If set
+            to None or empty list, we will fetch the whole roster.
+
+          max_workers:   (int) The size of the worker pool. The host
+            controller still caps how many fetches are in flight.
+
+        Returns:
+        A sorted list of the repo suffixes that failed to fetch, including
+        those whose clone or fetch timed out.
+        """
+
+
+        if not student_whitelist:
+            student_whitelist = self.get_roster()
+
+        repo_suffixes = set()
+
+        for graded_id in student_whitelist:
+
+            repo_suffix = self._get_correct_reference_id(graded_id=graded_id)
+
+            if repo_suffix is not None:
+                repo_suffixes.add(repo_suffix)
+
+        if not os.path.isdir(self.MAIN_REPO_DIR):
+            os.makedirs(self.MAIN_REPO_DIR)
 
+        repo_suffixes = sorted(repo_suffixes)
+        # The first fetch of every round may prompt, in case the credential
+        # helper forgot the credentials since the last round
+        outputs = self._map_repos_parallel(
+          self._fetch_student_repo, repo_suffixes,
+          label=inspect.currentframe().f_code.co_name, max_workers=max_workers,
+          first_func=functools.partial(self._fetch_student_repo,
+                                       interactive=True))
 
-        for team in student_whitelist:
+        failed_list = [repo_suffix for repo_suffix, output
+                       in zip(repo_suffixes, outputs) if output == "failed"]
+        timed_out_list = [repo_suffix for repo_suffix, output
+                          in zip(repo_suffixes, outputs) if output == "timeout"]
 
-            member_list, commit_list = team_records[team], []
+        self.repo_cache.save()
 
-            for student in member_list:
+        print("%s: fetched %d repos, %d failed%s, %d timed out%s" % (
+          inspect.currentframe().f_code.co_name,
+          len(repo_suffixes) - len(failed_list) - len(timed_out_list),
+          len(failed_list),
+          (" (" + ", ".join(failed_list) + ")") if failed_list else "",
+          len(timed_out_list),
+          (" (" + ", ".join(timed_out_list) + ")") if timed_out_list else ""))
 
-                try:
-                    platform_id = student_aliases[student]
-                    team_assignment = (
-                        student_records[platform_id][assignment_alias])
+        return sorted(failed_list + timed_out_list)
 
-                    commit_time = team_assignment['Timestamp GitHub']
-                    commitID = team_assignment['commitID']
 
-                except KeyError:
-                    continue
+    def _fetch_student_repo(self, repo_suffix, interactive=False):
+        r"""
+        Clones the repo if it is missing, otherwise fetches the remote refs
+        without touching the working tree.
 
-                if (self._is_commit_present(commit_status=commitID) and
-                      commit_time != self.STR_NA):
+        Arguments:
+          repo_suffix:   (str) The student ID or team ID of the repo.
 
-                    commit_list.append((commit_time, commitID))
+          interactive:   (bool) As for _execute_network_command.
 
+        Return:
+        The command's output, "failed" if git failed, "timeout" if it was
+        killed after GIT_TIMEOUT_SECONDS.
+        """
 
-            # checkout most recent commit here
-            if len(commit_list) > 0:
 
-                # Most recent should be first
-                commit_list.sort(reverse=True)
-                _, most_recent_commit = commit_list[0]
+        repo_dir = self._gen_prefixed_dir(prefix_str=repo_suffix)
 
-                command = (
-                  'cd %s; git checkout %s &> /dev/null; git tag -f %s &> /dev/null' % (
-                    self._gen_prefixed_dir(team), most_recent_commit,
-                    assignment_code))
+        self._restore_evicted_repo(repo_suffix=repo_suffix)
 
-                _ = self._execute_command(command=command)
+        if not os.path.isdir(repo_dir):
+            command = self._gen_clone_command(repo_suffix=repo_suffix)
+            description = 'clone'
+        else:
+            command = 'cd %s && git fetch origin --tags --quiet' % repo_dir
+            description = 'fetch'
 
-            else:
-                print("%s: No valid commit for team '%s'!" % (
-                  inspect.currentframe().f_code.co_name, team))
+        return self._execute_tracked_command(
+          command=command, repo_suffix=repo_suffix, description=description,
+          interactive=interactive)
 
 
-    def generate_report(self, assignment, student_list=None,
-                        report_filename=None):
+    def _execute_tracked_command(self, command, repo_suffix, description,
+                                 interactive=False):
         r"""
-        This generates the final report that can be used by a grader.
-
-        The result is outputted to a file (report_filename) and to stdout.
+        Executes a network command on a repo and reports it to the progress
+        line: the command is shown while it runs and the growth of the repo's
+        object database, as git counts it, is counted as bytes fetched. The
+        time git ran and the bytes are also stored in the repo cache index,
+        unless the command was interactive.
 
         Arguments:
-          assignment:   (str) This is the name of the assignment we are
-            comparing against.
+          command:   (str) The command we will execute.
 
-          student_list:   (list of str) This is a list of students that we
-            will analyze and prints the results.
+          repo_suffix:   (str) The student ID or team ID of the repo.
 
-          report_filename:   (str) This is the filename of the report will
-            generate, in addition to stdout. To disable this feature, pass in
-            None.
+          description:   (str) What the command does, e.g. 'clone'; also
+            picks its limit in GIT_TIMEOUT_SECONDS.
 
-        Returns:
-        A file, if set, with the results and the output to stdout.
+          interactive:   (bool) As for _execute_network_command.
+
+        Return:
+        The command's output, "failed" or "timeout".
         """
 
 
-        student_aliases = self._get_file_dict(
-          filename=self.STUDENT_ALIAS_FILENAME,
-          caller_name=inspect.currentframe().f_code.co_name)
+        repo_dir = self._gen_prefixed_dir(prefix_str=repo_suffix)
+        size_before = self._get_object_bytes(repo_dir)
 
-        student_records = self._get_file_dict(
-          filename=self.STUDENT_RECORDS_FILENAME,
-          caller_name=inspect.currentframe().f_code.co_name,
-          epilog="Run process_repos first.")
+        command_seconds = []
 
+        with self.progress.operation(repo_suffix, description):
+            output = self._execute_network_command(
+              command=command,
+              timeout_seconds=self.GIT_TIMEOUT_SECONDS.get(description),
+              interactive=interactive, operation=description,
+              seconds=command_seconds)
 
-        bad_commit, late_github, late_submission, missing, not_in_json = [], [], [], [], []
+        fetched_bytes = max(0, self._get_object_bytes(repo_dir) - size_before)
+        self.progress.add_bytes(fetched_bytes)
 
-        _init_log(log_filename=report_filename)
-        logger.info("Report: %s\n", assignment)
+        # Kept for the slow repo diagnostics (repo_diagnostics.py), and by
+        # type for the run estimates (planner.py). The time of an
+        # interactive command includes the user typing, so it is not kept.
+        if not interactive:
+            seconds = round(command_seconds[0], 3)
+            self.repo_cache.update(
+              self._get_repo_name(repo_suffix), last_fetch_type=description,
+              last_fetch_seconds=seconds, last_fetch_bytes=fetched_bytes,
+              **{'%s_seconds' % description: seconds,
+                 '%s_bytes' % description: fetched_bytes})
 
-        if self.is_team:
+        return output
 
-            team_records = self._get_file_dict(
-              filename=self.TEAM_MEMBERS_FILENAME,
-              caller_name=inspect.currentframe().f_code.co_name)
 
-            new_student_list = []
+    def _get_object_bytes(self, repo_dir):
+        r"""
+        Arguments:
+          repo_dir:   (str) The repo directory.
 
-            if student_list == None:
-                student_list = self._get_file_dict(filename=self.TEAM_MEMBERS_FILENAME, caller_name=inspect.currentframe().f_code.co_name).keys()
+        Returns:
+        The size in bytes of the repo's packs and loose objects, 0 if there
+        is no repo (yet).
+        """
 
-            for team in student_list:
 
-                members_list = team_records[team]
+        if not os.path.isdir(repo_dir):
+            return 0
 
-                new_student_list.append(team)
-                new_student_list.extend(members_list)
+        counts = count_objects(repo_dir)
 
-            student_list = new_student_list
+        return 1024 * (counts.get('size', 0) + counts.get('size-pack', 0))
 
-        elif not student_list:
 
-            student_list = student_aliases.keys() # Get all students
+    def _gen_clone_command(self, repo_suffix):
+        r"""
+        Builds the command that clones a student's repo into MAIN_REPO_DIR.
 
-        #else:
-          # We are passed a fixed set of students and this is not a team.
+        Arguments:
+          repo_suffix:   (str) The student ID or team ID of the repo.
 
-        # Parse the student list for bad elements
-        stripped_list = map(str.strip, map(str, student_list))
-        final_list = list(filter(bool, stripped_list))
+        Returns:
+        The shell command as a string.
+        """
 
-        # This is a filter to get bad students in different spots
-        bad_student_dict = {
-          'Submission GitHub': (self.STR_LATE, late_github),
-          'Submission Time': (self.STR_LATE, late_submission),
-          'commitID': (self.STR_MISSING, missing),
-          'commitID valid': (False, bad_commit)
-        }
 
-        not_in_json = []  # bad_student_dict assumes a student was found; this will track students not in JSON files
+        return ('cd %s && '
+                'git clone https://%s/%s/%s%s.git && '
+                'cd ..') % (
+                  self.MAIN_REPO_DIR,
+                  self.GIT_DOMAIN, self.GIT_CONTEXT, self.FOLDER_PREFIX,
+                  repo_suffix)
 
-        for student in final_list:
 
-            if self.is_team and 'Team' in student:
-                logger.info("\n========== %s ==========", student)
-                continue
-            else:
-                logger.info(student)
+    def _execute_command(self, command):
+        r"""
+        Parses the command, if it is executed on Windows and returns the output.
 
-            try:
-                student_info = student_records[student_aliases[student]]
-            except KeyError:
-                if self.is_team:
-                    continue
-                else:
-                    not_in_json.append(student)
-                    logger.info("\tMissing in JSON files")
-                    continue
+        The command is killed after GIT_TIMEOUT_SECONDS['local'].
 
-            if assignment not in student_info:
+        Arguments:
+          command:   (str) The command we will execute and return the result.
 
-                logger.info('\tNo records found')
-                missing.append(student)
-                continue
+        Return:
+        The command's output, "failed" if it failed or "timeout" if it was
+        killed.
+        """
 
-            student_info_assignment = student_info[assignment]
 
-            for key in sorted(student_info_assignment.keys(), reverse=True):
+        command = self._fix_command_for_os(command=command)
 
-                student_info_assignment_value = student_info_assignment[key]
-                logger.info('\t%s: %s', key, student_info_assignment_value)
+        result = _run_command(
+          command, timeout_seconds=self.GIT_TIMEOUT_SECONDS['local'],
+          env=self._get_git_env(), capture_errors=False)
 
-                try:
-                    target_value, target_list = bad_student_dict[key]
-                    if target_value == student_info_assignment_value:
-                        target_list.append(student)
+        if result.timed_out:
+            print("%s: '%s' timed out after %ds" % (
+              inspect.currentframe().f_code.co_name, command,
+              self.GIT_TIMEOUT_SECONDS['local']))
+            return "timeout"
 
-                except KeyError:
-                    pass
+        if result.returncode != 0:
+            return "failed"
 
+        return result.output.strip().decode(self.ENCODING)
 
-        logger.info("\n========== RESULTS ==========")
-        str_buffer = ["\nLATE SUBMISSIONS:"]
-        for fmt_str, data in [("\tSubmission (%d): %s", late_submission),
-                              ("\tGitHub (%d): %s", late_github),
-                              ("\nMISSING SUBMISSIONS (%s): %s", missing),
-                              ("\nBAD COMMITS (%s):\n\t%s", bad_commit),
-                              ("MISSING FROM JSON (%s):\n\t%s", not_in_json)]:
 
-            str_buffer.append(fmt_str % (len(data), ", ".join(data)))
+    def _execute_network_command(self, command, timeout_seconds=None,
+                                 interactive=False, operation=None,
+                                 seconds=None):
+        r"""
+        Executes a command that talks to GIT_DOMAIN (clone, pull, fetch).
 
-        logger.info("\n".join(str_buffer))
+        The command goes through the host controller, which rate limits it,
+        adapts how many run at once and retries transient failures with
+        backoff. Unlike _execute_command, the reason of a final failure is
+        printed instead of being swallowed.
 
+        Arguments:
+          command:   (str) The command we will execute and return the result.
 
-    def _setup_student_repo(self, gt_username, should_pull=True):
-        r"""
-        Checks if the student Git repo is downloaded and cleans it up for the
-        grader.
+          timeout_seconds:   (float) Kill the command after this long; a
+            command that timed out is not retried.
 
-        Assignment:
-          gt_username:   (str) The student ID we will use download the repo.
+          interactive:   (bool) Let git prompt for credentials on the
+            terminal, without a time limit. Otherwise git fails instead of
+            prompting (see _get_git_env).
 
+          operation:   (str) What the command does, e.g. 'clone'; the host
+            controller compares latencies per operation.
+
+          seconds:   (list) If given, gets how long the command itself ran
+            (its last try): waiting for the host controller, backoff and
+            earlier tries are left out.
+
+        Return:
+        The command's output, "failed" if it still failed after retrying, or
+        "timeout" if it was killed.
         """
 
 
-        just_cloned_repo = None
-        repo_suffix = self._get_correct_reference_id(graded_id=gt_username)
+        command = self._fix_command_for_os(command=command)
 
-        if repo_suffix == None:
-            return  # bad suffix - don't process
+        if interactive:
+            timeout_seconds = None
 
-        if not os.path.isdir(self._gen_prefixed_dir(prefix_str=repo_suffix)):
-            __ = self._execute_command("pwd")
+        def run_command():
+            result = _run_command(command, timeout_seconds=timeout_seconds,
+                                  env=self._get_git_env(interactive))
 
-            command = ('cd %s && '
-                       'git clone https://%s/%s/%s%s.git && '
-                       'cd ..') % (
-                         self.MAIN_REPO_DIR,
-                         self.GIT_DOMAIN, self.GIT_CONTEXT, self.FOLDER_PREFIX, repo_suffix)
-            _ = self._execute_command(command=command)
+            return result._replace(
+              output=result.output.strip().decode(self.ENCODING, 'replace'),
+              error_output=result.error_output.decode(self.ENCODING, 'replace'))
 
-            self.cached_teams_pulled.add(repo_suffix)
-            just_cloned_repo = True
+        def run_controlled():
+            return self.host_controller.run(
+              run_command,
+              is_transient=lambda result: (
+                result.returncode != 0 and not result.timed_out and
+                is_transient_git_error(result.error_output)),
+              operation=operation, interactive=interactive)
 
+        if interactive:
+            # The progress line would draw over git's credential prompt
+            with self.progress.pause():
+                result = run_controlled()
         else:
+            result = run_controlled()
 
-            just_cloned_repo = False
-
+        if seconds is not None:
+            seconds.append(result.seconds)
 
-        # Revert any local changes and pull from remote
-        try:
+        if result.timed_out:
+            print("%s: '%s' timed out after %ds" % (
+              inspect.currentframe().f_code.co_name, command, timeout_seconds))
+            return "timeout"
 
-            pull_flag = ''
+        if result.returncode != 0:
+            print("%s: '%s' failed: %s" % (
+              inspect.currentframe().f_code.co_name, command,
+              result.error_output.strip()))
+            return "failed"
 
-            if self._should_pull_repo(repo_suffix, should_pull) or just_cloned_repo:
+        return result.output
 
-                pull_flag = 'git pull origin master -a && '
 
-            command = (
-              ('cd %s && %s'
-               'git reset --hard && cd - &> /dev/null') % (
-                 self._gen_prefixed_dir(prefix_str=repo_suffix), pull_flag))
+    def _get_git_env(self, interactive=False):
+        r"""
+        Arguments:
+          interactive:   (bool) Whether git may prompt for credentials.
 
-            _ = self._execute_command(command=command)
+        Returns:
+        The environment git commands run with: transfers slower than
+        GIT_LOW_SPEED_LIMIT for GIT_LOW_SPEED_SECONDS are aborted, and unless
+        interactive, git fails instead of waiting on a prompt.
+        """
 
 
-        # TODO: Unneeded?
-        except subprocess.CalledProcessError as error:
+        env = dict(os.environ,
+                   GIT_HTTP_LOW_SPEED_LIMIT=str(self.GIT_LOW_SPEED_LIMIT),
+                   GIT_HTTP_LOW_SPEED_TIME=str(self.GIT_LOW_SPEED_SECONDS))
 
-            try:
-                print("%s: student '%s' subprocess.CalledProcessError: %s\n" % (
-                  inspect.currentframe().f_code.co_name,
-                  gt_username, str(error.output)))
+        if not interactive:
+            env['GIT_TERMINAL_PROMPT'] = '0'
+            env['GCM_INTERACTIVE'] = 'never'  # Git Credential Manager
 
-            except UnicodeDecodeError:
-                print(("%s: student '%s' subprocess.CalledProcessError: "
-                       "UnicodeDecodeError\n") % (
-                         inspect.currentframe().f_code.co_name, gt_username))
+        return env
 
 
-    def _execute_command(self, command):
+    def _fix_command_for_os(self, command):
         r"""
-        Parses the command, if it is executed on Windows and returns the output.
+        Rewrites a *nix shell command so it also runs on Windows.
 
         Arguments:
-          command:   (str) The command we will execute and return the result.
+          command:   (str) The command written for a *nix shell.
 
         Return:
-        The command's output.
+        The command for the current OS.
         """
 
 
@@ -597,102 +2275,173 @@ class Submissions(object):
 
             # Windows chains commands with &, *nix with ;
             command = command.replace('&> /dev/null', '')
+            command = command.replace('/dev/null', 'NUL')
             command = command.replace(';', '&')
 
             # Windows doesn't support 'go back to last directory'
             command = command.replace('& cd -', '')
 
-        try:
-            raw_info = subprocess.check_output(command, shell=True).strip()
-            info = raw_info.decode(self.ENCODING)
-        except subprocess.CalledProcessError:
-            info = "failed"
-
-        return info
+        return command
 
 
     def create_student_json(self, input_filename, should_create_json_files=False):
         r"""
-        Converts the input file to two useful JSON files specifically for student grading.
+        Merges the input file into the two JSON files used for student grading.
+
+        The roster is read line by line and merged into the existing records,
+        so stored assignment results survive: new students are added, renamed
+        students keep their results and students missing from the roster are
+        dropped from the aliases (their records are kept). Only the files that
+        changed are written and the changes are printed.
 
         Arguments:
           input_filename:   (str) The input filename we will parse into JSON files.
 
-        Returns: None
+        Returns:
+        A roster.RosterDiff with the changes.
         """
 
+        student_records = self._load_json_file(self.STUDENT_RECORDS_FILENAME)
+        student_aliases = self._load_json_file(self.STUDENT_ALIAS_FILENAME)
+
         try:
             with open(input_filename, 'r') as input_file:
 
-                gt_id_dict, student_records = {}, {}
-
-                for line in input_file:
-
-                    parsed_line = line.strip().split('\t')
-
-                    try:
-                        if self.PLATFORM == "TSQUARE":
-                            name, gt_id, platform_id = parsed_line[0:3]
-                        elif self.PLATFORM == "CANVAS":
-                            name, platform_id, gt_id = parsed_line[0:3]
-                        else:
-                            raise TypeError("create_student_json error! Currently selected platform %s isn't supported yet! Valid platforms are %s" % (self.PLATFORM, self.PLATFORMS_VALID))
-                    except ValueError:
-                        print("Malformed input not added: %s" % str(parsed_line))
-                        continue # just skip malformed input
-
-                    student_records[platform_id] = {
-                      'name': name, 'gt_id': gt_id}
-                    gt_id_dict[gt_id] = platform_id
+                diff = roster.merge_student_roster(
+                  student_records=student_records,
+                  student_aliases=student_aliases,
+                  roster_rows=roster.iter_student_roster(
+                    input_file, self.PLATFORM, self.PLATFORMS_VALID),
+                  records_filename=self.STUDENT_RECORDS_FILENAME,
+                  aliases_filename=self.STUDENT_ALIAS_FILENAME)
 
         except IOError:
             raise IOError(
               "%s: Missing file '%s'. Exiting." % (
                 inspect.currentframe().f_code.co_name, input_filename))
 
+        for filename, file_dict in [
+          (self.STUDENT_RECORDS_FILENAME, student_records),
+          (self.STUDENT_ALIAS_FILENAME, student_aliases)]:
+
+            if filename in diff.changed_files or not os.path.isfile(filename):
+                self._save_json_file(filename, file_dict)
 
-        with open(self.STUDENT_RECORDS_FILENAME, 'w') as output_file:
-            json.dump(student_records, output_file)
-        with open(self.STUDENT_ALIAS_FILENAME, 'w') as alias_file:
-            json.dump(gt_id_dict, alias_file)
+        print("%s: %s" % (inspect.currentframe().f_code.co_name, diff.format()))
+
+        return diff
 
     def create_team_json(self, input_filename):
         r"""
-        Create the JSON files required for processing team submissions.
+        Merges the input file into the JSON files required for processing team submissions.
+
+        Like create_student_json, existing records are updated rather than
+        rebuilt: new members are added, students listed under another team are
+        moved and students missing from the roster are dropped. Only the files
+        that changed are written and the changes are printed.
 
         :param input_filename: filename that will have all required information parsed out of it. Requires format "<GTID>\t<Grader>\t\<Team#>"; the <Grader> section is unused, but left in so this information can be copied directly from the gradebook.
 
-        :return: None
+        :return: roster.RosterDiff with the changes
         """
+        student_teams = self._load_json_file(self.TEAM_RECORDS_FILENAME)  # what team is a student in?
+        team_members = self._load_json_file(self.TEAM_MEMBERS_FILENAME)  # what students are in a team?
+
         try:
             with open(input_filename, 'r') as input_file:
-                students = {}  # what team is a student in?
-                teams = {}  # what students are in a team?
-                for line in input_file:
-                    line = line.strip()
-                    parsed = line.split('\t')
-
-                    GT_username = parsed[0]
-                    try:
-                        team = parsed[2]
-                    except IndexError:
-                        team = "None"
-
-                    students[GT_username] = team  # store student's team
-
-                    if team not in teams:
-                        teams[team] = []
-                    teams[team].append(GT_username)  # put student on list of team members
-
-            # save here
-            with open(self.TEAM_RECORDS_FILENAME, 'w') as student_teams_file:
-                json.dump(students, student_teams_file)
-            with open(self.TEAM_MEMBERS_FILENAME, 'w') as team_members_file:
-                json.dump(teams, team_members_file)
+                diff = roster.merge_team_roster(
+                  student_teams=student_teams,
+                  team_members=team_members,
+                  roster_rows=roster.iter_team_roster(input_file),
+                  teams_filename=self.TEAM_RECORDS_FILENAME,
+                  members_filename=self.TEAM_MEMBERS_FILENAME)
 
         except IOError:
             raise IOError("create_team_json couldn\'t find file with name %s" % input_filename)
 
+        # save here
+        for filename, file_dict in [(self.TEAM_RECORDS_FILENAME, student_teams),
+                                    (self.TEAM_MEMBERS_FILENAME, team_members)]:
+
+            if filename in diff.changed_files or not os.path.isfile(filename):
+                self._save_json_file(filename, file_dict)
+
+        print("%s: %s" % (inspect.currentframe().f_code.co_name, diff.format()))
+
+        return diff
+
+    def _load_json_file(self, filename):
+        r"""
+        Reads a JSON file fresh from disk, bypassing the cache.
+
+        Arguments:
+          filename:   (str) The name of the file we will open.
+
+        Returns:
+        The dictionary in the file, or an empty one if the file doesn't exist.
+        """
+
+        wait_for_pending_writes(filename)
+
+        try:
+            with open(filename, 'r') as my_file:
+                return json.load(my_file)
+        except IOError:
+            return {}
+
+    def _save_json_file(self, filename, file_dict):
+        r"""
+        Writes a dictionary as JSON and refreshes the cached copy.
+
+        Arguments:
+          filename:   (str) The name of the file we will write.
+
+          file_dict:   (dict) The data to write.
+
+        """
+
+        wait_for_pending_writes(filename)
+
+        _write_json_file(filename, file_dict)
+
+        self.cached_file_dicts[filename] = file_dict
+
+    def _save_json_file_async(self, filename, file_dict, on_saved=None):
+        r"""
+        Writes a dictionary as JSON in a background thread.
+
+        Reading or writing the same file through this class waits for the
+        write first, and the interpreter waits for it before exiting.
+
+        Arguments:
+          filename:   (str) The name of the file we will write.
+
+          file_dict:   (dict) The data to write. It is serialized before
+            this returns, so the caller may go on changing it.
+
+          on_saved:   (function) Called in the background thread once the
+            file is written, not if the write fails.
+
+        """
+
+        data = json.dumps(file_dict)
+
+        def write():
+            _write_json_file(filename, data)
+
+            if on_saved is not None:
+                on_saved()
+
+        wait_for_pending_writes(filename)
+
+        thread = threading.Thread(target=write, name="save %s" % filename)
+        thread.daemon = False  # not inherited from e.g. iter_results
+
+        with _pending_writes_lock:
+            _pending_writes[filename] = thread
+
+        thread.start()
+
     def _get_group_submission_platform_id(self, submission_folder_name, group, team_members, student_aliases):
         r"""
         Finds the platform ID for a valid group submission, if one exists. If none exists, returns -1.
@@ -714,7 +2463,7 @@ class Submissions(object):
             filename_candidate = os.path.join(base_directory, self._get_submission_file_name(group.lower(), student_platform_id))
 
             try:
-                with open(filename_candidate, 'r'):
+                with self.submission_source.open(filename_candidate):
                     platform_id = student_platform_id  # found it!
                     break
             except IOError:
@@ -722,7 +2471,7 @@ class Submissions(object):
                     # try late submission
                     filename_candidate = os.path.join(base_directory, self._get_submission_file_name(group.lower(), student_platform_id, True))
 
-                    with open(filename_candidate, 'r'):
+                    with self.submission_source.open(filename_candidate):
                         platform_id = student_platform_id
                 except IOError:
                     pass
@@ -798,6 +2547,8 @@ class Submissions(object):
 
         if file_dict is None:
 
+            wait_for_pending_writes(filename)
+
             try:
                 with open(filename, 'r') as my_file:
                     file_dict = self.cached_file_dicts[filename] = json.load(my_file)
@@ -832,8 +2583,7 @@ class Submissions(object):
 
 
         if not student_whitelist:
-            return list(filter(
-              os.path.isdir, os.listdir(submission_folder_name)))
+            return self.submission_source.list_folders(submission_folder_name)
 
 
         if self.is_team:
@@ -912,8 +2662,142 @@ class Submissions(object):
                             (self.FOLDER_PREFIX, prefix_str))
 
 
+    def _gen_worktree_dir(self, repo_suffix, assignment_code):
+        r"""
+        Arguments:
+          repo_suffix:   (str) The student ID or team ID of the repo.
+
+          assignment_code:   (str) This is the two letter name for the
+            assignment.
+
+        Returns:
+        Where the assignment's commit of the repo is checked out, e.g.
+        'student_repo/worktrees/A3/6300Fall18user'.
+        """
+
+
+        return os.path.join(self.MAIN_REPO_DIR, self.WORKTREE_DIR,
+                            assignment_code, self._get_repo_name(repo_suffix))
+
+
+    def _checkout_assignment(self, repo_suffix, commit, assignment_code,
+                             sparse_paths=None):
+        r"""
+        Checks a commit out in the assignment's own worktree of the repo and
+        tags it with the assignment code.
+
+        Every assignment gets its own git worktree sharing the clone's object
+        database, so A3 and A4 (or two graders) can use the same repo at once
+        without moving each other's HEAD, and the clone itself stays on
+        master for pulling.
+
+        With sparse_paths the worktree is a cone-mode sparse checkout: only
+        those directories (and the files at the top of the repo) are written,
+        which saves most of the checkout time and disk space on repos that
+        hold every assignment of the semester. The clone is not affected.
+
+        Arguments:
+          repo_suffix:   (str) The student ID or team ID of the repo.
+
+          commit:   (str) The commit to check out.
+
+          assignment_code:   (str) This is the two letter name for the
+            assignment.
+
+          sparse_paths:   (list of str) Only check out these directories of
+            the repo, e.g. ['Assignment4']. The whole tree if None or empty.
+
+        Returns:
+        The hash of the commit checked out in the worktree, empty or "failed"
+        if there is none.
+        """
+
+
+        if not os.path.isdir(self._gen_prefixed_dir(prefix_str=repo_suffix)):
+            return "failed"
+
+        worktree_dir = os.path.abspath(
+          self._gen_worktree_dir(repo_suffix, assignment_code))
+
+        # A directory without its .git file is not a worktree (anymore) and
+        # git commands in it would run against an enclosing repo
+        if (os.path.isdir(worktree_dir) and
+              not os.path.isfile(os.path.join(worktree_dir, '.git'))):
+            shutil.rmtree(worktree_dir)
+
+        repo_dir = os.path.abspath(
+          self._gen_prefixed_dir(prefix_str=repo_suffix))
+
+        # Separate commands, without a shell, so nothing depends on how the
+        # shell of this OS groups, redirects or quotes. Only the hash is
+        # printed: the errors of the others are captured and dropped.
+        def git(directory, *args):
+            return _run_command(
+              ['git', '-C', directory] + list(args),
+              timeout_seconds=self.GIT_TIMEOUT_SECONDS['local'],
+              env=self._get_git_env())
+
+        sparse_args = None
+        if sparse_paths:
+            sparse_args = ['sparse-checkout', 'set', '--cone'] + list(
+              sparse_paths)
+        elif self._is_sparse_worktree(repo_suffix, assignment_code):
+            # The assignment has no paths (anymore): back to the whole tree
+            sparse_args = ['sparse-checkout', 'disable']
+
+        start_time = time.time()
+
+        if os.path.isdir(worktree_dir):
+            results = []
+            if sparse_args:
+                results.append(git(worktree_dir, *sparse_args))
+            results.append(git(worktree_dir, 'checkout', '--quiet', '--detach',
+                               commit))
+
+        else:
+            # prune forgets worktrees whose directory was deleted by hand
+            results = [git(repo_dir, 'worktree', 'prune')]
+
+            if sparse_paths:
+                # The paths are set before anything is written; the forced
+                # checkout then fills in only those (or everything, if
+                # sparse-checkout failed, e.g. git older than 2.35)
+                results.append(git(repo_dir, 'worktree', 'add', '--quiet',
+                                   '--force', '--no-checkout', '--detach',
+                                   worktree_dir, commit))
+                if results[-1].returncode == 0:
+                    results.append(git(worktree_dir, *sparse_args))
+                results.append(git(worktree_dir, 'checkout', '--quiet',
+                                   '--force', '--detach', commit))
+            else:
+                results.append(git(repo_dir, 'worktree', 'add', '--quiet',
+                                   '--force', '--detach', worktree_dir,
+                                   commit))
+
+        results.append(git(repo_dir, 'tag', '-f', assignment_code, commit))
+        results.append(git(worktree_dir, 'show', '--pretty=format:%H',
+                           '--no-patch'))
+
+        if any(result.timed_out for result in results):
+            print("%s: checking out %s in '%s' timed out after %ds" % (
+              inspect.currentframe().f_code.co_name, commit, worktree_dir,
+              self.GIT_TIMEOUT_SECONDS['local']))
+            output = "timeout"
+        elif results[-1].returncode != 0:
+            output = "failed"
+        else:
+            output = results[-1].output.strip().decode(self.ENCODING)
+
+        # Kept to schedule the slow checkouts first (see _order_student_jobs)
+        self.repo_cache.update(
+          self._get_repo_name(repo_suffix),
+          checkout_seconds=round(time.time() - start_time, 3))
+
+        return output
+
+
     def _check_commitID(self, current_assignment,
-                        assignment_code, gt_username):
+                        assignment_code, gt_username, sparse_paths=None):
         r"""
         Checks if the current commit is a valid comment in the Repo.
 
@@ -931,19 +2815,28 @@ class Submissions(object):
           gt_username:   (str) student GT username - this is what he or she would log into GitHub with
           the info of.
 
+          sparse_paths:   (list of str) Only check out these directories.
+
         """
 
 
         repo_suffix = self._get_correct_reference_id(graded_id=gt_username)
 
-        command = (
-          'cd %s; git checkout %s; git tag -f %s &> /dev/null;'
-          'git show --pretty=format:\'%%H\' --no-patch; '
-          'cd - &> /dev/null' % (
-            self._gen_prefixed_dir(prefix_str=repo_suffix),
-            current_assignment['commitID'], assignment_code))
+        if (repo_suffix is None or
+              not os.path.isdir(self._gen_prefixed_dir(prefix_str=repo_suffix))):
+            # Without the repo the commands below would run in the current
+            # directory instead
+            current_assignment['commitID valid'] = False
+            return
 
-        output_checkout = self._execute_command(command=command)
+        with self.progress.operation(repo_suffix, 'checkout'):
+            output_checkout = self._checkout_assignment(
+              repo_suffix=repo_suffix, commit=current_assignment['commitID'],
+              assignment_code=assignment_code, sparse_paths=sparse_paths)
+
+        if output_checkout == "timeout":
+            # Reported with the timeouts rather than as a bad commit
+            current_assignment['Checkout'] = self.STR_TIMEOUT
 
         if self.OS_TYPE == 'Windows':
             # Windows returns \\ prefix and suffix so strip it
@@ -1018,7 +2911,7 @@ class Submissions(object):
         """
 
         try:
-            with open(os.path.join(base_directory, submission_file), 'r') as submission_info:
+            with self.submission_source.open(os.path.join(base_directory, submission_file)) as submission_info:
 
                 strings = re.findall(r'([0-9A-Za-z]{40})',
                                      submission_info.read())
@@ -1060,7 +2953,7 @@ class Submissions(object):
                 target_filename = os.path.join(base_directory,
                                                self.TIMESTAMP_FILENAME)
 
-                with open(target_filename, 'r') as timestamp_info:
+                with self.submission_source.open(target_filename) as timestamp_info:
 
                     timestamp = self._fix_timestamp_t_square(
                       time_str=timestamp_info.read())
@@ -1271,7 +3164,8 @@ class Submissions(object):
         return should_pull
 
 
-def _init_log(log_filename=None, log_file_mode='w', fmt_str=None):
+def _init_log(log_filename=None, log_file_mode='w', fmt_str=None,
+              stream=None):
     r"""
     Initializes the logging for this module.
 
@@ -1300,6 +3194,8 @@ def _init_log(log_filename=None, log_file_mode='w', fmt_str=None):
         Be mindful that this shows up in very message printed.
         An example is included to showcase what can be done.
 
+      stream:   (file) Where the messages are shown, stderr if None.
+
     WARNING:
       If this is called multiple times, stdout will get multiple copies of any
       logger call, which will create repeating lines.
@@ -1321,7 +3217,7 @@ def _init_log(log_filename=None, log_file_mode='w', fmt_str=None):
 
     logger.handlers = [] # Clear all old handlers
 
-    stdout = logging.StreamHandler()
+    stdout = logging.StreamHandler(stream)
     stdout.setFormatter(fmt_str)
     stdout.setLevel(logging.INFO)
     logger.addHandler(stdout)
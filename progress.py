@@ -0,0 +1,372 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+r"""
+Live progress for long runs such as process_repos.
+
+A ProgressReporter counts finished items, bytes fetched and the operations
+currently running (e.g. a clone), and periodically renders:
+
+  * on a terminal, a single line that keeps updating in place,
+  * otherwise (a log file, CI), a structured "key=value" line every
+    log_interval seconds.
+
+Rendering happens on a background thread at a fixed interval, so the
+workers only pay for a counter update under a lock, and a run that is stuck
+still shows which operation is hanging. Rendering is paused while something
+else needs the terminal, e.g. git asking for a password.
+
+NullProgress has the same interface and does nothing; it is used when no
+run is being tracked.
+"""
+
+
+__all__ = ["NullProgress", "ProgressReporter", "format_bytes",
+           "format_seconds", ]
+__author__ = "Travis Janssen, David Tran"
+__credits__ = ["Travis Janssen", "David Tran"]
+__status__ = "Production"
+__version__ = "1.0.0"
+
+
+from contextlib import contextmanager
+import itertools
+import sys
+import threading
+import time
+
+
+def format_bytes(num_bytes):
+    r"""
+    Arguments:
+      num_bytes:   (int) A number of bytes.
+
+    Returns:
+    A short human readable size, e.g. '12.3 MB'.
+    """
+
+
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if num_bytes < 1024.0 or unit == 'GB':
+            break
+        num_bytes /= 1024.0
+
+    return ('%d %s' if unit == 'B' else '%.1f %s') % (num_bytes, unit)
+
+
+def format_seconds(seconds):
+    r"""
+    Arguments:
+      seconds:   (float) A duration, or None if unknown.
+
+    Returns:
+    A short duration, e.g. '2m05s', or '?' if unknown.
+    """
+
+
+    if seconds is None:
+        return '?'
+
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+
+    if hours:
+        return '%dh%02dm' % (hours, minutes)
+    if minutes:
+        return '%dm%02ds' % (minutes, seconds)
+    return '%ds' % seconds
+
+
+class NullProgress(object):
+    r"""
+    A progress reporter that does nothing.
+    """
+
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @contextmanager
+    def operation(self, name, description):
+        yield
+
+    @contextmanager
+    def pause(self):
+        yield
+
+    def add_bytes(self, num_bytes):
+        pass
+
+    def advance(self, count=1):
+        pass
+
+    def close(self):
+        pass
+
+
+class ProgressReporter(NullProgress):
+    r"""
+    Tracks and renders the progress of a run.
+    """
+
+
+    def __init__(self, label, total, stream=None, is_tty=None,
+                 tty_interval=0.5, log_interval=15.0, slow_after=10.0,
+                 max_slow_shown=3, clock=time.time):
+        r"""
+        Arguments:
+          label:   (str) The name of the run shown on every line.
+
+          total:   (int) The number of items the run will process.
+
+          stream:   (file) Where to render. Defaults to stderr so it does not
+            mix with the report on stdout.
+
+          is_tty:   (boolean) Renders a single updating line if True. Defaults
+            to stream.isatty().
+
+          tty_interval:   (float) Seconds between updates on a terminal.
+
+          log_interval:   (float) Seconds between lines otherwise.
+
+          slow_after:   (float) Operations running longer than this many
+            seconds are shown as slow.
+
+          max_slow_shown:   (int) How many slow operations are shown.
+
+          clock:   (function) Returns the current time in seconds.
+
+        """
+
+
+        self.label = label
+        self.total = total
+        self.stream = stream if stream is not None else sys.stderr
+        self.is_tty = (is_tty if is_tty is not None else
+                       getattr(self.stream, 'isatty', lambda: False)())
+        self.interval = tty_interval if self.is_tty else log_interval
+        self.slow_after = slow_after
+        self.max_slow_shown = max_slow_shown
+        self.clock = clock
+
+        self.processed = 0
+        self.bytes_fetched = 0
+        self.start_time = clock()
+
+        self._operations = {}  # token -> (name, description, start time)
+        self._tokens = itertools.count()
+        self._last_width = 0
+        self._paused = 0  # nested pause() blocks
+        self._lock = threading.Lock()
+        self._render_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._ticker = None
+
+
+    def start(self):
+        r"""
+        Starts rendering in the background.
+
+        Returns:
+        self, so this can be used as "with ProgressReporter(...).start():"
+        """
+
+
+        self._ticker = threading.Thread(target=self._tick)
+        self._ticker.daemon = True
+        self._ticker.start()
+
+        return self
+
+
+    @contextmanager
+    def operation(self, name, description):
+        r"""
+        Marks an operation as running for the duration of the with block.
+
+        Arguments:
+          name:   (str) What the operation is working on, e.g. a repo.
+
+          description:   (str) What the operation does, e.g. 'clone'.
+
+        """
+
+
+        token = next(self._tokens)
+
+        with self._lock:
+            self._operations[token] = (name, description, self.clock())
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                del self._operations[token]
+
+
+    @contextmanager
+    def pause(self):
+        r"""
+        Stops rendering for the duration of the with block, e.g. while a
+        command prompts on the terminal. The line is wiped first so the
+        prompt starts on a clean line.
+        """
+
+
+        with self._render_lock:
+            self._paused += 1
+
+            if self.is_tty and self._last_width:
+                self.stream.write('\r' + ' ' * self._last_width + '\r')
+                self.stream.flush()
+                self._last_width = 0
+
+        try:
+            yield
+        finally:
+            with self._render_lock:
+                self._paused -= 1
+
+
+    def add_bytes(self, num_bytes):
+        r"""
+        Arguments:
+          num_bytes:   (int) Bytes fetched from the network.
+
+        """
+
+
+        with self._lock:
+            self.bytes_fetched += num_bytes
+
+
+    def advance(self, count=1):
+        r"""
+        Arguments:
+          count:   (int) How many more items are done.
+
+        """
+
+
+        with self._lock:
+            self.processed += count
+
+
+    def close(self):
+        r"""
+        Stops the background rendering and renders the final state.
+        """
+
+
+        self._stopped.set()
+
+        if self._ticker is not None:
+            self._ticker.join()
+            self._ticker = None
+
+        self.render()
+
+        if self.is_tty:
+            self.stream.write('\n')
+            self.stream.flush()
+
+
+    def get_snapshot(self):
+        r"""
+        Returns:
+        A dictionary with processed, total, rate (items per second),
+        bytes, elapsed and eta (seconds, None if unknown) and slow, a list of
+        (name, description, seconds running) for the slowest operations.
+        """
+
+
+        with self._lock:
+            now = self.clock()
+            processed = self.processed
+            bytes_fetched = self.bytes_fetched
+            operations = list(self._operations.values())
+
+        elapsed = now - self.start_time
+        rate = processed / elapsed if elapsed > 0 else 0.0
+        eta = ((self.total - processed) / rate) if rate > 0 else None
+
+        slow = sorted(
+          [(name, description, now - start)
+           for name, description, start in operations
+           if now - start >= self.slow_after],
+          key=lambda operation: -operation[2])[:self.max_slow_shown]
+
+        return {'processed': processed, 'total': self.total, 'rate': rate,
+                'bytes': bytes_fetched, 'elapsed': elapsed, 'eta': eta,
+                'slow': slow}
+
+
+    def format_line(self, snapshot=None):
+        r"""
+        Arguments:
+          snapshot:   (dict) As returned by get_snapshot. Taken now if None.
+
+        Returns:
+        The line to render, human readable on a terminal and key=value
+        otherwise.
+        """
+
+
+        if snapshot is None:
+            snapshot = self.get_snapshot()
+
+        if self.is_tty:
+
+            percent = (100.0 * snapshot['processed'] / snapshot['total']
+                       if snapshot['total'] else 100.0)
+            line = '%s: %d/%d (%d%%) %.1f/s %s eta %s' % (
+              self.label, snapshot['processed'], snapshot['total'], percent,
+              snapshot['rate'], format_bytes(snapshot['bytes']),
+              format_seconds(snapshot['eta']))
+
+            if snapshot['slow']:
+                line += ' | slow: ' + ', '.join(
+                  '%s %s %s' % (name, description, format_seconds(seconds))
+                  for name, description, seconds in snapshot['slow'])
+
+            return line
+
+        return ('%s: processed=%d total=%d rate=%.2f bytes=%d elapsed=%d '
+                'eta=%s slow=%s') % (
+                  self.label, snapshot['processed'], snapshot['total'],
+                  snapshot['rate'], snapshot['bytes'], snapshot['elapsed'],
+                  '-' if snapshot['eta'] is None else '%d' % snapshot['eta'],
+                  ','.join('%s:%s:%ds' % slow_operation
+                           for slow_operation in snapshot['slow']) or '-')
+
+
+    def render(self):
+        r"""
+        Writes the current line to the stream, unless paused.
+        """
+
+
+        line = self.format_line()
+
+        with self._render_lock:
+
+            if self._paused:
+                return
+
+            if self.is_tty:
+                # Pad with spaces to wipe the end of a longer previous line
+                padding = ' ' * max(0, self._last_width - len(line))
+                self._last_width = len(line)
+                self.stream.write('\r' + line + padding)
+            else:
+                self.stream.write(line + '\n')
+
+            self.stream.flush()
+
+
+    def _tick(self):
+
+        while not self._stopped.wait(self.interval):
+            self.render()
@@ -0,0 +1,477 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+r"""
+A small local HTTP server answering questions about the student records.
+
+"Is X late on A4?" or "which teams have no valid commit on T_D2?" used to
+mean running generate_report again. This server loads the records, aliases
+and team files once, indexes them by student, team, assignment and status,
+and answers in JSON:
+
+    GET /assignments                         assignment -> number of students
+    GET /assignments/A4                      every student's statuses on A4
+    GET /assignments/A4?status=late          the students late on A4
+    GET /students/gtuser3                    every result of a student
+    GET /students/gtuser3/A4                 one result, with its statuses
+    GET /teams/T_D2?status=no_valid_commit   the teams without a valid commit
+
+Assignments are named as in the records, i.e. by their submission folder
+(A4, I_D1, T_D2, ...). The statuses are those of the report: 'late',
+'missing', 'bad_commit', 'sync_failed', 'timeout', 'build_failed' and
+'valid'; a team is 'valid' if one of its members has a valid commit,
+'no_valid_commit' otherwise.
+
+Before answering, the files are checked for changes (at most once a second)
+and only the students whose records changed are indexed again, so the
+server can stay up while download_submission.py runs.
+
+Run it from the grading directory; it only listens on this machine:
+
+    $ ./records_server.py
+    $ curl 'http://localhost:8300/assignments/A4?status=late'
+"""
+
+
+__all__ = ["RecordsIndex", "get_statuses", "make_server", ]
+__author__ = "Travis Janssen, David Tran"
+__credits__ = ["Travis Janssen", "David Tran"]
+__status__ = "Production"
+__version__ = "1.0.0"
+
+
+import argparse
+import json
+import os
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, unquote, urlsplit
+except ImportError:  # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urllib import unquote
+    from urlparse import parse_qs, urlsplit
+
+from build_runner import STATUS_PASSED
+
+
+DEFAULT_PORT = 8300
+RELOAD_INTERVAL_SECONDS = 1.0
+
+# The values process_repos stores (see Submissions.STR_*)
+_STR_FAILED = "Failed"
+_STR_LATE = "Late"
+_STR_MISSING = "Missing"
+_STR_TIMEOUT = "Timeout"
+
+
+def get_statuses(result):
+    r"""
+    Arguments:
+      result:   (dict) A student's result for one assignment, as stored in
+        the records.
+
+    Returns:
+    The sorted list of the statuses of the result.
+    """
+
+
+    statuses = set()
+
+    if _STR_LATE in [result.get('Submission Time'),
+                     result.get('Submission GitHub')]:
+        statuses.add('late')
+
+    if result.get('commitID') == _STR_MISSING:
+        statuses.add('missing')
+
+    if result.get('commitID valid') is True:
+        statuses.add('valid')
+    elif result.get('commitID valid') is False:
+        statuses.add('bad_commit')
+
+    if result.get('Repo Sync') == _STR_FAILED:
+        statuses.add('sync_failed')
+
+    if _STR_TIMEOUT in [result.get('Repo Sync'), result.get('Checkout')]:
+        statuses.add('timeout')
+
+    build = result.get('Build')
+    if build is not None and build.get('status') != STATUS_PASSED:
+        statuses.add('build_failed')
+
+    return sorted(statuses)
+
+
+class RecordsIndex(object):
+    r"""
+    The records files, indexed for queries. Safe to use from several
+    threads.
+    """
+
+
+    def __init__(self, records_filename='student_records.json',
+                 aliases_filename='student_aliases.json',
+                 teams_filename='student_records_teams.json',
+                 team_members_filename='student_records_team_members.json',
+                 clock=time.time):
+        r"""
+        Arguments:
+          records_filename:   (str) platform ID -> student record.
+
+          aliases_filename:   (str) GT username -> platform ID.
+
+          teams_filename:   (str) GT username -> team.
+
+          team_members_filename:   (str) team -> list of GT usernames.
+
+          clock:   (function) Returns the current time in seconds.
+
+        """
+
+
+        self.filenames = {'records': records_filename,
+                          'aliases': aliases_filename,
+                          'teams': teams_filename,
+                          'team_members': team_members_filename}
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._signatures = {}  # file key -> (mtime, size) when loaded
+        self._last_check = None
+
+        self._records = {}  # platform ID -> record
+        self._aliases = {}
+        self._teams = {}
+        self._team_members = {}
+
+        self._by_assignment = {}  # assignment -> set of platform IDs
+        self._by_status = {}  # (assignment, status) -> set of platform IDs
+
+        self.reload()
+
+
+    def reload(self, force=True):
+        r"""
+        Loads the files that changed since they were last loaded.
+
+        Arguments:
+          force:   (bool) Check the files even if they were checked less
+            than RELOAD_INTERVAL_SECONDS ago.
+
+        Returns:
+        The number of students indexed again.
+        """
+
+
+        with self._lock:
+
+            now = self.clock()
+            if (not force and self._last_check is not None and
+                  now - self._last_check < RELOAD_INTERVAL_SECONDS):
+                return 0
+            self._last_check = now
+
+            reindexed = 0
+
+            for key, filename in self.filenames.items():
+
+                try:
+                    stat = os.stat(filename)
+                    signature = (stat.st_mtime, stat.st_size)
+                except OSError:
+                    signature = None
+
+                if signature == self._signatures.get(key, False):
+                    continue
+
+                data = self._load(filename) if signature is not None else {}
+                if data is None:
+                    continue  # half written: try again next time
+
+                self._signatures[key] = signature
+
+                if key == 'records':
+                    reindexed += self._update_records(data)
+                else:
+                    setattr(self, '_' + key, data)
+
+            return reindexed
+
+
+    def list_assignments(self):
+        r"""
+        Returns:
+        A dict assignment -> number of students with a result.
+        """
+
+
+        self.reload(force=False)
+
+        with self._lock:
+            return dict((assignment, len(platform_ids)) for assignment,
+                        platform_ids in self._by_assignment.items()
+                        if platform_ids)
+
+
+    def get_student(self, gt_username, assignment=None):
+        r"""
+        Arguments:
+          gt_username:   (str) The student's GT username.
+
+          assignment:   (str) Only this assignment, all of them if None.
+
+        Returns:
+        A dict with the student, their team and 'results': assignment ->
+        dict with 'statuses' and 'result', or None for an unknown student.
+        """
+
+
+        self.reload(force=False)
+
+        with self._lock:
+
+            platform_id = self._aliases.get(gt_username)
+            record = self._records.get(platform_id)
+
+            if record is None:
+                return None
+
+            results = {}
+            for name, result in record.items():
+                if isinstance(result, dict) and assignment in [None, name]:
+                    results[name] = {'statuses': get_statuses(result),
+                                     'result': result}
+
+            return {'student': gt_username, 'platform_id': platform_id,
+                    'name': record.get('name'),
+                    'team': self._teams.get(gt_username),
+                    'results': results}
+
+
+    def get_assignment(self, assignment, status=None):
+        r"""
+        Arguments:
+          assignment:   (str) The assignment.
+
+          status:   (str) Only the students with this status.
+
+        Returns:
+        A dict GT username -> statuses of the students with a result.
+        """
+
+
+        self.reload(force=False)
+
+        with self._lock:
+
+            if status is None:
+                platform_ids = self._by_assignment.get(assignment, set())
+            else:
+                platform_ids = self._by_status.get((assignment, status), set())
+
+            return dict(
+              (self._records[platform_id].get('gt_id', platform_id),
+               get_statuses(self._records[platform_id][assignment]))
+              for platform_id in platform_ids)
+
+
+    def get_teams(self, assignment, status=None):
+        r"""
+        Arguments:
+          assignment:   (str) The assignment, usually a team one.
+
+          status:   (str) Only the teams with this status.
+
+        Returns:
+        A dict team -> dict with 'members' and 'statuses': 'valid' or
+        'no_valid_commit', and the statuses of any of its members.
+        """
+
+
+        self.reload(force=False)
+
+        with self._lock:
+
+            teams = {}
+
+            for team, members in self._team_members.items():
+
+                statuses = set()
+                for gt_username in members:
+                    record = self._records.get(self._aliases.get(gt_username), {})
+                    if isinstance(record.get(assignment), dict):
+                        statuses.update(get_statuses(record[assignment]))
+
+                statuses.discard('valid')
+                statuses.add('valid' if self._has_valid_commit(
+                  members, assignment) else 'no_valid_commit')
+
+                if status is None or status in statuses:
+                    teams[team] = {'members': sorted(members),
+                                   'statuses': sorted(statuses)}
+
+            return teams
+
+
+    def _has_valid_commit(self, members, assignment):
+
+        valid = self._by_status.get((assignment, 'valid'), set())
+
+        return any(self._aliases.get(gt_username) in valid
+                   for gt_username in members)
+
+
+    def _update_records(self, records):
+
+        changed = [platform_id for platform_id in
+                   set(self._records) | set(records)
+                   if self._records.get(platform_id) != records.get(platform_id)]
+
+        for platform_id in changed:
+            self._index(platform_id, self._records.get(platform_id), add=False)
+            self._index(platform_id, records.get(platform_id), add=True)
+
+        self._records = records
+
+        return len(changed)
+
+
+    def _index(self, platform_id, record, add):
+
+        for assignment, result in (record or {}).items():
+
+            if not isinstance(result, dict):
+                continue  # 'name', 'gt_id'
+
+            keys = [(self._by_assignment, assignment)] + [
+              (self._by_status, (assignment, status))
+              for status in get_statuses(result)]
+
+            for index, key in keys:
+                if add:
+                    index.setdefault(key, set()).add(platform_id)
+                else:
+                    index.get(key, set()).discard(platform_id)
+
+
+    def _load(self, filename):
+
+        try:
+            with open(filename, 'r') as json_file:
+                return json.load(json_file)
+        except (IOError, ValueError):
+            return None
+
+
+class _RecordsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+
+        url = urlsplit(self.path)
+        parts = [unquote(part) for part in url.path.split('/') if part]
+        status = parse_qs(url.query).get('status', [None])[0]
+        index = self.server.index
+
+        if parts == ['assignments']:
+            body = index.list_assignments()
+        elif len(parts) == 2 and parts[0] == 'assignments':
+            body = {'assignment': parts[1], 'status': status,
+                    'students': index.get_assignment(parts[1], status)}
+        elif len(parts) in [2, 3] and parts[0] == 'students':
+            body = index.get_student(parts[1], *parts[2:])
+        elif len(parts) == 2 and parts[0] == 'teams':
+            body = {'assignment': parts[1], 'status': status,
+                    'teams': index.get_teams(parts[1], status)}
+        else:
+            body = None
+
+        if body is None:
+            self._send(404, {'error': "not found: %s" % url.path})
+        else:
+            self._send(200, body)
+
+
+    def _send(self, code, body):
+
+        data = json.dumps(body, sort_keys=True).encode('utf-8')
+
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+    def log_message(self, format, *args):
+        pass  # one line per query would bury the terminal
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+
+
+def make_server(index, host='localhost', port=DEFAULT_PORT):
+    r"""
+    Arguments:
+      index:   (RecordsIndex) The records to answer from.
+
+      host:   (str) The address to listen on.
+
+      port:   (int) The port to listen on, 0 for any free one.
+
+    Returns:
+    The HTTP server, not started yet (see serve_forever); its port is
+    server.server_address[1].
+    """
+
+
+    server = _ThreadingHTTPServer((host, port), _RecordsHandler)
+    server.index = index
+
+    return server
+
+
+def parse_main():
+    r"""
+    Reads the user input and serves the records until Ctrl-C.
+    """
+
+
+    parser = argparse.ArgumentParser(
+      description="Answers queries about the student records over HTTP")
+
+    parser.add_argument(
+      '-p', '--port', type=int, default=DEFAULT_PORT, dest='port',
+      help="the port to listen on (default %d)" % DEFAULT_PORT)
+
+    parser.add_argument(
+      '-b', '--bind', default='localhost', dest='host',
+      help="the address to listen on (default localhost)")
+
+    parser.add_argument(
+      '-r', '--records', default='student_records.json', dest='records',
+      help="the records file (default student_records.json)")
+
+    args = parser.parse_args()
+
+    index = RecordsIndex(records_filename=args.records)
+    server = make_server(index, host=args.host, port=args.port)
+
+    print("records_server: %d assignments, serving on http://%s:%d/" % (
+      len(index.list_assignments()), args.host, server.server_address[1]))
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parse_main()
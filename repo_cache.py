@@ -0,0 +1,448 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+r"""
+Keeps student_repo/ within a disk budget.
+
+Every semester adds a full clone plus a working tree per student, so the
+grading VM eventually fills up. RepoCache records when each repo directory
+was last used and, when the budget is exceeded, evicts the least recently
+used repos:
+
+  * the whole repo (all branches and tags) is packed into a single
+    'git bundle' file under student_repo/.bundles/,
+  * the directory, working tree included, is deleted, along with the
+    repo's assignment worktrees.
+
+Submissions rehydrates an evicted repo transparently the next time it is
+needed: cloning from the local bundle and pulling the few new commits is much
+faster than a fresh clone from the host.
+
+The access times live in student_repo/.repo_index.json, together with other
+per-repo facts (e.g. the origin URL needed to rehydrate).
+"""
+
+
+__all__ = ["RepoCache", "count_objects", "get_directory_size", "parse_size", ]
+__author__ = "Travis Janssen, David Tran"
+__credits__ = ["Travis Janssen", "David Tran"]
+__status__ = "Production"
+__version__ = "1.0.0"
+
+
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+
+SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3,
+              'T': 1024 ** 4}
+
+
+def parse_size(size_str):
+    r"""
+    Arguments:
+      size_str:   (str) A size such as '500M', '20G' or '1048576'.
+
+    Returns:
+    The size in bytes. Raises ValueError if it cannot be read.
+    """
+
+
+    size_str = size_str.strip().upper().rstrip('B')
+    unit = size_str[-1:] if size_str[-1:] in SIZE_UNITS else ''
+    number = size_str[:-1] if unit else size_str
+
+    try:
+        return int(float(number) * SIZE_UNITS[unit])
+    except ValueError:
+        raise ValueError("Size '%s' is not like 500M or 20G" % size_str)
+
+
+def get_directory_size(directory):
+    r"""
+    Returns:
+    The total size in bytes of the files under directory.
+    """
+
+
+    total_size = 0
+
+    for root, _, filenames in os.walk(directory):
+        for filename in filenames:
+            try:
+                total_size += os.path.getsize(os.path.join(root, filename))
+            except OSError:
+                pass
+
+    return total_size
+
+
+def count_objects(repo_dir):
+    r"""
+    Asks git how big a repo's object database is, which only lists the
+    pack files and loose object directories instead of walking .git.
+
+    Arguments:
+      repo_dir:   (str) The repo directory.
+
+    Returns:
+    A dict of the values of 'git count-objects -v', e.g. 'count' (loose
+    objects), 'size' and 'size-pack' (in KiB). Empty if it is not a repo.
+    """
+
+
+    counts = {}
+
+    try:
+        output = subprocess.check_output(
+          ['git', 'count-objects', '-v'], cwd=repo_dir,
+          stderr=subprocess.STDOUT).decode('utf-8')
+
+        for line in output.splitlines():
+            key, _, value = line.partition(':')
+            counts[key.strip()] = int(value)
+
+    except (subprocess.CalledProcessError, OSError, ValueError):
+        pass
+
+    return counts
+
+
+class RepoCache(object):
+    r"""
+    Tracks the use of the repos under a directory and evicts cold ones into
+    bundles.
+    """
+
+
+    def __init__(self, main_repo_dir, clock=time.time):
+        r"""
+        Arguments:
+          main_repo_dir:   (str) The directory holding the student repos.
+
+          clock:   (function) Returns the current time in seconds.
+
+        """
+
+
+        self.main_repo_dir = main_repo_dir
+        self.bundle_dir = os.path.join(main_repo_dir, '.bundles')
+        self.index_filename = os.path.join(main_repo_dir, '.repo_index.json')
+        self.clock = clock
+
+        self._lock = threading.Lock()
+
+        try:
+            with open(self.index_filename, 'r') as index_file:
+                self.index = json.load(index_file)
+        except (IOError, ValueError):
+            self.index = {}
+
+
+    def save(self):
+        r"""
+        Writes the index.
+        """
+
+
+        if not os.path.isdir(self.main_repo_dir):
+            os.makedirs(self.main_repo_dir)
+
+        with self._lock:
+            with open(self.index_filename, 'w') as index_file:
+                json.dump(self.index, index_file, indent=1, sort_keys=True)
+
+
+    def get_entry(self, repo_name):
+        r"""
+        Arguments:
+          repo_name:   (str) The repo directory name, e.g. '6300Fall18user'.
+
+        Returns:
+        A copy of the facts stored for the repo.
+        """
+
+
+        with self._lock:
+            return dict(self.index.get(repo_name, {}))
+
+
+    def get_entries(self):
+        r"""
+        Returns:
+        A dict repo name -> a copy of the facts stored for the repo, for
+        every repo in the index.
+        """
+
+
+        with self._lock:
+            return dict((repo_name, dict(entry))
+                        for repo_name, entry in self.index.items())
+
+
+    def update(self, repo_name, **values):
+        r"""
+        Stores facts about a repo.
+
+        Arguments:
+          repo_name:   (str) The repo directory name.
+
+          values:   The facts to store, e.g. origin_url='https://...'.
+
+        """
+
+
+        with self._lock:
+            self.index.setdefault(repo_name, {}).update(values)
+
+
+    def touch(self, repo_name):
+        r"""
+        Records that a repo was just used.
+
+        Arguments:
+          repo_name:   (str) The repo directory name.
+
+        """
+
+
+        self.update(repo_name, last_access=self.clock())
+
+
+    def get_last_access(self, repo_name):
+        r"""
+        Returns:
+        When the repo was last used: the recorded time, or the directory's
+        modification time for repos used before tracking started.
+        """
+
+
+        last_access = self.get_entry(repo_name).get('last_access', None)
+
+        if last_access is None:
+            try:
+                last_access = os.path.getmtime(
+                  os.path.join(self.main_repo_dir, repo_name))
+            except OSError:
+                last_access = 0
+
+        return last_access
+
+
+    def get_bundle_filename(self, repo_name):
+        r"""
+        Returns:
+        Where the bundle of an evicted repo is stored.
+        """
+
+
+        return os.path.join(self.bundle_dir, '%s.bundle' % repo_name)
+
+
+    def is_evicted(self, repo_name):
+        r"""
+        Returns:
+        True if the repo is only available as a bundle.
+        """
+
+
+        return (not os.path.isdir(os.path.join(self.main_repo_dir, repo_name))
+                and os.path.isfile(self.get_bundle_filename(repo_name)))
+
+
+    def list_repos(self):
+        r"""
+        Returns:
+        The names of the repo directories currently on disk.
+        """
+
+
+        if not os.path.isdir(self.main_repo_dir):
+            return []
+
+        return sorted(
+          name for name in os.listdir(self.main_repo_dir)
+          if not name.startswith('.') and
+          os.path.isdir(os.path.join(self.main_repo_dir, name, '.git')))
+
+
+    def _list_worktrees(self, repo_dir):
+        r"""
+        Returns:
+        The directories of the linked worktrees of a repo (see
+        Submissions._checkout_assignment), without the repo itself.
+        """
+
+
+        try:
+            output = subprocess.check_output(
+              ['git', 'worktree', 'list', '--porcelain'],
+              cwd=repo_dir).decode('utf-8')
+        except subprocess.CalledProcessError:
+            return []
+
+        worktree_dirs = [line[len('worktree '):] for line in output.splitlines()
+                         if line.startswith('worktree ')]
+
+        return worktree_dirs[1:]  # the first one is the repo itself
+
+
+    def _get_repo_size(self, repo_name):
+        r"""
+        Returns:
+        The bytes on disk of a repo and of its assignment worktrees.
+        """
+
+
+        repo_dir = os.path.join(self.main_repo_dir, repo_name)
+
+        return get_directory_size(repo_dir) + sum(
+          get_directory_size(worktree_dir)
+          for worktree_dir in self._list_worktrees(repo_dir))
+
+
+    def evict(self, repo_name):
+        r"""
+        Packs a repo into a bundle and deletes its directory.
+
+        Arguments:
+          repo_name:   (str) The repo directory name.
+
+        Returns:
+        True if the repo was evicted, False if the bundle could not be made
+        (the repo is then left untouched).
+        """
+
+
+        repo_dir = os.path.join(self.main_repo_dir, repo_name)
+        bundle_filename = self.get_bundle_filename(repo_name)
+
+        if not os.path.isdir(self.bundle_dir):
+            os.makedirs(self.bundle_dir)
+
+        try:
+            origin_url = subprocess.check_output(
+              ['git', 'config', '--get', 'remote.origin.url'],
+              cwd=repo_dir).strip().decode('utf-8')
+        except subprocess.CalledProcessError:
+            origin_url = None
+
+        # Write next to the final name so an interrupted eviction never
+        # leaves a truncated bundle that looks valid
+        partial_filename = bundle_filename + '.partial'
+
+        try:
+            subprocess.check_output(
+              ['git', 'bundle', 'create', os.path.abspath(partial_filename),
+               '--all'], cwd=repo_dir, stderr=subprocess.STDOUT)
+        except subprocess.CalledProcessError as error:
+            print("evict: could not bundle '%s': %s" % (
+              repo_name, error.output.decode('utf-8', 'replace').strip()))
+            if os.path.isfile(partial_filename):
+                os.remove(partial_filename)
+            return False
+
+        # The assignment worktrees need the repo's object database
+        worktree_dirs = self._list_worktrees(repo_dir)
+
+        os.rename(partial_filename, bundle_filename)
+        shutil.rmtree(repo_dir)
+
+        for worktree_dir in worktree_dirs:
+            shutil.rmtree(worktree_dir, ignore_errors=True)
+
+        self.update(repo_name, origin_url=origin_url, evicted=self.clock())
+
+        return True
+
+
+    def rehydrate(self, repo_name):
+        r"""
+        Restores an evicted repo from its bundle. The origin is pointed back
+        at the host, so the next pull only fetches the new commits.
+
+        Arguments:
+          repo_name:   (str) The repo directory name.
+
+        Returns:
+        True if the repo is back on disk.
+        """
+
+
+        repo_dir = os.path.join(self.main_repo_dir, repo_name)
+        bundle_filename = self.get_bundle_filename(repo_name)
+        origin_url = self.get_entry(repo_name).get('origin_url', None)
+
+        try:
+            subprocess.check_output(
+              ['git', 'clone', '--quiet', os.path.abspath(bundle_filename),
+               repo_dir], stderr=subprocess.STDOUT)
+
+            if origin_url:
+                subprocess.check_output(
+                  ['git', 'remote', 'set-url', 'origin', origin_url],
+                  cwd=repo_dir, stderr=subprocess.STDOUT)
+
+        except subprocess.CalledProcessError as error:
+            print("rehydrate: could not restore '%s': %s" % (
+              repo_name, error.output.decode('utf-8', 'replace').strip()))
+            if os.path.isdir(repo_dir):
+                shutil.rmtree(repo_dir)
+            return False
+
+        os.remove(bundle_filename)
+        self.update(repo_name, evicted=None)
+        self.touch(repo_name)
+
+        return True
+
+
+    def enforce_budget(self, budget_bytes, protected=()):
+        r"""
+        Evicts the least recently used repos until the repos on disk fit in
+        the budget. A repo's assignment worktrees count towards its size, as
+        they go with it, and bundles count towards the budget too, since they
+        stay on disk.
+
+        Arguments:
+          budget_bytes:   (int) The disk budget for main_repo_dir.
+
+          protected:   (iterable of str) Repo names never evicted, e.g. the
+            ones in use by the current run.
+
+        Returns:
+        The list of evicted repo names.
+        """
+
+
+        sizes = dict((repo_name, self._get_repo_size(repo_name))
+                     for repo_name in self.list_repos())
+        total_size = sum(sizes.values()) + get_directory_size(self.bundle_dir)
+
+        protected = set(protected)
+        evicted = []
+
+        for repo_name in sorted(sizes, key=self.get_last_access):
+
+            if total_size <= budget_bytes:
+                break
+
+            if repo_name in protected:
+                continue
+
+            if self.evict(repo_name):
+                total_size += (
+                  os.path.getsize(self.get_bundle_filename(repo_name)) -
+                  sizes[repo_name])
+                evicted.append(repo_name)
+
+        self.save()
+
+        if total_size > budget_bytes:
+            print("enforce_budget: still %d bytes over the budget" %
+                  (total_size - budget_bytes))
+
+        return evicted
@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+r"""
+Finds the student repos that make runs slow.
+
+A handful of repos with committed build outputs, jars or datasets dominate
+the run time. This walks student_repo/ and profiles every repo:
+
+  * pack size and object count, from 'git count-objects -v',
+  * loose object count, which makes every git command slower,
+  * working tree size, without .git,
+  * duration and bytes of the last clone, pull or fetch, as recorded by
+    Submissions in student_repo/.repo_index.json.
+
+Each value is compared to the class median and the repos far above it are
+flagged as outliers, so they can be handled specially.
+
+Run it from the grading directory:
+
+    $ ./repo_diagnostics.py
+    $ ./repo_diagnostics.py --factor 5 --output diagnostics.txt
+"""
+
+
+__all__ = ["RepoProfile", "find_outliers", "format_diagnostics",
+           "profile_repo", "profile_repos", ]
+__author__ = "Travis Janssen, David Tran"
+__credits__ = ["Travis Janssen", "David Tran"]
+__status__ = "Production"
+__version__ = "1.0.0"
+
+
+import argparse
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+from repo_cache import RepoCache, count_objects, get_directory_size
+
+
+RepoProfile = namedtuple('RepoProfile', [
+  'name', 'pack_bytes', 'object_count', 'loose_objects', 'worktree_bytes',
+  'last_fetch_seconds', 'last_fetch_bytes'])
+
+# The metrics compared to the median, with the value below which a repo is
+# never an outlier (a median of 0 loose objects would flag everything)
+METRIC_MINIMUMS = [
+  ('pack_bytes', 1024 ** 2),
+  ('object_count', 1000),
+  ('loose_objects', 100),
+  ('worktree_bytes', 1024 ** 2),
+  ('last_fetch_seconds', 5),
+  ('last_fetch_bytes', 1024 ** 2),
+]
+
+DEFAULT_FACTOR = 3.0
+MAX_WORKERS = 8
+
+
+def profile_repo(repo_dir, cache_entry=None):
+    r"""
+    Arguments:
+      repo_dir:   (str) The repo directory.
+
+      cache_entry:   (dict) The repo's entry in the RepoCache index, for the
+        last fetch. None if unknown.
+
+    Returns:
+    A RepoProfile. Values that cannot be measured are None.
+    """
+
+
+    cache_entry = cache_entry or {}
+    counts = count_objects(repo_dir)
+
+    worktree_bytes = (get_directory_size(repo_dir) -
+                      get_directory_size(os.path.join(repo_dir, '.git')))
+
+    return RepoProfile(
+      name=os.path.basename(os.path.normpath(repo_dir)),
+      pack_bytes=(counts['size-pack'] * 1024 if 'size-pack' in counts
+                  else None),
+      object_count=(counts['count'] + counts['in-pack']
+                    if 'count' in counts and 'in-pack' in counts else None),
+      loose_objects=counts.get('count', None),
+      worktree_bytes=worktree_bytes,
+      last_fetch_seconds=cache_entry.get('last_fetch_seconds', None),
+      last_fetch_bytes=cache_entry.get('last_fetch_bytes', None))
+
+
+def profile_repos(main_repo_dir='student_repo', max_workers=MAX_WORKERS):
+    r"""
+    Arguments:
+      main_repo_dir:   (str) The directory holding the student repos.
+
+      max_workers:   (int) How many repos are profiled at once.
+
+    Returns:
+    A list of RepoProfile, one per repo on disk, sorted by name.
+    """
+
+
+    cache = RepoCache(main_repo_dir)
+
+    def profile(repo_name):
+        return profile_repo(os.path.join(main_repo_dir, repo_name),
+                            cache_entry=cache.get_entry(repo_name))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(profile, cache.list_repos()))
+
+
+def _get_median(values):
+
+    values = sorted(values)
+    middle = len(values) // 2
+
+    if len(values) % 2:
+        return values[middle]
+
+    return (values[middle - 1] + values[middle]) / 2.0
+
+
+def find_outliers(profiles, factor=DEFAULT_FACTOR):
+    r"""
+    Arguments:
+      profiles:   (list of RepoProfile) The profiled repos.
+
+      factor:   (float) A value more than factor times the class median is
+        an outlier.
+
+    Returns:
+    A tuple of (medians, outliers): the median of every metric, and a
+    dictionary from repo name to the list of metrics it is an outlier for.
+    """
+
+
+    medians = {}
+    outliers = {}
+
+    for metric, minimum in METRIC_MINIMUMS:
+
+        values = [getattr(profile, metric) for profile in profiles
+                  if getattr(profile, metric) is not None]
+
+        if not values:
+            continue
+
+        medians[metric] = median = _get_median(values)
+
+        for profile in profiles:
+
+            value = getattr(profile, metric)
+
+            if value is not None and value >= minimum and value > factor * median:
+                outliers.setdefault(profile.name, []).append(metric)
+
+    return medians, outliers
+
+
+def _format_value(metric, value):
+
+    if value is None:
+        return '-'
+    if metric.endswith('_bytes'):
+        return '%.1fM' % (value / 1024.0 ** 2)
+    if metric.endswith('_seconds'):
+        return '%.1fs' % value
+
+    return '%d' % value
+
+
+def format_diagnostics(profiles, factor=DEFAULT_FACTOR):
+    r"""
+    Arguments:
+      profiles:   (list of RepoProfile) The profiled repos.
+
+      factor:   (float) See find_outliers.
+
+    Returns:
+    The report as a string: the class medians, the outliers with how far
+    above the median they are, then every repo, slowest fetch first.
+    """
+
+
+    medians, outliers = find_outliers(profiles, factor=factor)
+    metrics = [metric for metric, _ in METRIC_MINIMUMS]
+
+    str_buffer = ["REPO DIAGNOSTICS (%d repos)" % len(profiles), "",
+                  "CLASS MEDIAN:"]
+    for metric in metrics:
+        str_buffer.append("\t%s: %s" % (
+          metric, _format_value(metric, medians.get(metric, None))))
+
+    str_buffer.extend(["", "OUTLIERS, more than %gx the median (%d):" % (
+      factor, len(outliers))])
+
+    for profile in profiles:
+        if profile.name in outliers:
+            str_buffer.append("\t%s: %s" % (profile.name, ", ".join(
+              "%s %s (%.1fx)" % (
+                metric, _format_value(metric, getattr(profile, metric)),
+                getattr(profile, metric) / float(medians[metric] or 1))
+              for metric in outliers[profile.name])))
+
+    str_buffer.extend(["", "ALL REPOS:",
+                       "\t" + "\t".join(['name'] + metrics)])
+
+    for profile in sorted(profiles, reverse=True, key=lambda profile: (
+      profile.last_fetch_seconds or 0, profile.pack_bytes or 0)):
+        str_buffer.append("\t" + "\t".join(
+          [profile.name] + [_format_value(metric, getattr(profile, metric))
+                            for metric in metrics]))
+
+    return "\n".join(str_buffer)
+
+
+def parse_main():
+    r"""
+    Reads the user input, profiles the repos and prints the report.
+    """
+
+
+    parser = argparse.ArgumentParser(
+      description="Profiles the student repos and flags the slow ones")
+
+    parser.add_argument(
+      '-r', '--repo_dir', default='student_repo', dest='repo_dir',
+      help="the directory holding the student repos (default student_repo)")
+
+    parser.add_argument(
+      '-x', '--factor', type=float, default=DEFAULT_FACTOR, dest='factor',
+      help=("flag values more than FACTOR times the class median "
+            "(default %g)" % DEFAULT_FACTOR))
+
+    parser.add_argument(
+      '-o', '--output', default=None, dest='output',
+      help="also write the report to this file")
+
+    args = parser.parse_args()
+
+    report = format_diagnostics(profile_repos(args.repo_dir),
+                                factor=args.factor)
+    print(report)
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(report + "\n")
+
+
+if __name__ == "__main__":
+    parse_main()
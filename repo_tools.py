@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+r"""
+Git plumbing shared by the tools that read the graded repos (similarity.py,
+diff_stats.py, export_snapshots.py and the builds of build_runner.py).
+
+  * run_git runs a git command in a repo and returns its output,
+  * get_commit resolves a tag (or any revision) to a commit SHA,
+  * get_blob_sha hashes file contents the way git does, so files can be
+    matched with the blobs of a tree without asking git,
+  * iter_template_files reads the starter code given with -t,
+  * init_worker and get_worker_state hand data that is the same for every
+    job (e.g. the template) to the processes of a ProcessPoolExecutor once,
+    instead of with every job.
+"""
+
+
+__all__ = ["get_blob_sha", "get_commit", "get_worker_state", "init_worker",
+           "iter_template_files", "run_git", ]
+__author__ = "Travis Janssen, David Tran"
+__credits__ = ["Travis Janssen", "David Tran"]
+__status__ = "Production"
+__version__ = "1.0.0"
+
+
+import hashlib
+import os
+import subprocess
+
+
+def run_git(repo_dir, args, input_bytes=None):
+    r"""
+    Arguments:
+      repo_dir:   (str) The repo to run in.
+
+      args:   (list of str) The git arguments, e.g. ['ls-tree', 'A3'].
+
+      input_bytes:   (bytes) Sent to the command's stdin, if set.
+
+    Returns:
+    The command's stdout, as bytes. Raises subprocess.CalledProcessError,
+    with what git printed to stderr as its output, if the command fails.
+    """
+
+
+    process = subprocess.Popen(
+      ['git'] + args, cwd=repo_dir,
+      stdin=subprocess.PIPE if input_bytes is not None else None,
+      stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    output, error_output = process.communicate(input_bytes)
+
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(
+          process.returncode, ['git'] + args, output=error_output)
+
+    return output
+
+
+def get_commit(repo_dir, revision):
+    r"""
+    Arguments:
+      repo_dir:   (str) The repo.
+
+      revision:   (str) A tag such as 'A3', or any other revision.
+
+    Returns:
+    The SHA of the commit, or None if the repo has no such commit.
+    """
+
+
+    try:
+        return run_git(repo_dir, ['rev-parse', '--verify', '--quiet',
+                                  '%s^{commit}' % revision]
+                       ).strip().decode('ascii')
+    except subprocess.CalledProcessError:
+        return None
+
+
+def get_blob_sha(data):
+    r"""
+    Returns:
+    The git blob hash of file contents, as 'git hash-object' computes it.
+    """
+
+
+    return hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()
+
+
+def iter_template_files(template_dir, include=None):
+    r"""
+    Reads the starter code, e.g. a checkout of the template repo. Symlinks
+    and the .git directory are skipped.
+
+    Arguments:
+      template_dir:   (str) The directory with the starter code. None for no
+        template.
+
+      include:   (function) Takes a filename and returns True if the file
+        should be read. Every file if None.
+
+    Returns:
+    A generator of (filename, contents, blob SHA).
+    """
+
+
+    if template_dir is None:
+        return
+
+    for root, directories, filenames in os.walk(template_dir):
+
+        if '.git' in directories:
+            directories.remove('.git')
+
+        for filename in filenames:
+
+            path = os.path.join(root, filename)
+            if os.path.islink(path) or (include is not None and
+                                        not include(filename)):
+                continue
+
+            with open(path, 'rb') as template_file:
+                data = template_file.read()
+
+            yield path, data, get_blob_sha(data)
+
+
+# Set in each worker process by init_worker
+_worker_state = None
+
+
+def init_worker(state):
+    r"""
+    The initializer of a ProcessPoolExecutor: keeps state for the jobs run in
+    this process (see get_worker_state). Call it directly to run the jobs in
+    this process instead.
+
+    Arguments:
+      state:   The data every job needs, e.g. the template.
+
+    """
+
+
+    global _worker_state
+    _worker_state = state
+
+
+def get_worker_state():
+    r"""
+    Returns:
+    The state given to init_worker in this process, None if not called.
+    """
+
+
+    return _worker_state
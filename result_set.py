@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+r"""
+Hands the student records from process_repos to generate_report in memory.
+
+process_repos fills a ResultSet while it works: it announces the records and
+which students it is about to process (start), then publishes each student
+as soon as it is done (put), and finally closes the set. generate_report
+reads the records through get, which only blocks for students still being
+processed, so the report can be written student by student while
+process_repos is still running in another thread.
+
+iter_completed hands out the students in the order they are done instead;
+Submissions.iter_results turns them into StudentResults.
+"""
+
+
+__all__ = ["ResultSet", "StudentResult", ]
+__author__ = "Travis Janssen, David Tran"
+__credits__ = ["Travis Janssen", "David Tran"]
+__status__ = "Production"
+__version__ = "1.0.0"
+
+
+from collections import namedtuple
+import threading
+
+
+# One student's result for an assignment, as yielded by
+# Submissions.iter_results:
+#   platform_id, gt_username, name:   who it is,
+#   commit_id:   the submitted commit, None if there is none,
+#   commit_valid:   whether the commit was found and checked out,
+#   is_late:   whether the submission or the commit is after the deadline,
+#   repo_sync:   'Ok', 'Failed' or 'Timeout' (None if the repo was not
+#     synced),
+#   build:   the build result (see build_runner), None without a build,
+#   result:   the assignment entry of the record, as stored,
+#   record:   the whole student record.
+StudentResult = namedtuple('StudentResult', [
+  'platform_id', 'gt_username', 'name', 'commit_id', 'commit_valid',
+  'is_late', 'repo_sync', 'build', 'result', 'record'])
+
+
+class ResultSet(object):
+    r"""
+    The student records of one process_repos run, shared between threads.
+    """
+
+
+    def __init__(self):
+
+        self._condition = threading.Condition()
+        self._records = None
+        self._pending = set()
+        self._completed = []  # (platform_id, student_record), in put order
+        self._closed = False
+
+
+    def start(self, student_records, pending_ids):
+        r"""
+        Publishes the records before processing starts.
+
+        Arguments:
+          student_records:   (dict) platform ID -> student record, with the
+            results of earlier runs.
+
+          pending_ids:   (iterable of str) The platform IDs process_repos is
+            about to update; get waits for them.
+
+        """
+
+
+        with self._condition:
+            self._records = student_records
+            self._pending = set(pending_ids)
+            self._condition.notify_all()
+
+
+    def put(self, platform_id, student_record):
+        r"""
+        Publishes a processed student.
+
+        Arguments:
+          platform_id:   (str) The student's platform ID.
+
+          student_record:   (dict) The student's updated record.
+
+        """
+
+
+        with self._condition:
+            self._records[platform_id] = student_record
+            self._pending.discard(platform_id)
+            self._completed.append((platform_id, student_record))
+            self._condition.notify_all()
+
+
+    def close(self):
+        r"""
+        Marks the end of processing, releasing every waiting get.
+        """
+
+
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+    def wait_started(self):
+        r"""
+        Returns:
+        True once the records are published, False if processing ended
+        without publishing them (e.g. on an error).
+        """
+
+
+        with self._condition:
+            while self._records is None and not self._closed:
+                self._condition.wait()
+
+            return self._records is not None
+
+
+    def get(self, platform_id):
+        r"""
+        Arguments:
+          platform_id:   (str) The student's platform ID.
+
+        Returns:
+        The student's record once it is final, None if there is none.
+        """
+
+
+        with self._condition:
+            while not self._closed and (
+                  self._records is None or platform_id in self._pending):
+                self._condition.wait()
+
+            if self._records is None:
+                return None
+
+            return self._records.get(platform_id, None)
+
+
+    def iter_completed(self):
+        r"""
+        Yields the students as they are put, waiting for the next one until
+        the set is closed.
+
+        Returns:
+        A generator of (platform_id, student_record) tuples, in the order
+        the students were done.
+        """
+
+
+        index = 0
+
+        while True:
+
+            with self._condition:
+                while index >= len(self._completed) and not self._closed:
+                    self._condition.wait()
+
+                if index >= len(self._completed):
+                    return
+
+                completed = self._completed[index]
+
+            index += 1
+            yield completed
@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+r"""
+Merges a roster export into the existing student and team records.
+
+The roster (students_full.txt, teams_full.txt) is read line by line and each
+line is merged into the records already on disk, so re-running -j in the
+middle of the semester keeps every stored assignment result:
+
+  * new students or team members are added,
+  * students missing from the roster are dropped: their alias (and team
+    membership) is removed so they are no longer processed, while their
+    student record and its results are kept,
+  * a changed name or GT username is a rename and keeps the results,
+  * a student listed under another team is a team move.
+
+Every merge returns a RosterDiff describing what changed, which also tells
+the caller which files need to be written at all.
+"""
+
+
+__all__ = ["RosterDiff", "iter_student_roster", "iter_team_roster",
+           "merge_student_roster", "merge_team_roster", ]
+__author__ = "Travis Janssen, David Tran"
+__credits__ = ["Travis Janssen", "David Tran"]
+__status__ = "Production"
+__version__ = "1.0.0"
+
+
+class RosterDiff(object):
+    r"""
+    The changes a roster merge made.
+
+    Each list holds short descriptions, e.g. "Fakestudent, Alex (11111)".
+    """
+
+
+    def __init__(self):
+
+        self.added = []
+        self.dropped = []
+        self.renamed = []
+        self.moved = []
+
+        # Which record files have to be written
+        self.changed_files = set()
+
+
+    def is_empty(self):
+        r"""
+        Returns:
+        True if the roster matched the records already.
+        """
+
+
+        return not (self.added or self.dropped or self.renamed or self.moved)
+
+
+    def format(self):
+        r"""
+        Returns:
+        A multi-line summary of the changes.
+        """
+
+
+        if self.is_empty():
+            return "No roster changes"
+
+        str_buffer = []
+        for title, changes in [("ADDED", self.added),
+                               ("DROPPED", self.dropped),
+                               ("RENAMED", self.renamed),
+                               ("TEAM MOVES", self.moved)]:
+            if changes:
+                str_buffer.append("%s (%d):\n\t%s" % (
+                  title, len(changes), "\n\t".join(changes)))
+
+        return "\n".join(str_buffer)
+
+
+def iter_student_roster(input_file, platform, platforms_valid):
+    r"""
+    Reads the student roster one line at a time.
+
+    Arguments:
+      input_file:   (file) The open roster export, tab separated.
+
+      platform:   (str) "TSQUARE" lists 'name, gt_id, platform_id', "CANVAS"
+        lists 'name, platform_id, gt_id'.
+
+      platforms_valid:   (list of str) The supported platforms, for the error.
+
+    Returns:
+    A generator of (name, platform_id, gt_id) tuples. Malformed lines are
+    printed and skipped.
+    """
+
+
+    for line in input_file:
+
+        parsed_line = line.strip().split('\t')
+
+        try:
+            if platform == "TSQUARE":
+                name, gt_id, platform_id = parsed_line[0:3]
+            elif platform == "CANVAS":
+                name, platform_id, gt_id = parsed_line[0:3]
+            else:
+                raise TypeError("create_student_json error! Currently selected platform %s isn't supported yet! Valid platforms are %s" % (platform, platforms_valid))
+        except ValueError:
+            print("Malformed input not added: %s" % str(parsed_line))
+            continue # just skip malformed input
+
+        yield name, platform_id, gt_id
+
+
+def iter_team_roster(input_file):
+    r"""
+    Reads the team roster one line at a time.
+
+    Arguments:
+      input_file:   (file) The open roster export, formatted as
+        "<GTID>\t<Grader>\t<Team#>".
+
+    Returns:
+    A generator of (gt_username, team) tuples. Students without a team are
+    in team "None".
+    """
+
+
+    for line in input_file:
+
+        parsed = line.strip().split('\t')
+
+        if not parsed[0]:
+            continue
+
+        try:
+            team = parsed[2]
+        except IndexError:
+            team = "None"
+
+        yield parsed[0], team
+
+
+def merge_student_roster(student_records, student_aliases, roster_rows,
+                         records_filename, aliases_filename):
+    r"""
+    Merges roster rows into the student records and aliases, in place.
+
+    Arguments:
+      student_records:   (dict) platform_id -> {'name', 'gt_id', results}.
+
+      student_aliases:   (dict) gt_id -> platform_id.
+
+      roster_rows:   (iterable) (name, platform_id, gt_id) tuples.
+
+      records_filename, aliases_filename:   (str) The names added to
+        RosterDiff.changed_files when the matching dictionary changes.
+
+    Returns:
+    A RosterDiff.
+    """
+
+
+    diff = RosterDiff()
+    seen_platform_ids = set()
+
+    for name, platform_id, gt_id in roster_rows:
+
+        seen_platform_ids.add(platform_id)
+        current_student = student_records.get(platform_id, None)
+
+        if current_student is None:
+            student_records[platform_id] = {'name': name, 'gt_id': gt_id}
+            diff.added.append("%s (%s)" % (name, gt_id))
+            diff.changed_files.add(records_filename)
+
+        elif (current_student.get('name') != name or
+              current_student.get('gt_id') != gt_id):
+
+            diff.renamed.append("%s (%s) -> %s (%s)" % (
+              current_student.get('name'), current_student.get('gt_id'),
+              name, gt_id))
+
+            if student_aliases.get(current_student.get('gt_id')) == platform_id:
+                del student_aliases[current_student['gt_id']]
+                diff.changed_files.add(aliases_filename)
+
+            current_student['name'] = name
+            current_student['gt_id'] = gt_id
+            diff.changed_files.add(records_filename)
+
+        if student_aliases.get(gt_id) != platform_id:
+            student_aliases[gt_id] = platform_id
+            diff.changed_files.add(aliases_filename)
+
+    for gt_id, platform_id in list(student_aliases.items()):
+
+        if platform_id not in seen_platform_ids:
+            del student_aliases[gt_id]
+            diff.dropped.append("%s (%s)" % (
+              student_records.get(platform_id, {}).get('name'), gt_id))
+            diff.changed_files.add(aliases_filename)
+
+    return diff
+
+
+def merge_team_roster(student_teams, team_members, roster_rows,
+                      teams_filename, members_filename):
+    r"""
+    Merges roster rows into the team records, in place.
+
+    Arguments:
+      student_teams:   (dict) gt_username -> team.
+
+      team_members:   (dict) team -> list of gt_usernames.
+
+      roster_rows:   (iterable) (gt_username, team) tuples.
+
+      teams_filename, members_filename:   (str) The names added to
+        RosterDiff.changed_files when the matching dictionary changes.
+
+    Returns:
+    A RosterDiff.
+    """
+
+
+    diff = RosterDiff()
+    seen_students = set()
+
+    def remove_member(gt_username, team):
+        members = team_members.get(team, [])
+        if gt_username in members:
+            members.remove(gt_username)
+        if not members:
+            team_members.pop(team, None)
+
+    for gt_username, team in roster_rows:
+
+        seen_students.add(gt_username)
+        old_team = student_teams.get(gt_username, None)
+
+        if old_team == team:
+            continue
+
+        if old_team is None:
+            diff.added.append("%s (%s)" % (gt_username, team))
+        else:
+            diff.moved.append("%s: %s -> %s" % (gt_username, old_team, team))
+            remove_member(gt_username, old_team)
+
+        student_teams[gt_username] = team
+        team_members.setdefault(team, []).append(gt_username)
+        diff.changed_files.update([teams_filename, members_filename])
+
+    for gt_username in sorted(set(student_teams) - seen_students):
+
+        team = student_teams.pop(gt_username)
+        remove_member(gt_username, team)
+        diff.dropped.append("%s (%s)" % (gt_username, team))
+        diff.changed_files.update([teams_filename, members_filename])
+
+    return diff
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+r"""
+Splits a full-class run across several machines and merges the results.
+
+Each machine runs "download_submission.py <code> --shard i/N" and processes
+only the students (or teams) whose stable hash falls in slice i of N. The
+hash is an MD5 of the GT username or team name, so every machine computes the
+same slices without talking to the others.
+
+A shard writes its results to its own records file (e.g.
+student_records.shard2of4.json) and report. Once every shard file has been
+copied back to one machine, "download_submission.py <code> --merge_shards N"
+takes each student's assignment result from the shard that owns the student,
+writes student_records.json and generates one consolidated report.
+"""
+
+
+__all__ = ["filter_shard", "get_shard", "get_shard_filename", "merge_shards",
+           "parse_shard", ]
+__author__ = "Travis Janssen, David Tran"
+__credits__ = ["Travis Janssen", "David Tran"]
+__status__ = "Production"
+__version__ = "1.0.0"
+
+
+import hashlib
+import os
+
+
+def parse_shard(shard_str):
+    r"""
+    Reads a shard given on the command line.
+
+    Arguments:
+      shard_str:   (str) The shard as 'i/N', with 1 <= i <= N.
+
+    Returns:
+    A tuple (i, N). Raises ValueError if the format is wrong.
+    """
+
+
+    try:
+        index, count = [int(part) for part in shard_str.split('/')]
+    except ValueError:
+        raise ValueError("Shard '%s' is not formatted as i/N" % shard_str)
+
+    if not 1 <= index <= count:
+        raise ValueError("Shard '%s' must have 1 <= i <= N" % shard_str)
+
+    return index, count
+
+
+def get_shard(key, count):
+    r"""
+    Arguments:
+      key:   (str) A GT username or team name.
+
+      count:   (int) The number of shards.
+
+    Returns:
+    The shard (1 to count) owning key. Unlike hash(), this is the same on
+    every machine and every run.
+    """
+
+
+    digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+
+    return int(digest, 16) % count + 1
+
+
+def filter_shard(keys, index, count):
+    r"""
+    Arguments:
+      keys:   (list of str) GT usernames or team names.
+
+      index, count:   (int) The shard, as returned by parse_shard.
+
+    Returns:
+    The keys owned by the shard, in their original order.
+    """
+
+
+    return [key for key in keys if get_shard(key, count) == index]
+
+
+def get_shard_filename(filename, index, count):
+    r"""
+    Arguments:
+      filename:   (str) A records or report filename.
+
+      index, count:   (int) The shard.
+
+    Returns:
+    The shard-local filename, e.g. 'student_records.shard2of4.json'.
+    """
+
+
+    root, extension = os.path.splitext(filename)
+
+    return '%s.shard%dof%d%s' % (root, index, count, extension)
+
+
+def merge_shards(submissions, assignment_alias, count):
+    r"""
+    Merges the shard records files into the main records file.
+
+    Each student's result for the assignment is taken from the shard owning
+    the student (or the student's team), so results left over in a shard's
+    copy of the other students are ignored.
+
+    Arguments:
+      submissions:   (Submissions) Gives the record filenames and whether
+        this is a team assignment.
+
+      assignment_alias:   (str) The assignment name results are stored under.
+
+      count:   (int) The number of shards.
+
+    Returns:
+    A list of the shards whose records file was missing.
+    """
+
+
+    student_records = submissions._load_json_file(
+      submissions.STUDENT_RECORDS_FILENAME)
+    student_teams = (submissions._load_json_file(
+      submissions.TEAM_RECORDS_FILENAME) if submissions.is_team else {})
+
+    missing_shards = []
+
+    for index in range(1, count + 1):
+
+        shard_filename = get_shard_filename(
+          submissions.STUDENT_RECORDS_FILENAME, index, count)
+
+        if not os.path.isfile(shard_filename):
+            missing_shards.append(index)
+            continue
+
+        shard_records = submissions._load_json_file(shard_filename)
+
+        for platform_id, shard_student in shard_records.items():
+
+            if assignment_alias not in shard_student:
+                continue
+
+            key = shard_student.get('gt_id')
+            if submissions.is_team:
+                key = student_teams.get(key, key)
+
+            if key is None or get_shard(key, count) != index:
+                continue
+
+            current_student = student_records.setdefault(platform_id, {})
+            current_student.setdefault('name', shard_student.get('name'))
+            current_student.setdefault('gt_id', shard_student.get('gt_id'))
+            current_student[assignment_alias] = shard_student[assignment_alias]
+
+    submissions._save_json_file(submissions.STUDENT_RECORDS_FILENAME,
+                                student_records)
+
+    return missing_shards
@@ -0,0 +1,427 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+r"""
+Flags suspiciously similar submissions across the student repos.
+
+Comparing every pair of 600 repos is out of the question, so each repo is
+summarized once and only likely pairs are compared:
+
+  * the source files of the repo at the assignment tag (set by
+    Submissions._checkout_assignment, e.g. 'A3') are read straight from git,
+    without checking anything out,
+  * starter code is left out: files identical to a file of the template,
+    and every shingle that also occurs in the template,
+  * the rest is cut into shingles (runs of SHINGLE_SIZE tokens) and
+    summarized by a MinHash signature of NUM_PERMUTATIONS values; the share
+    of equal values of two signatures estimates the Jaccard similarity of
+    the two shingle sets,
+  * LSH banding puts the signatures in buckets by bands of rows, so only
+    repos sharing a bucket become candidate pairs.
+
+Signatures are computed in a process pool and cached by commit SHA (and
+template) in similarity_cache.json, so a re-run only handles the repos that
+changed.
+
+Run it from the grading directory:
+
+    $ ./similarity.py A3 --template ../starter_code
+    $ ./similarity.py A3 --template ../starter_code --threshold 0.6 -o similar_A3.txt
+"""
+
+
+__all__ = ["SignatureCache", "estimate_similarity", "find_candidate_pairs",
+           "find_similar_repos", "get_minhash_signature", "get_shingles",
+           "read_template", ]
+__author__ = "Travis Janssen, David Tran"
+__credits__ = ["Travis Janssen", "David Tran"]
+__status__ = "Production"
+__version__ = "1.0.0"
+
+
+import argparse
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import itertools
+import json
+import os
+import random
+import re
+import zlib
+
+from repo_cache import RepoCache
+from repo_tools import (get_commit, get_worker_state, init_worker,
+                        iter_template_files, run_git)
+
+
+SOURCE_EXTENSIONS = ('.c', '.cc', '.cpp', '.cs', '.h', '.hpp', '.java',
+                     '.js', '.kt', '.py', '.rb', '.scala', '.sh', '.ts')
+
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 128
+NUM_BANDS = 32  # of NUM_PERMUTATIONS // NUM_BANDS rows each
+DEFAULT_THRESHOLD = 0.5
+DEFAULT_CACHE_FILENAME = 'similarity_cache.json'
+
+# MinHash permutations h(x) = (a * x + b) mod MERSENNE_PRIME, fixed so that
+# cached signatures stay comparable between runs
+MERSENNE_PRIME = (1 << 61) - 1
+_random = random.Random(6300)
+PERMUTATIONS = [(_random.randrange(1, MERSENNE_PRIME),
+                 _random.randrange(0, MERSENNE_PRIME))
+                for _ in range(NUM_PERMUTATIONS)]
+
+TOKEN_PATTERN = re.compile(r'[A-Za-z_][A-Za-z0-9_]*|\d+|[^\sA-Za-z0-9_]')
+COMMENT_PATTERN = re.compile(r'//[^\n]*|/\*.*?\*/|#[^\n]*', re.DOTALL)
+
+
+def get_shingles(text, shingle_size=SHINGLE_SIZE):
+    r"""
+    Arguments:
+      text:   (str) A source file.
+
+      shingle_size:   (int) The number of tokens in a shingle.
+
+    Returns:
+    The set of shingles of the text, each hashed to a 32 bit int. Comments
+    and whitespace are ignored.
+    """
+
+
+    tokens = TOKEN_PATTERN.findall(COMMENT_PATTERN.sub(' ', text))
+
+    return set(
+      zlib.crc32(' '.join(tokens[index:index + shingle_size]).encode('utf-8'))
+      & 0xffffffff
+      for index in range(max(1, len(tokens) - shingle_size + 1))
+      if tokens)
+
+
+def get_minhash_signature(shingles):
+    r"""
+    Arguments:
+      shingles:   (set of int) Hashed shingles.
+
+    Returns:
+    The MinHash signature, a list of NUM_PERMUTATIONS ints, or None if there
+    are no shingles.
+    """
+
+
+    if not shingles:
+        return None
+
+    return [min((a * shingle + b) % MERSENNE_PRIME for shingle in shingles)
+            for a, b in PERMUTATIONS]
+
+
+def estimate_similarity(signature, other_signature):
+    r"""
+    Returns:
+    The estimated Jaccard similarity of the shingle sets behind two
+    signatures.
+    """
+
+
+    same = sum(1 for value, other_value in zip(signature, other_signature)
+               if value == other_value)
+
+    return same / float(len(signature))
+
+
+def find_candidate_pairs(signatures, num_bands=NUM_BANDS):
+    r"""
+    Arguments:
+      signatures:   (dict) Repo name -> MinHash signature.
+
+      num_bands:   (int) The number of LSH bands. More bands find pairs of
+        lower similarity, at the cost of more candidates.
+
+    Returns:
+    The set of (name, other_name) pairs, sorted within each pair, sharing at
+    least one band.
+    """
+
+
+    rows = NUM_PERMUTATIONS // num_bands
+    candidates = set()
+
+    for band in range(num_bands):
+
+        buckets = defaultdict(list)
+
+        for name, signature in signatures.items():
+            buckets[tuple(signature[band * rows:(band + 1) * rows])].append(name)
+
+        for names in buckets.values():
+            candidates.update(itertools.combinations(sorted(names), 2))
+
+    return candidates
+
+
+def _is_source_file(path):
+
+    return path.lower().endswith(SOURCE_EXTENSIONS)
+
+
+def read_template(template_dir):
+    r"""
+    Reads the starter code.
+
+    Arguments:
+      template_dir:   (str) A directory with the starter code, e.g. a
+        checkout of the template repo. None for no template.
+
+    Returns:
+    A tuple (blob SHAs, shingles) of the template's source files.
+    """
+
+
+    blob_shas, shingles = set(), set()
+
+    for _, data, blob_sha in iter_template_files(template_dir,
+                                                 include=_is_source_file):
+        blob_shas.add(blob_sha)
+        shingles.update(get_shingles(data.decode('utf-8', 'replace')))
+
+    return blob_shas, shingles
+
+
+def _compute_signature(repo_dir, commit):
+    r"""
+    Arguments:
+      repo_dir:   (str) The repo.
+
+      commit:   (str) The commit SHA to read.
+
+    Returns:
+    The MinHash signature of the repo's source files at commit, without the
+    template, or None if nothing is left.
+    """
+
+
+    # The template, sent once to each worker process (see init_worker)
+    template_blob_shas, template_shingles = get_worker_state()
+
+    blob_shas = []
+    for line in run_git(repo_dir, ['ls-tree', '-r', '-z', commit]).split(b'\0'):
+
+        if not line:
+            continue
+
+        info, path = line.split(b'\t', 1)
+        _, object_type, blob_sha = info.split()
+
+        if (object_type == b'blob' and
+              _is_source_file(path.decode('utf-8', 'replace')) and
+              blob_sha.decode('ascii') not in template_blob_shas):
+            blob_shas.append(blob_sha)
+
+    if not blob_shas:
+        return None
+
+    # One 'git cat-file' for all the files: '<sha> blob <size>\n<data>\n'
+    output = run_git(repo_dir, ['cat-file', '--batch'],
+                     input_bytes=b'\n'.join(blob_shas) + b'\n')
+
+    shingles, position = set(), 0
+    while position < len(output):
+        header_end = output.index(b'\n', position)
+        size = int(output[position:header_end].split()[2])
+        data = output[header_end + 1:header_end + 1 + size]
+        shingles.update(get_shingles(data.decode('utf-8', 'replace')))
+        position = header_end + 1 + size + 1
+
+    return get_minhash_signature(shingles - template_shingles)
+
+
+class SignatureCache(object):
+    r"""
+    MinHash signatures by commit SHA and template, in a JSON file.
+    """
+
+
+    def __init__(self, filename=DEFAULT_CACHE_FILENAME):
+
+        self.filename = filename
+
+        try:
+            with open(filename, 'r') as cache_file:
+                self.entries = json.load(cache_file)
+        except (IOError, ValueError):
+            self.entries = {}
+
+
+    def get(self, key):
+
+        return self.entries.get(key, None)
+
+
+    def put(self, key, signature):
+
+        self.entries[key] = signature
+
+
+    def save(self):
+
+        with open(self.filename, 'w') as cache_file:
+            json.dump(self.entries, cache_file)
+
+
+def _get_template_key(template):
+    r"""
+    Returns:
+    A short fingerprint of the template and the shingling settings, part of
+    every cache key.
+    """
+
+
+    blob_shas, _ = template
+    digest = hashlib.sha1(('%d|%d|' % (SHINGLE_SIZE, NUM_PERMUTATIONS)).encode(
+      'ascii'))
+    for blob_sha in sorted(blob_shas):
+        digest.update(blob_sha.encode('ascii'))
+
+    return digest.hexdigest()[:12]
+
+
+def find_similar_repos(assignment_code, main_repo_dir='student_repo',
+                       template_dir=None, threshold=DEFAULT_THRESHOLD,
+                       cache=None, max_workers=None):
+    r"""
+    Finds the pairs of repos whose submissions are similar.
+
+    Arguments:
+      assignment_code:   (str) The tag of the graded commits, e.g. 'A3'.
+
+      main_repo_dir:   (str) The directory holding the student repos.
+
+      template_dir:   (str) The starter code to leave out, or None.
+
+      threshold:   (float) The lowest estimated Jaccard similarity reported.
+
+      cache:   (SignatureCache) The signature cache; a new one on
+        DEFAULT_CACHE_FILENAME if None. It is saved at the end.
+
+      max_workers:   (int) The size of the process pool. 1 computes the
+        signatures in this process.
+
+    Returns:
+    A tuple (pairs, skipped): the list of (similarity, name, other_name)
+    sorted by decreasing similarity, and the names of the repos without the
+    tag or without source files of their own.
+    """
+
+
+    if cache is None:
+        cache = SignatureCache()
+
+    template = read_template(template_dir)
+    template_key = _get_template_key(template)
+
+    signatures, to_compute, skipped = {}, [], []
+
+    for repo_name in RepoCache(main_repo_dir).list_repos():
+
+        repo_dir = os.path.join(main_repo_dir, repo_name)
+
+        commit = get_commit(repo_dir, assignment_code)
+        if commit is None:
+            skipped.append(repo_name)
+            continue
+
+        key = '%s|%s' % (commit, template_key)
+        if key in cache.entries:
+            signatures[repo_name] = cache.get(key)
+        else:
+            to_compute.append((repo_name, repo_dir, commit, key))
+
+    if max_workers == 1:
+        init_worker(template)
+        computed = [_compute_signature(repo_dir, commit)
+                    for _, repo_dir, commit, _ in to_compute]
+    elif to_compute:
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 initializer=init_worker,
+                                 initargs=(template,)) as executor:
+            computed = list(executor.map(
+              _compute_signature, [job[1] for job in to_compute],
+              [job[2] for job in to_compute]))
+    else:
+        computed = []
+
+    for (repo_name, _, _, key), signature in zip(to_compute, computed):
+        cache.put(key, signature)
+        signatures[repo_name] = signature
+
+    cache.save()
+
+    for repo_name in sorted(signatures):
+        if signatures[repo_name] is None:
+            del signatures[repo_name]
+            skipped.append(repo_name)
+
+    pairs = []
+    for name, other_name in find_candidate_pairs(signatures):
+        similarity = estimate_similarity(signatures[name], signatures[other_name])
+        if similarity >= threshold:
+            pairs.append((similarity, name, other_name))
+
+    pairs.sort(key=lambda pair: (-pair[0], pair[1], pair[2]))
+
+    return pairs, sorted(skipped)
+
+
+def parse_main():
+    r"""
+    Reads the user input, finds the similar repos and prints them.
+    """
+
+
+    parser = argparse.ArgumentParser(
+      description="Flags similar submissions across the student repos")
+
+    parser.add_argument(
+      'assignment_code',
+      help="the tag of the graded commits, e.g. A3")
+
+    parser.add_argument(
+      '-t', '--template', default=None, dest='template_dir',
+      help="a directory with the starter code, which is left out")
+
+    parser.add_argument(
+      '-x', '--threshold', type=float, default=DEFAULT_THRESHOLD,
+      dest='threshold',
+      help=("report pairs with an estimated similarity of at least "
+            "THRESHOLD (default %g)" % DEFAULT_THRESHOLD))
+
+    parser.add_argument(
+      '-r', '--repo_dir', default='student_repo', dest='repo_dir',
+      help="the directory holding the student repos (default student_repo)")
+
+    parser.add_argument(
+      '-o', '--output', default=None, dest='output',
+      help="also write the report to this file")
+
+    args = parser.parse_args()
+
+    pairs, skipped = find_similar_repos(
+      assignment_code=args.assignment_code, main_repo_dir=args.repo_dir,
+      template_dir=args.template_dir, threshold=args.threshold)
+
+    str_buffer = ["SIMILAR SUBMISSIONS for %s (%d pairs):" % (
+      args.assignment_code, len(pairs))]
+    str_buffer.extend("\t%.2f\t%s\t%s" % pair for pair in pairs)
+    str_buffer.append("\nNOT COMPARED, no tag or no own source files (%d):"
+                      "\n\t%s" % (len(skipped), ", ".join(skipped)))
+
+    report = "\n".join(str_buffer)
+    print(report)
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(report + "\n")
+
+
+if __name__ == "__main__":
+    parse_main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+r"""
+Where submission files are read from: an extracted folder or the bulk
+download ZIP itself.
+
+Submissions reads every submission file through a source object, by the same
+path it would use on disk (e.g. './submissions/A3/name_123_text.html'):
+
+  * FolderSource opens the real file,
+  * ZipSource maps the path into the archive and streams the member. The
+    archive's central directory is read once and serves as the folder index,
+    so nothing is extracted to disk.
+
+Use open_submission_source to get the right one for a submission folder name.
+"""
+
+
+__all__ = ["FolderSource", "ZipSource", "open_submission_source", ]
+__author__ = "Travis Janssen, David Tran"
+__credits__ = ["Travis Janssen", "David Tran"]
+__status__ = "Production"
+__version__ = "1.0.0"
+
+
+import io
+import os
+import posixpath
+import threading
+import zipfile
+
+
+ZIP_EXTENSION = '.zip'
+
+
+class FolderSource(object):
+    r"""
+    Reads submissions from the file system, i.e. an extracted bulk download.
+    """
+
+
+    def __init__(self, root=None):
+        r"""
+        Arguments:
+          root:   (str) The submission folder. Only used for display.
+
+        """
+
+
+        self.root = root
+
+
+    def open(self, path, encoding='utf-8'):
+        r"""
+        Arguments:
+          path:   (str) The path of the file.
+
+          encoding:   (str) The text encoding of the file.
+
+        Returns:
+        A text file object. Raises IOError if the file does not exist.
+        """
+
+
+        return io.open(path, 'r', encoding=encoding, errors='replace')
+
+
+    def list_folders(self, directory):
+        r"""
+        Arguments:
+          directory:   (str) The directory to list.
+
+        Returns:
+        The names of the sub folders of directory.
+        """
+
+
+        return [name for name in os.listdir(directory)
+                if os.path.isdir(os.path.join(directory, name))]
+
+
+    def close(self):
+        pass
+
+
+class ZipSource(FolderSource):
+    r"""
+    Reads submissions straight out of a bulk download ZIP.
+
+    A ZipFile is not safe to read from several threads at once (on Python 2
+    in particular), so every thread reading submissions gets its own handle
+    on the archive.
+    """
+
+
+    def __init__(self, zip_filename, root):
+        r"""
+        Arguments:
+          zip_filename:   (str) The ZIP archive.
+
+          root:   (str) The folder the archive stands in for; paths below it
+            are looked up in the archive.
+
+        """
+
+
+        super(ZipSource, self).__init__(root=root)
+
+        self.zip_filename = zip_filename
+        self.zip_file = zipfile.ZipFile(zip_filename, 'r')
+        self.index = {}  # archive relative path -> ZipInfo
+
+        self._local = threading.local()
+        self._local.zip_file = self.zip_file
+        self._zip_files = [self.zip_file]  # every handle, to close them
+        self._lock = threading.Lock()
+
+        members = [info for info in self.zip_file.infolist()
+                   if not info.filename.endswith('/')]
+
+        # Bulk downloads are often wrapped in one folder named after the
+        # assignment; that folder is the submission folder itself.
+        prefix = ''
+        top_folders = set(info.filename.split('/', 1)[0] for info in members)
+        if (len(top_folders) == 1 and
+              all('/' in info.filename for info in members)):
+            prefix = top_folders.pop() + '/'
+
+        for info in members:
+            self.index[posixpath.normpath(info.filename[len(prefix):])] = info
+
+
+    def _get_member_name(self, path):
+        r"""
+        Arguments:
+          path:   (str) A path below root.
+
+        Returns:
+        The normalized path inside the archive.
+        """
+
+
+        relative_path = os.path.relpath(path, self.root)
+
+        return posixpath.normpath(relative_path.replace(os.sep, '/'))
+
+
+    def _get_zip_file(self):
+        r"""
+        Returns:
+        The calling thread's handle on the archive, opened on first use.
+        """
+
+
+        zip_file = getattr(self._local, 'zip_file', None)
+
+        if zip_file is None:
+            zip_file = self._local.zip_file = zipfile.ZipFile(
+              self.zip_filename, 'r')
+
+            with self._lock:
+                self._zip_files.append(zip_file)
+
+        return zip_file
+
+
+    def open(self, path, encoding='utf-8'):
+
+        info = self.index.get(self._get_member_name(path), None)
+
+        if info is None:
+            raise IOError("'%s' not found in '%s'" % (path, self.zip_filename))
+
+        return io.TextIOWrapper(self._get_zip_file().open(info),
+                                encoding=encoding, errors='replace')
+
+
+    def list_folders(self, directory):
+
+        directory = self._get_member_name(directory)
+        prefix = '' if directory == '.' else directory + '/'
+        folders = set()
+
+        for member_name in self.index:
+            if member_name.startswith(prefix) and '/' in member_name[len(prefix):]:
+                folders.add(member_name[len(prefix):].split('/', 1)[0])
+
+        return sorted(folders)
+
+
+    def close(self):
+
+        with self._lock:
+            for zip_file in self._zip_files:
+                zip_file.close()
+
+
+def open_submission_source(submission_folder_name):
+    r"""
+    Picks the source for a submission folder.
+
+    Arguments:
+      submission_folder_name:   (str) Either an extracted folder, a ZIP
+        archive, or a folder name next to which '<name>.zip' exists.
+
+    Returns:
+    A tuple of (source, submission folder name) where the name never ends in
+    '.zip', so it can still be used to build paths and the assignment name.
+    Raises IOError if neither the folder nor the archive exist.
+    """
+
+
+    folder_name = submission_folder_name
+    if folder_name.lower().endswith(ZIP_EXTENSION):
+        folder_name = folder_name[:-len(ZIP_EXTENSION)]
+
+    if os.path.isdir(folder_name):
+        return FolderSource(root=folder_name), folder_name
+
+    zip_filename = folder_name + ZIP_EXTENSION
+    if os.path.isfile(zip_filename) and zipfile.is_zipfile(zip_filename):
+        return ZipSource(zip_filename=zip_filename, root=folder_name), folder_name
+
+    raise IOError("Neither '%s' nor '%s' found" % (folder_name, zip_filename))
@@ -0,0 +1,22 @@
+from unittest import TestCase
+
+import os
+
+import benchmarks
+
+
+class TestBenchmarks(TestCase):
+    def test_regressions_beyond_threshold(self):
+        baseline = {"generate_report@100": 0.010, "records_json_load@100": 0.002}
+        results = {"generate_report@100": 0.013, "records_json_load@100": 0.0024, "records_json_dump@100": 0.5}
+
+        self.assertEqual(benchmarks.find_regressions(results, baseline, threshold=0.25),
+                         [("generate_report@100", 0.013, 0.010)])
+
+    def test_every_benchmark_runs(self):
+        old_dir = os.getcwd()
+        results = benchmarks.run_benchmarks(sizes=[4], repeat=1)
+
+        self.assertEqual(list(results), ["%s@4" % name for name in benchmarks.BENCHMARKS])
+        self.assertTrue(all(seconds > 0 for seconds in results.values()))
+        self.assertEqual(os.getcwd(), old_dir)
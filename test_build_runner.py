@@ -0,0 +1,80 @@
+from unittest import TestCase
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import build_runner
+
+
+class TestParseTestCounts(TestCase):
+    def test_maven_totals_win(self):
+        lines = ["Tests run: 3, Failures: 1, Errors: 0, Skipped: 0, Time elapsed: 0.1 s",
+                 "Tests run: 10, Failures: 1, Errors: 1, Skipped: 2"]
+        self.assertEqual(build_runner.parse_test_counts(lines), (6, 2))
+
+    def test_pytest_and_unittest(self):
+        self.assertEqual(build_runner.parse_test_counts(["==== 2 failed, 10 passed in 0.52s ===="]), (10, 2))
+        self.assertEqual(build_runner.parse_test_counts(["Ran 5 tests in 0.1s", "", "FAILED (failures=1, errors=1)"]), (3, 2))
+
+    def test_no_counts(self):
+        self.assertEqual(build_runner.parse_test_counts(["BUILD SUCCESSFUL"]), (None, None))
+
+
+class TestBuildRunner(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.repo_dir = os.path.join(self.temp_dir, "6300Fall18afakestudent")
+        os.makedirs(self.repo_dir)
+        with open(os.path.join(self.repo_dir, "check.py"), "w") as script_file:
+            script_file.write("import sys\nprint('Tests run: 3, Failures: 1, Errors: 0')\nsys.exit(1)\n")
+        for args in [["init", "--quiet"], ["add", "-A"], ["commit", "--quiet", "-m", "submission"]]:
+            subprocess.check_output(["git", "-c", "user.name=s", "-c", "user.email=s@example.com"] + args, cwd=self.repo_dir)
+        self.commit = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=self.repo_dir).strip().decode("ascii")
+        self.cache = build_runner.BuildCache(os.path.join(self.temp_dir, "build_cache.json"))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_failed_build_with_counts(self):
+        result = build_runner.run_build(self.repo_dir, self.commit, '"%s" check.py' % sys.executable)
+
+        self.assertEqual(result["status"], build_runner.STATUS_FAILED)
+        self.assertEqual((result["exit_code"], result["passed"], result["failed"]), (1, 2, 1))
+        self.assertEqual(result["log_tail"], "Tests run: 3, Failures: 1, Errors: 0")
+        self.assertIn("Failed: 2 passed, 1 failed in", build_runner.format_build_result(result))
+
+        # the temporary worktree is gone again
+        worktrees = subprocess.check_output(["git", "worktree", "list"], cwd=self.repo_dir).decode("utf-8")
+        self.assertEqual(len(worktrees.splitlines()), 1)
+
+    def test_timeout(self):
+        result = build_runner.run_build(self.repo_dir, self.commit, "sleep 30", timeout_seconds=0.5)
+
+        self.assertEqual(result["status"], build_runner.STATUS_TIMEOUT)
+        self.assertLess(result["seconds"], 10)
+
+    def test_results_cached_by_commit_and_command(self):
+        counter = os.path.join(self.temp_dir, "builds.txt")
+        command = "echo build >> '%s' && echo 'Ran 1 test in 0.0s'" % counter
+
+        runner = build_runner.BuildRunner(command, cache=self.cache, max_workers=2)
+        results = [runner.run(self.repo_dir, commit) for commit in [self.commit, self.commit[:7]]]
+        runner.close()
+
+        runner = build_runner.BuildRunner(command, cache=build_runner.BuildCache(self.cache.filename), max_workers=1)
+        results.append(runner.run(self.repo_dir, "HEAD"))
+        self.assertEqual(runner.run(self.repo_dir, "no-such-commit")["status"], build_runner.STATUS_ERROR)
+
+        with open(counter) as counter_file:
+            self.assertEqual(counter_file.read(), "build\n")
+        self.assertEqual([result["status"] for result in results], [build_runner.STATUS_PASSED] * 3)
+        self.assertEqual(results[0]["passed"], 1)
+
+    def test_timeouts_not_cached(self):
+        runner = build_runner.BuildRunner("sleep 30", cache=self.cache, timeout_seconds=0.5, max_workers=1)
+
+        self.assertEqual(runner.run(self.repo_dir, self.commit)["status"], build_runner.STATUS_TIMEOUT)
+        self.assertEqual(self.cache.entries, {})
@@ -0,0 +1,68 @@
+from unittest import TestCase
+
+import os
+import shutil
+import subprocess
+import tempfile
+
+import diff_stats
+
+
+class TestDiffStats(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.repo_dir = os.path.join(self.temp_dir, "student_repo")
+        self.cache = diff_stats.DiffStatCache(os.path.join(self.temp_dir, "diff_stats_cache.json"))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def git(self, path, *args):
+        return subprocess.check_output(["git", "-c", "user.name=s", "-c", "user.email=s@example.com"] + list(args), cwd=path)
+
+    def commit(self, path, files, tag):
+        for filename, data in files.items():
+            with open(os.path.join(path, filename), "wb") as source_file:
+                source_file.write(data)
+        self.git(path, "add", "-A")
+        self.git(path, "commit", "--quiet", "-m", tag)
+        self.git(path, "tag", tag)
+
+    def make_repo(self, name):
+        path = os.path.join(self.repo_dir, name)
+        os.makedirs(path)
+        self.git(path, "init", "--quiet")
+        return path
+
+    def test_class_table(self):
+        path = self.make_repo("6300Fall18afakestudent")
+        self.commit(path, {"Main.java": b"a\nb\nc\n"}, "A2")
+        self.commit(path, {"Main.java": b"a\nB\nc\nd\n", "logo.png": b"\x89PNG\0\1"}, "A3")
+        self.commit(self.make_repo("6300Fall18bfakestudent"), {"Main.java": b"a\n"}, "A3")
+
+        stats, missing = diff_stats.collect_diff_stats("A2", "A3", main_repo_dir=self.repo_dir, cache=self.cache)
+
+        self.assertEqual(missing, ["6300Fall18bfakestudent"])
+        self.assertEqual(stats["6300Fall18afakestudent"], {
+          "files": 2, "insertions": 2, "deletions": 1,
+          "paths": [["Main.java", 2, 1], ["logo.png", None, None]]})
+
+        table = diff_stats.format_diff_stats("A2", "A3", stats, missing, show_paths=True)
+        self.assertIn("6300Fall18afakestudent       2         2         1", table)
+        self.assertIn("\t-\t-\tlogo.png", table)
+
+    def test_cached_by_commits(self):
+        path = self.make_repo("6300Fall18afakestudent")
+        self.commit(path, {"Main.java": b"a\n"}, "A2")
+        self.commit(path, {"Main.java": b"b\n"}, "A3")
+
+        diff_stats.collect_diff_stats("A2", "A3", main_repo_dir=self.repo_dir, cache=self.cache)
+        self.assertEqual(len(diff_stats.DiffStatCache(self.cache.filename).entries), 1)
+
+        # moving a tag diffs the new pair
+        self.commit(path, {"Main.java": b"c\nd\n"}, "A4")
+        self.git(path, "tag", "-f", "A3", "A4")
+        stats, _ = diff_stats.collect_diff_stats("A2", "A3", main_repo_dir=self.repo_dir, cache=self.cache)
+
+        self.assertEqual(stats["6300Fall18afakestudent"]["insertions"], 2)
+        self.assertEqual(len(self.cache.entries), 2)
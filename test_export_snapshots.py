@@ -0,0 +1,64 @@
+from unittest import TestCase
+
+import os
+import shutil
+import subprocess
+import tarfile
+import tempfile
+
+import export_snapshots
+
+
+class TestExportSnapshots(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.repo_dir = os.path.join(self.temp_dir, "student_repo")
+        self.output_dir = os.path.join(self.temp_dir, "export")
+        self.template_dir = os.path.join(self.temp_dir, "template")
+        os.makedirs(os.path.join(self.template_dir, "src"))
+        with open(os.path.join(self.template_dir, "src", "Main.java"), "w") as template_file:
+            template_file.write("class Main {}\n")
+
+        for username in ["afakestudent", "bfakestudent"]:
+            path = os.path.join(self.repo_dir, "6300Fall18" + username)
+            shutil.copytree(self.template_dir, path)
+            with open(os.path.join(path, "src", "Solution.java"), "w") as source_file:
+                source_file.write("class Solution { // %s\n}\n" % username)
+            with open(os.path.join(path, "run.sh"), "w") as script_file:
+                script_file.write("#!/bin/sh\n")
+            os.chmod(os.path.join(path, "run.sh"), 0o755)
+            for args in [["init", "--quiet"], ["add", "-A"], ["commit", "--quiet", "-m", "submission"], ["tag", "A3"]]:
+                subprocess.check_output(["git", "-c", "user.name=s", "-c", "user.email=s@example.com"] + args, cwd=path)
+
+        self.graders = {"Travis": ["afakestudent", "cfakestudent"], "David Tran": ["bfakestudent"]}
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_template_files_hardlinked(self):
+        for _ in range(2):  # exporting again replaces the snapshots
+            exported, missing = export_snapshots.export_snapshots(
+              "A3", self.graders, main_repo_dir=self.repo_dir, output_dir=self.output_dir,
+              template_dir=self.template_dir, max_workers=2)
+
+        snapshot = os.path.join(self.output_dir, "A3", "Travis", "6300Fall18afakestudent")
+        other_snapshot = os.path.join(self.output_dir, "A3", "David_Tran", "6300Fall18bfakestudent")
+
+        self.assertEqual(missing, ["6300Fall18cfakestudent"])
+        self.assertEqual(sorted(exported), [(other_snapshot, 2, 1), (snapshot, 2, 1)])
+        self.assertEqual(sorted(os.listdir(snapshot)), ["run.sh", "src"])
+        self.assertTrue(os.access(os.path.join(snapshot, "run.sh"), os.X_OK))
+        with open(os.path.join(snapshot, "src", "Solution.java")) as source_file:
+            self.assertEqual(source_file.read(), "class Solution { // afakestudent\n}\n")
+
+        main = os.stat(os.path.join(snapshot, "src", "Main.java"))
+        self.assertEqual(main.st_nlink, 3)
+        self.assertEqual(main.st_ino, os.stat(os.path.join(other_snapshot, "src", "Main.java")).st_ino)
+
+    def test_tarball(self):
+        exported, _ = export_snapshots.export_snapshots(
+          "A3", {"Travis": ["afakestudent"]}, main_repo_dir=self.repo_dir, output_dir=self.output_dir,
+          as_tarball=True, max_workers=1)
+
+        with tarfile.open(exported[0][0]) as tarball:
+            self.assertEqual(sorted(tarball.getnames()), ["run.sh", "src", "src/Main.java", "src/Solution.java"])
@@ -0,0 +1,117 @@
+from unittest import TestCase
+
+import os
+import shutil
+import tempfile
+
+import download_submission
+import grader_sheet
+
+
+class FlakySource(object):
+    def __init__(self, source):
+        self.source = source
+        self.cache_key = source.cache_key
+        self.online = True
+        self.rows_fetched = 0
+
+    def get_revision(self):
+        if not self.online:
+            raise IOError("offline")
+        return self.source.get_revision()
+
+    def get_rows(self, range_name):
+        if not self.online:
+            raise IOError("offline")
+        self.rows_fetched += 1
+        return self.source.get_rows(range_name)
+
+
+class NoRevisionSource(FlakySource):
+    def get_revision(self):
+        raise IOError("insufficient permissions: Drive API")
+
+
+class TestGraderSheet(TestCase):
+    def setUp(self):
+        self.old_dir = os.getcwd()
+        self.temp_dir = tempfile.mkdtemp()
+        os.chdir(self.temp_dir)
+
+        self.sheet_filename = "sheet.tsv"
+        self.write_sheet([["1", "afakestudent", "Fakestudent, Alex", "Travis"],
+                          ["2", "bfakestudent", "Fakestudent, Betty", "David"],
+                          ["3", "cfakestudent", "Fakestudent, Charley", " travis "],
+                          ["4", "dfakestudent"]])
+        self.source = FlakySource(grader_sheet.LocalSheetSource(self.sheet_filename))
+        self.now = 1000.0
+
+    def tearDown(self):
+        os.chdir(self.old_dir)
+        shutil.rmtree(self.temp_dir)
+
+    def write_sheet(self, rows):
+        with open(self.sheet_filename, 'w') as sheet_file:
+            sheet_file.write("\n".join("\t".join(row) for row in rows))
+
+    def get_whitelist(self, max_age_seconds=0):
+        return grader_sheet.get_grader_whitelist(self.source, "Assignment 3!A5:D", "Travis", grader_sheet.SheetCache(),
+                                                 max_age_seconds=max_age_seconds, clock=lambda: self.now)
+
+    def test_whitelist_filtered_to_grader(self):
+        self.assertEqual(self.get_whitelist(), ["afakestudent", "cfakestudent"])
+
+    def test_assignments_of_every_grader(self):
+        assignments = grader_sheet.get_grader_assignments(self.source, "Assignment 3!A5:D", grader_sheet.SheetCache())
+        self.assertEqual(assignments, {"Travis": ["afakestudent", "cfakestudent"], "David": ["bfakestudent"]})
+
+    def test_unchanged_revision_uses_snapshot(self):
+        self.get_whitelist()
+        self.get_whitelist()
+
+        self.assertEqual(self.source.rows_fetched, 1)
+
+    def test_changed_revision_refetches(self):
+        self.get_whitelist()
+        self.write_sheet([["1", "efakestudent", "Fakestudent, Eddie", "Travis"]])
+
+        self.assertEqual(self.get_whitelist(), ["efakestudent"])
+
+    def test_fresh_snapshot_skips_revision_check(self):
+        self.get_whitelist()
+        self.source.online = False
+        self.now += 60
+
+        self.assertEqual(self.get_whitelist(max_age_seconds=600), ["afakestudent", "cfakestudent"])
+
+    def test_offline_uses_snapshot(self):
+        self.get_whitelist()
+        self.source.online = False
+
+        self.assertEqual(self.get_whitelist(), ["afakestudent", "cfakestudent"])
+
+    def test_unreadable_revision_still_fetches_rows(self):
+        self.source = NoRevisionSource(self.source.source)
+
+        self.assertEqual(self.get_whitelist(), ["afakestudent", "cfakestudent"])
+        self.assertEqual(self.get_whitelist(), ["afakestudent", "cfakestudent"])
+        self.assertEqual(self.source.rows_fetched, 2, "Without a revision the snapshot cannot be trusted")
+
+    def test_offline_without_snapshot_raises(self):
+        self.source.online = False
+
+        self.assertRaises(IOError, self.get_whitelist)
+
+    def test_assignment_info_uses_sheet(self):
+        assignment_info = download_submission.get_assignment_info("A3", is_batch_run=True, grader="David",
+                                                                  sheet_source=self.source)
+
+        self.assertEqual(assignment_info['student_whitelist'], ["bfakestudent"])
+        self.assertNotIn('grader_sheet_range', assignment_info)
+
+    def test_deliverable_needs_sheet_range(self):
+        assignment_info = download_submission.get_assignment_info("T2", is_batch_run=True, grader="David",
+                                                                  sheet_source=self.source)
+
+        self.assertEqual(self.source.rows_fetched, 0, "There is no default tab for 'T_D2'")
+        self.assertNotEqual(assignment_info['student_whitelist'], ["bfakestudent"])
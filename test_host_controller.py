@@ -0,0 +1,102 @@
+from unittest import TestCase
+
+import host_controller
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestTransientErrors(TestCase):
+    def test_network_errors_are_transient(self):
+        for message in ["fatal: unable to access 'https://x/': Failed to connect to x port 443: Connection refused",
+                        "error: RPC failed; HTTP 503 curl 22 The requested URL returned error: 503",
+                        "fatal: the remote end hung up unexpectedly",
+                        "The requested URL returned error: 429"]:
+            self.assertTrue(host_controller.is_transient_git_error(message), message)
+
+    def test_missing_repo_is_not_transient(self):
+        self.assertFalse(host_controller.is_transient_git_error("remote: Repository not found.\nfatal: repository 'x' not found"))
+        self.assertFalse(host_controller.is_transient_git_error(""))
+
+    def test_unknown_host_is_not_transient(self):
+        self.assertFalse(host_controller.is_transient_git_error("fatal: unable to access 'https://x/': Could not resolve host: x"))
+
+
+class TestRateLimiter(TestCase):
+    def test_rate_is_capped(self):
+        clock = FakeClock()
+        limiter = host_controller.RateLimiter(2.0, burst=1, clock=clock.time, sleep=clock.sleep)
+
+        for _ in range(5):
+            limiter.acquire()
+
+        # first request is free, the other 4 wait half a second each
+        self.assertAlmostEqual(clock.now, 2.0)
+
+
+class TestHostController(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.controller = host_controller.HostController(
+          requests_per_second=None, initial_concurrency=4, max_concurrency=8, max_retries=3,
+          clock=self.clock.time, sleep=self.clock.sleep, random_func=lambda: 1.0)
+
+    def test_transient_failure_is_retried_with_backoff(self):
+        results = iter(["busy", "busy", "ok"])
+        result = self.controller.run(lambda: next(results), is_transient=lambda result: result == "busy")
+
+        self.assertEqual(result, "ok")
+        self.assertEqual(self.controller.stats['retries'], 2)
+        self.assertEqual(self.clock.sleeps, [1.0, 2.0])
+
+    def test_gives_up_after_max_retries(self):
+        result = self.controller.run(lambda: "busy", is_transient=lambda result: result == "busy")
+
+        self.assertEqual(result, "busy")
+        self.assertEqual(self.controller.stats['requests'], 4)
+
+    def test_success_increases_concurrency(self):
+        for _ in range(20):
+            self.controller.run(lambda: "ok", is_transient=lambda result: False)
+
+        self.assertGreater(self.controller.get_concurrency(), 4)
+        self.assertLessEqual(self.controller.get_concurrency(), 8)
+
+    def test_failure_halves_concurrency(self):
+        self.controller.max_retries = 0
+        self.controller.run(lambda: "busy", is_transient=lambda result: result == "busy")
+
+        self.assertEqual(self.controller.get_concurrency(), 2)
+
+    def test_burst_of_failures_counts_once(self):
+        self.controller.max_retries = 0
+        for _ in range(3):
+            self.controller.run(lambda: "busy", is_transient=lambda result: result == "busy")
+
+        self.assertEqual(self.controller.stats['decreases'], 1)
+        self.assertEqual(self.controller.get_concurrency(), 2)
+
+    def test_latency_is_tracked_per_operation(self):
+        def run(operation, seconds, interactive=False):
+            def func():
+                self.clock.now += seconds
+                return "ok"
+            self.controller.run(func, is_transient=lambda result: False, operation=operation, interactive=interactive)
+
+        run("clone", 300.0, interactive=True)
+        for _ in range(10):
+            run("fetch", 1.0)
+            run("clone", 20.0)
+
+        self.assertEqual(self.controller.latency_ewmas, {"fetch": 1.0, "clone": 20.0}, "The interactive clone should not count")
+        self.assertEqual(self.controller.stats['decreases'], 0, "A clone is not slow next to fetches")
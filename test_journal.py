@@ -0,0 +1,71 @@
+from unittest import TestCase
+
+import os
+import shutil
+import tempfile
+
+import journal
+
+
+class TestJournal(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.filename = journal.get_journal_filename(os.path.join(self.temp_dir, "student_records.json"))
+        self.header = {"assignment": "Assignment 3", "deadline": "2018-09-02 12:05:00"}
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_filename_next_to_records(self):
+        self.assertEqual(journal.get_journal_filename("student_records.shard1of3.json"), "student_records.shard1of3.journal")
+
+    def test_resume_replays_entries(self):
+        run = journal.Journal(self.filename, self.header)
+        run.append("Fakestudent, Alex(11111)", "11111", {"gt_id": "afakestudent"})
+        run.close()
+
+        resumed = journal.Journal(self.filename, self.header, resume=True)
+        self.assertEqual(list(resumed.entries.items()), [("Fakestudent, Alex(11111)", ("11111", {"gt_id": "afakestudent"}))])
+        resumed.append("Fakestudent, Betty(22222)", "22222", {"gt_id": "bfakestudent"})
+        resumed.close()
+
+        self.assertEqual(len(journal.read_journal(self.filename, self.header)), 2)
+
+    def test_other_run_is_not_resumed(self):
+        run = journal.Journal(self.filename, self.header)
+        run.append("Fakestudent, Alex(11111)", "11111", {})
+        run.close()
+
+        self.assertEqual(journal.read_journal(self.filename, dict(self.header, deadline="2018-09-09 12:05:00")), {})
+        self.assertEqual(journal.Journal(self.filename, self.header).entries, {}, "Without resume a new journal starts")
+        self.assertEqual(journal.read_journal(self.filename, self.header), {})
+
+    def test_remove(self):
+        journal.Journal(self.filename, self.header).remove()
+        self.assertFalse(os.path.exists(self.filename))
+
+    def test_line_cut_short_then_resumed(self):
+        run = journal.Journal(self.filename, self.header)
+        run.append("Fakestudent, Alex(11111)", "11111", {})
+        run.close()
+        with open(self.filename, "a") as journal_file:
+            journal_file.write('{"folder": "Fakestudent, Bet')
+
+        resumed = journal.Journal(self.filename, self.header, resume=True)
+        resumed.append("Fakestudent, Betty(22222)", "22222", {})
+        resumed.close()
+
+        self.assertEqual(list(journal.read_journal(self.filename, self.header)),
+                         ["Fakestudent, Alex(11111)", "Fakestudent, Betty(22222)"])
+
+    def test_remove_keeps_a_newer_journal(self):
+        old_run = journal.Journal(self.filename, self.header)
+        old_run.append("Fakestudent, Alex(11111)", "11111", {})
+        old_run.close()
+
+        new_run = journal.Journal(self.filename, self.header)
+        old_run.remove()
+        self.assertTrue(os.path.exists(self.filename))
+
+        new_run.remove()
+        self.assertFalse(os.path.exists(self.filename))
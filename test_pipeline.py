@@ -0,0 +1,49 @@
+from unittest import TestCase
+
+import threading
+import time
+
+from pipeline import Pipeline, Stage
+
+
+class TestPipeline(TestCase):
+    def test_every_item_goes_through_every_stage(self):
+        pipeline = Pipeline([Stage('double', lambda item: item * 2, 3),
+                             Stage('increment', lambda item: item + 1, 2)], queue_size=2)
+        results = []
+
+        pipeline.run(range(50), sink=results.append)
+
+        self.assertEqual(sorted(results), [item * 2 + 1 for item in range(50)])
+
+    def test_queues_are_bounded(self):
+        started, lock = [0], threading.Lock()
+
+        def count(item):
+            with lock:
+                started[0] += 1
+            return item
+
+        def slow_sink(item):
+            time.sleep(0.01)
+            # items read ahead of the sink: at most one per queue and worker
+            with lock:
+                self.assertLessEqual(started[0] - len(sunk), 2 + 1 + 2 + 1)
+            sunk.append(item)
+
+        sunk = []
+        Pipeline([Stage('count', count, 1)], queue_size=2).run(iter(range(30)), sink=slow_sink)
+
+        self.assertEqual(len(sunk), 30)
+
+    def test_failed_item_is_dropped_and_raised(self):
+        def check(item):
+            if item == 3:
+                raise ValueError("bad item")
+            return item
+
+        results = []
+        pipeline = Pipeline([Stage('check', check, 2)])
+
+        self.assertRaises(ValueError, pipeline.run, range(6), results.append)
+        self.assertEqual(sorted(results), [0, 1, 2, 4, 5])
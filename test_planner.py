@@ -0,0 +1,39 @@
+from unittest import TestCase
+
+import planner
+
+
+class TestPlanner(TestCase):
+    def setUp(self):
+        self.plan = {"submission_folder": "./submissions/A3", "whitelist": 4, "students": 4, "commits": 3,
+                     "repos": {"6300Fall18a": "pull", "6300Fall18b": "pull", "6300Fall18c": "clone", "6300Fall18d": "local"},
+                     "checkouts": 2, "checked_out": 1}
+
+    def test_own_pull_time_before_class_median(self):
+        entries = {"6300Fall18a": {"pull_seconds": 30.0, "pull_bytes": 1000},
+                   "6300Fall18b": {"pull_seconds": 2.0, "pull_bytes": 3000, "clone_seconds": 8.0, "clone_bytes": 10 ** 6}}
+
+        estimate = planner.estimate_plan(self.plan, entries, requests_per_second=2.0, max_concurrency=1, checkout_workers=4)
+
+        # a: 30s, b: 2s, c: clone 8s + class median pull 16s
+        self.assertEqual(estimate["seconds"], 56.0)
+        self.assertEqual(estimate["requests"], 4)
+        self.assertEqual(estimate["bytes"], 10 ** 6 + 3 * 2000)
+
+    def test_no_history(self):
+        estimate = planner.estimate_plan(self.plan, {}, requests_per_second=2.0, max_concurrency=8, checkout_workers=4)
+        self.assertIsNone(estimate["bytes"])
+
+        text = planner.format_plan("A3", self.plan, estimate, planner.get_past_timings([]))
+        self.assertIn("\t\tclone: 1 (no history, ~10s each assumed)", text)
+        self.assertIn("\tcheckouts: 2 (1 already checked out, 1 submissions without a commit)", text)
+        self.assertIn("4 git requests, unknown size downloaded", text)
+
+    def test_predict_seconds_fallbacks(self):
+        timings = planner.get_past_timings([{"pull_seconds": 4.0}, {"pull_seconds": 6.0}])
+
+        self.assertEqual(planner.predict_seconds("pull", {"pull_seconds": 30.0}, timings), 30.0)
+        self.assertEqual(planner.predict_seconds("pull", {}, timings), 5.0)
+        self.assertEqual(planner.predict_seconds("checkout", {}, timings), planner.DEFAULT_SECONDS["checkout"])
+        self.assertEqual(planner.predict_repo_seconds("local", {"pull_seconds": 30.0}, timings), 0.0)
+        self.assertEqual(planner.predict_repo_seconds("restore", {}, timings), 5.0 + planner.RESTORE_SECONDS)
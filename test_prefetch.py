@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+from unittest import TestCase
+
+import prefetch
+
+
+class FakeSubmissions(object):
+    def __init__(self):
+        self.calls = 0
+
+    def prefetch_repos(self, student_whitelist=None):
+        self.calls += 1
+
+
+class TestPrefetchSchedule(TestCase):
+    def setUp(self):
+        self.deadline = '2018-09-09 00:00:00'
+        self.deadline_time = datetime.strptime(self.deadline, prefetch.DATETIME_PATTERN)
+
+    def test_schedule_starts_at_window(self):
+        now = self.deadline_time - timedelta(days=2)
+        schedule = prefetch.get_prefetch_schedule(self.deadline, now=now, window_hours=12)
+
+        self.assertEqual(schedule[0], self.deadline_time - timedelta(hours=12))
+
+    def test_schedule_ends_before_deadline(self):
+        now = self.deadline_time - timedelta(hours=6)
+        schedule = prefetch.get_prefetch_schedule(self.deadline, now=now)
+
+        self.assertEqual(schedule[0], now)
+        self.assertTrue(all(fetch_time < self.deadline_time for fetch_time in schedule))
+
+    def test_schedule_intervals_taper(self):
+        now = self.deadline_time - timedelta(days=1)
+        schedule = prefetch.get_prefetch_schedule(self.deadline, now=now, window_hours=12)
+        intervals = [later - earlier for earlier, later in zip(schedule, schedule[1:])]
+
+        self.assertEqual(intervals, sorted(intervals, reverse=True), "Fetches should get more frequent near the deadline")
+        self.assertEqual(intervals[0], prefetch.DEFAULT_MAX_INTERVAL)
+        self.assertEqual(intervals[-1], prefetch.DEFAULT_MIN_INTERVAL)
+
+    def test_schedule_empty_after_deadline(self):
+        now = self.deadline_time + timedelta(minutes=1)
+
+        self.assertEqual(prefetch.get_prefetch_schedule(self.deadline, now=now), [])
+
+    def test_run_prefetch_after_deadline_does_nothing(self):
+        submissions = FakeSubmissions()
+        rounds = prefetch.run_prefetch(submissions, '2000-01-01 00:00:00', sleep=lambda seconds: None)
+
+        self.assertEqual(rounds, 0)
+        self.assertEqual(submissions.calls, 0)
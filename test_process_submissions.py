@@ -2,7 +2,15 @@ from datetime import datetime, timedelta
 from unittest import TestCase
 
 import datetime
+import io
 import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+import host_controller
 import process_submissions
 
 class TestSubmissions(TestCase):
@@ -139,6 +147,78 @@ class TestSubmissions(TestCase):
         except OSError:
             pass
 
+    def test_create_student_json_keeps_assignment_results(self):
+        self.submissions_individual.create_student_json(self.filenames["info_students"])
+
+        records = self.submissions_individual._load_json_file(self.filenames["student_records"])
+        records["11111"]["A3"] = {"commitID": "f556b4ba7e222de302b367b1dceeff89bd233191"}
+        self.submissions_individual._save_json_file(self.filenames["student_records"], records)
+
+        diff = self.submissions_individual.create_student_json(self.filenames["info_students"])
+
+        records = self.submissions_individual._load_json_file(self.filenames["student_records"])
+        self.assertTrue(diff.is_empty())
+        self.assertIn("A3", records["11111"], "create_student_json wiped stored assignment results")
+
+    def test_create_student_json_merges_roster_changes(self):
+        self.submissions_individual.create_student_json(self.filenames["info_students"])
+
+        changed_roster = "testing/test_students_changed.txt"
+        with open(self.filenames["info_students"]) as roster_file:
+            lines = roster_file.read().splitlines()
+        lines = [line for line in lines if "bfakestudent" not in line]  # drop Betty
+        lines[0] = lines[0].replace("afakestudent", "afakestudent2")  # rename Alex
+        lines.append("Fakestudent, Frank\t66666\tffakestudent")  # add Frank
+
+        try:
+            with open(changed_roster, 'w') as roster_file:
+                roster_file.write("\n".join(lines))
+
+            diff = self.submissions_individual.create_student_json(changed_roster)
+        finally:
+            os.remove(changed_roster)
+
+        aliases = self.submissions_individual._load_json_file(self.filenames["student_aliases"])
+        records = self.submissions_individual._load_json_file(self.filenames["student_records"])
+
+        self.assertEqual(len(diff.added), 1)
+        self.assertEqual(len(diff.dropped), 1)
+        self.assertEqual(len(diff.renamed), 1)
+        self.assertNotIn("bfakestudent", aliases)
+        self.assertIn("22222", records, "Dropped students keep their records")
+        self.assertEqual(aliases["afakestudent2"], "11111")
+        self.assertNotIn("afakestudent", aliases)
+        self.assertEqual(aliases["ffakestudent"], "66666")
+
+    def test_create_student_json_unchanged_roster_writes_nothing(self):
+        self.submissions_individual.create_student_json(self.filenames["info_students"])
+        os.utime(self.filenames["student_records"], (0, 0))
+
+        self.submissions_individual.create_student_json(self.filenames["info_students"])
+
+        self.assertEqual(os.path.getmtime(self.filenames["student_records"]), 0)
+
+    def test_create_team_json_moves_student(self):
+        self.submissions_individual.create_team_json(self.filenames["info_teams"])
+
+        changed_roster = "testing/test_teams_changed.txt"
+        with open(self.filenames["info_teams"]) as roster_file:
+            contents = roster_file.read().replace("efakestudent\tErin\tTeam03", "efakestudent\tWill\tTeam02")
+
+        try:
+            with open(changed_roster, 'w') as roster_file:
+                roster_file.write(contents)
+
+            diff = self.submissions_individual.create_team_json(changed_roster)
+        finally:
+            os.remove(changed_roster)
+
+        members = self.submissions_individual._load_json_file(self.filenames["team_members"])
+
+        self.assertEqual(diff.moved, ["efakestudent: Team03 -> Team02"])
+        self.assertIn("efakestudent", members["Team02"])
+        self.assertNotIn("Team03", members, "Empty teams should be removed")
+
 class TestTimestamp(TestCase):
     def setUp(self):
         # made a public repo with dummy info here: https://github.com/tjanssen3/6300afakestudent
@@ -150,8 +230,16 @@ class TestTimestamp(TestCase):
         TestSubmissions.setup_test_filenames(self)
         self.submissions = TestSubmissions.setup_test_filenames_on_object(self, process_submissions.Submissions(is_team=False, should_pull_repo_flag=True,
                                                                                                                 folder_prefix=folder_prefix, git_context=git_context, git_domain=git_domain))
+        self.addCleanup(TestSubmissions.delete_test_files, self)
         self.submissions.create_student_json(self.filenames["info_students"])
 
+        # clone into a temp dir, and retry a failed clone without waiting
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.submissions.MAIN_REPO_DIR = self.temp_dir
+        self.submissions.repo_cache = process_submissions.RepoCache(self.temp_dir)
+        self.submissions.host_controller = host_controller.HostController(requests_per_second=None, sleep=lambda seconds: None)
+
         # current assignment
         self.info = {}
         self.info["current_assignment"] = {'Timestamp Submission': 'Ok',
@@ -164,7 +252,7 @@ class TestTimestamp(TestCase):
         student_whitelist = [test_student]
 
         # see if testing info exists already; if not, pull from public repo
-        should_pull = not os.path.isdir("./student_repo/%s%s" % (folder_prefix, test_student))
+        should_pull = not os.path.isdir(os.path.join(self.temp_dir, "%s%s" % (folder_prefix, test_student)))
 
         self.submissions.process_repos(
             submission_folder_name=('./testing/%s' % assignment_name),
@@ -191,3 +279,301 @@ class TestTimestamp(TestCase):
         self.submissions._compare_timestamp_github(self.info["current_assignment"], self.info["gt_username"], deadline)
 
         self.assertEqual(self.info["current_assignment"]["Submission GitHub"], self.submissions.STR_LATE, "Timestamp GitHub should be late!")
+
+class TestWorktrees(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+        self.submissions = process_submissions.Submissions(is_team=False, should_pull_repo_flag=False)
+        self.submissions.MAIN_REPO_DIR = self.temp_dir
+        self.submissions.repo_cache = process_submissions.RepoCache(self.temp_dir)
+
+        # a local repo with one commit per assignment
+        self.repo_dir = self.submissions._gen_prefixed_dir("afakestudent")
+        os.makedirs(self.repo_dir)
+        self.commits = []
+        for assignment in ["A3", "A4"]:
+            self.git("commit", "--quiet", "--allow-empty", "-m", assignment)
+            self.commits.append(self.git("rev-parse", "HEAD"))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def git(self, *args):
+        if not os.path.isdir(os.path.join(self.repo_dir, ".git")):
+            subprocess.check_output(["git", "init", "--quiet"], cwd=self.repo_dir)
+        return subprocess.check_output(["git", "-c", "user.name=TA", "-c", "user.email=ta@example.com"] + list(args),
+                                       cwd=self.repo_dir).decode("utf-8").strip()
+
+    def test_assignments_get_separate_worktrees(self):
+        for assignment, commit in zip(["A3", "A4"], self.commits):
+            self.assertEqual(self.submissions._checkout_assignment("afakestudent", commit, assignment), commit)
+
+        for assignment, commit in zip(["A3", "A4"], self.commits):
+            worktree_dir = self.submissions._gen_worktree_dir("afakestudent", assignment)
+            self.assertEqual(subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=worktree_dir).decode("utf-8").strip(), commit)
+            self.assertEqual(self.git("rev-parse", assignment), commit, "The assignment tag should point at its commit")
+
+        # the clone itself is left on its branch
+        self.assertEqual(self.git("rev-parse", "HEAD"), self.commits[-1])
+        self.assertEqual(self.git("status", "--porcelain"), "")
+
+    def test_invalid_commit(self):
+        output = self.submissions._checkout_assignment("afakestudent", "0123456789012345678901234567890123456789", "A3")
+
+        self.assertEqual(output.find("0123456789012345678901234567890123456789"), -1)
+
+    def test_sparse_paths(self):
+        for path in ["README", "Assignment3/Main.java", "Assignment4/Main.java"]:
+            if os.path.dirname(path):
+                os.makedirs(os.path.join(self.repo_dir, os.path.dirname(path)))
+            with open(os.path.join(self.repo_dir, path), "w") as source_file:
+                source_file.write(path)
+        self.git("add", "--all")
+        self.git("commit", "--quiet", "-m", "A4 files")
+        commit = self.git("rev-parse", "HEAD")
+        worktree_dir = self.submissions._gen_worktree_dir("afakestudent", "A4")
+
+        self.assertEqual(self.submissions._checkout_assignment("afakestudent", commit, "A4", sparse_paths=["Assignment4"]), commit)
+        self.assertEqual(sorted(os.listdir(worktree_dir)), [".git", "Assignment4", "README"])
+        self.assertTrue(self.submissions._is_sparse_worktree("afakestudent", "A4"))
+        self.assertEqual(self.git("status", "--porcelain"), "", "The clone should keep its whole tree")
+
+        # the paths of the assignment were removed: the whole tree again
+        self.assertEqual(self.submissions._checkout_assignment("afakestudent", commit, "A4"), commit)
+        self.assertEqual(sorted(os.listdir(worktree_dir)), [".git", "Assignment3", "Assignment4", "README"])
+        self.assertFalse(self.submissions._is_sparse_worktree("afakestudent", "A4"))
+
+        # an existing worktree narrowed down
+        self.assertEqual(self.submissions._checkout_assignment("afakestudent", commit, "A4", sparse_paths=["Assignment3"]), commit)
+        self.assertEqual(sorted(os.listdir(worktree_dir)), [".git", "Assignment3", "README"])
+
+    def test_plan_reads_only(self):
+        self.submissions.STUDENT_RECORDS_FILENAME = os.path.join(self.temp_dir, "records.json")
+        self.submissions.STUDENT_ALIAS_FILENAME = os.path.join(self.temp_dir, "aliases.json")
+        self.submissions._save_json_file(self.submissions.STUDENT_RECORDS_FILENAME,
+                                         {"11111": {"name": "Fakestudent, Alex", "gt_id": "afakestudent"},
+                                          "22222": {"name": "Fakestudent, Betty", "gt_id": "bfakestudent"}})
+        self.submissions._save_json_file(self.submissions.STUDENT_ALIAS_FILENAME, {"afakestudent": "11111", "bfakestudent": "22222"})
+
+        submission_dir = os.path.join(self.temp_dir, "submissions", "A3")
+        os.makedirs(submission_dir)
+        for filename, commit in [("fakestudentalex_11111_text.html", self.commits[0]), ("fakestudentbetty_22222_text.html", "none")]:
+            with open(os.path.join(submission_dir, filename), "w") as submission_file:
+                submission_file.write("<p>%s</p>" % commit)
+
+        def plan():
+            return self.submissions.plan_repos(submission_dir, "A3", student_whitelist=["afakestudent", "bfakestudent"])
+
+        first_plan = plan()
+        self.assertEqual(first_plan["repos"], {"6300Fall18afakestudent": "local", "6300Fall18bfakestudent": "clone"})
+        self.assertEqual((first_plan["students"], first_plan["commits"], first_plan["checkouts"]), (2, 1, 1))
+        self.assertFalse(os.path.exists(self.submissions._gen_worktree_dir("afakestudent", "A3")))
+
+        self.submissions._checkout_assignment("afakestudent", self.commits[0], "A3")
+        self.assertEqual(self.submissions._read_worktree_commit("afakestudent", "A3"), self.commits[0])
+        self.assertEqual((plan()["checkouts"], plan()["checked_out"]), (0, 1))
+
+class TestIterResults(TestCase):
+    git = TestWorktrees.git
+
+    def tearDown(self):
+        # the records are saved in the background
+        process_submissions.wait_for_pending_writes()
+        TestWorktrees.tearDown(self)
+
+    def setUp(self):
+        TestWorktrees.setUp(self)
+        self.submissions.STUDENT_RECORDS_FILENAME = os.path.join(self.temp_dir, "records.json")
+        self.submissions.STUDENT_ALIAS_FILENAME = os.path.join(self.temp_dir, "aliases.json")
+        self.submissions.SHOW_PROGRESS = False
+        self.submissions._save_json_file(self.submissions.STUDENT_RECORDS_FILENAME,
+                                         {"11111": {"name": "Fakestudent, Alex", "gt_id": "afakestudent"}})
+        self.submissions._save_json_file(self.submissions.STUDENT_ALIAS_FILENAME, {"afakestudent": "11111"})
+
+        self.submission_dir = os.path.join(self.temp_dir, "submissions", "A3")
+        os.makedirs(self.submission_dir)
+        with open(os.path.join(self.submission_dir, "fakestudentalex_11111_text.html"), "w") as submission_file:
+            submission_file.write("<p>%s</p>" % self.commits[0])
+
+    def iter_results(self, **kwargs):
+        return self.submissions.iter_results(self.submission_dir, "A3", "2099-01-01 00:00:00",
+                                             student_whitelist=["afakestudent"], should_pull=False, **kwargs)
+
+    def test_results_stream_as_students_are_done(self):
+        results = list(self.iter_results(pipeline_workers={"verify": 1}))
+
+        self.assertEqual([(result.gt_username, result.commit_id, result.commit_valid, result.is_late) for result in results],
+                         [("afakestudent", self.commits[0], True, False)])
+        process_submissions.wait_for_pending_writes()
+        self.assertIn("A3", self.submissions._load_json_file(self.submissions.STUDENT_RECORDS_FILENAME)["11111"])
+
+    def test_report_to_console_buffer(self):
+        results = process_submissions.ResultSet()
+        list(self.iter_results(results=results))
+
+        console = io.StringIO()
+        report_filename = os.path.join(self.temp_dir, "report.txt")
+        self.submissions.generate_report("A3", student_list=["afakestudent"], report_filename=report_filename,
+                                         results=results, console=console)
+
+        with open(report_filename) as report_file:
+            self.assertEqual(console.getvalue(), report_file.read())
+        self.assertIn("afakestudent", console.getvalue())
+
+    def test_second_run_keeps_its_journal(self):
+        list(self.iter_results())
+        list(self.iter_results(cancel=threading.Event()))
+        process_submissions.wait_for_pending_writes()
+
+        self.assertIn("A3", self.submissions._load_json_file(self.submissions.STUDENT_RECORDS_FILENAME)["11111"])
+        self.assertFalse(os.path.exists(process_submissions.get_journal_filename(self.submissions.STUDENT_RECORDS_FILENAME)))
+
+    def test_background_save_is_a_snapshot(self):
+        filename = os.path.join(self.temp_dir, "snapshot.json")
+        records = {"11111": {"A3": "first"}}
+        self.submissions._save_json_file_async(filename, records)
+        records["11111"]["A3"] = "second"
+
+        self.assertEqual(self.submissions._load_json_file(filename), {"11111": {"A3": "first"}})
+
+    def test_cancelled_run_keeps_records_file(self):
+        cancel = threading.Event()
+        cancel.set()
+
+        self.assertEqual(list(self.iter_results(cancel=cancel)), [])
+        process_submissions.wait_for_pending_writes()
+        self.assertNotIn("A3", self.submissions._load_json_file(self.submissions.STUDENT_RECORDS_FILENAME)["11111"])
+
+class TestJobOrder(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+        self.submissions = process_submissions.Submissions(is_team=False, should_pull_repo_flag=True)
+        self.submissions.MAIN_REPO_DIR = self.temp_dir
+        self.submissions.repo_cache = process_submissions.RepoCache(self.temp_dir)
+
+        # every repo is there and gets pulled, each with its own last pull time
+        for username, pull_seconds in [("a", 5.0), ("b", 30.0), ("c", 1.0), ("d", 10.0)]:
+            os.makedirs(self.submissions._gen_prefixed_dir(username))
+            self.submissions.repo_cache.update("6300Fall18" + username, pull_seconds=pull_seconds, checkout_seconds=0.5)
+        self.jobs = [("folder", str(number), {}, username, username) for number, username in enumerate("abcd")]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def order(self, **kwargs):
+        return [job[3] for job in self.submissions._order_student_jobs(self.jobs, **kwargs)]
+
+    def test_slowest_first_after_the_quickest(self):
+        self.assertEqual(self.order(), ["c", "b", "d", "a"])
+
+    def test_priority_students_are_boosted(self):
+        self.assertEqual(self.order(priority_students=["a"]), ["c", "a", "b", "d"])
+
+    def test_without_pull_only_checkouts_count(self):
+        self.assertEqual(self.order(should_pull=False), ["d", "a", "b", "c"])
+
+class TestCommandTimeouts(TestCase):
+    def setUp(self):
+        self.submissions = process_submissions.Submissions(is_team=False, should_pull_repo_flag=False)
+        self.submissions.host_controller = process_submissions.get_host_controller("timeouts.example.com", requests_per_second=1000.0)
+
+    def test_stuck_command_is_killed(self):
+        self.submissions.GIT_TIMEOUT_SECONDS = dict(self.submissions.GIT_TIMEOUT_SECONDS, local=0.5)
+        start = time.time()
+
+        # the sleep runs in a child of the shell, which is killed too
+        self.assertEqual(self.submissions._execute_command("sleep 30; echo done"), "timeout")
+        self.assertLess(time.time() - start, 10)
+
+        self.assertEqual(self.submissions._execute_command("echo done"), "done")
+        self.assertEqual(self.submissions._execute_command("exit 1"), "failed")
+
+    def test_argument_list_runs_without_a_shell(self):
+        result = process_submissions._run_command(["echo", "a; echo b"], timeout_seconds=10)
+
+        self.assertEqual(result.output.strip(), b"a; echo b")
+
+    def test_network_timeout_is_not_retried(self):
+        self.assertEqual(self.submissions._execute_network_command("sleep 30", timeout_seconds=0.5), "timeout")
+        self.assertEqual(self.submissions.host_controller.stats["retries"], 0)
+
+    def test_only_the_git_command_is_timed(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        self.submissions.MAIN_REPO_DIR = temp_dir
+        self.submissions.repo_cache = process_submissions.RepoCache(temp_dir)
+
+        controlled_run = self.submissions.host_controller.run
+        def queued_run(*args, **kwargs):
+            time.sleep(0.5)  # e.g. waiting for a slot
+            return controlled_run(*args, **kwargs)
+        self.submissions.host_controller.run = queued_run
+
+        self.submissions._execute_tracked_command("true", "a", "fetch")
+        self.submissions._execute_tracked_command("true", "b", "fetch", interactive=True)
+
+        self.assertLess(self.submissions.repo_cache.get_entry("6300Fall18a")["fetch_seconds"], 0.4)
+        self.assertNotIn("fetch_seconds", self.submissions.repo_cache.get_entry("6300Fall18b") or {})
+
+    def test_prefetch_counts_timeouts_as_failed(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        self.submissions.MAIN_REPO_DIR = temp_dir
+        self.submissions.repo_cache = process_submissions.RepoCache(temp_dir)
+        outputs = {"a": "", "b": "timeout", "c": "failed"}
+        interactive_fetches = []
+        def fetch(repo_suffix, interactive=False):
+            if interactive:
+                interactive_fetches.append(repo_suffix)
+            return outputs[repo_suffix]
+        self.submissions._fetch_student_repo = fetch
+
+        self.assertEqual(self.submissions.prefetch_repos(student_whitelist=["c", "b", "a"]), ["b", "c"])
+        self.assertEqual(interactive_fetches, ["a"], "Only the first fetch of a round may prompt")
+
+    def test_git_never_prompts(self):
+        self.assertEqual(self.submissions._get_git_env()["GIT_TERMINAL_PROMPT"], "0")
+        self.assertEqual(self.submissions._get_git_env(interactive=True).get("GIT_TERMINAL_PROMPT"), os.environ.get("GIT_TERMINAL_PROMPT"))
+
+class TestTeamCommits(TestCase):
+    def setUp(self):
+        self.submissions = process_submissions.Submissions(is_team=True, should_pull_repo_flag=False)
+        self.checkouts = []
+        self.submissions._checkout_assignment = lambda repo_suffix, commit, assignment_code, sparse_paths=None: self.checkouts.append((repo_suffix, commit))
+
+    def result(self, commit, timestamp, valid=True):
+        return {"commitID": commit, "Timestamp GitHub": timestamp, "commitID valid": valid}
+
+    def test_init_uses_stored_results_of_members_not_processed(self):
+        team_records = {"afakestudent": "Team01", "bfakestudent": "Team01", "cfakestudent": "Team02"}
+        team_members = {"Team01": ["afakestudent", "bfakestudent"], "Team02": ["cfakestudent"]}
+        student_aliases = {"afakestudent": "1", "bfakestudent": "2", "cfakestudent": "3"}
+        student_records = {"2": {"T_D1": self.result("bbbb", "2018-10-01 10:00:00")}}
+        student_jobs = [("folder", "1", {}, "afakestudent", "Fakestudent, Alex")]
+
+        team_pending, team_commits = self.submissions._init_team_commits(
+          student_jobs, ["Team01", "Team02"], team_records, team_members, student_aliases, student_records, "T_D1")
+
+        self.assertEqual(team_pending, {"Team01": 1, "Team02": 0})
+        self.assertEqual(team_commits, {"Team01": [("2018-10-01 10:00:00", "bbbb")], "Team02": []})
+
+    def test_add_team_commit_skips_unusable(self):
+        commit_list = []
+        self.submissions._add_team_commit(commit_list, self.result("aaaa", "2018-10-01 10:00:00"))
+        self.submissions._add_team_commit(commit_list, self.result("bbbb", "2018-10-02 10:00:00", valid=False))
+        self.submissions._add_team_commit(commit_list, self.result("cccc", self.submissions.STR_NA))
+        self.submissions._add_team_commit(commit_list, {"commitID": self.submissions.STR_MISSING})
+
+        self.assertEqual(commit_list, [("2018-10-01 10:00:00", "aaaa")])
+
+    def test_resolve_checks_out_most_recent_once(self):
+        commit_list = [("2018-10-01 10:00:00", "aaaa"), ("2018-10-03 10:00:00", "cccc"), ("2018-10-02 10:00:00", "bbbb")]
+
+        self.submissions._resolve_team_commit("Team01", commit_list, "T1", checked_out_commit="aaaa")
+        self.assertEqual(self.checkouts, [("Team01", "cccc")])
+
+        # already on the most recent commit: no second checkout
+        self.submissions._resolve_team_commit("Team01", commit_list, "T1", checked_out_commit="cccc")
+        self.assertEqual(len(self.checkouts), 1)
@@ -0,0 +1,92 @@
+from unittest import TestCase
+
+import io
+
+import progress
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 100.0
+
+    def time(self):
+        return self.now
+
+
+class TestProgressReporter(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.stream = io.StringIO()
+
+    def make_reporter(self, is_tty):
+        return progress.ProgressReporter(label="process_repos", total=10, stream=self.stream, is_tty=is_tty,
+                                         slow_after=5.0, clock=self.clock.time)
+
+    def test_snapshot_rate_and_eta(self):
+        reporter = self.make_reporter(is_tty=False)
+        self.clock.now += 4
+        reporter.advance(2)
+        reporter.add_bytes(2048)
+
+        snapshot = reporter.get_snapshot()
+
+        self.assertEqual(snapshot['processed'], 2)
+        self.assertEqual(snapshot['bytes'], 2048)
+        self.assertAlmostEqual(snapshot['rate'], 0.5)
+        self.assertAlmostEqual(snapshot['eta'], 16.0)
+
+    def test_eta_unknown_before_first_item(self):
+        reporter = self.make_reporter(is_tty=False)
+        self.clock.now += 4
+
+        self.assertIsNone(reporter.get_snapshot()['eta'])
+        self.assertIn("eta=-", reporter.format_line())
+
+    def test_slow_operation_is_shown(self):
+        reporter = self.make_reporter(is_tty=False)
+
+        with reporter.operation("stud1", "clone"):
+            with reporter.operation("stud2", "pull"):
+                self.clock.now += 3
+            self.clock.now += 3
+
+            self.assertIn("slow=stud1:clone:6s", reporter.format_line())
+
+        self.assertIn("slow=-", reporter.format_line())
+
+    def test_tty_renders_single_line(self):
+        reporter = self.make_reporter(is_tty=True)
+        reporter.advance(5)
+        self.clock.now += 10
+        reporter.render()
+        reporter.render()
+        reporter.close()
+
+        output = self.stream.getvalue()
+
+        self.assertEqual(output.count("\n"), 1)
+        self.assertTrue(output.startswith("\rprocess_repos: 5/10 (50%)"))
+
+    def test_structured_lines(self):
+        reporter = self.make_reporter(is_tty=False)
+        reporter.advance()
+        reporter.render()
+        reporter.close()
+
+        lines = self.stream.getvalue().splitlines()
+
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[-1].startswith("process_repos: processed=1 total=10"))
+
+    def test_pause_wipes_and_stops_rendering(self):
+        reporter = self.make_reporter(is_tty=True)
+        reporter.render()
+
+        with reporter.pause():
+            self.stream.truncate(0)
+            self.stream.seek(0)
+            reporter.render()
+            self.assertEqual(self.stream.getvalue(), "", "Nothing may draw over a prompt")
+
+        reporter.render()
+        self.assertTrue(self.stream.getvalue().startswith("\rprocess_repos: 0/10"))
@@ -0,0 +1,83 @@
+from unittest import TestCase
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+try:
+    from urllib.request import urlopen
+    from urllib.error import HTTPError
+except ImportError:  # Python 2
+    from urllib2 import HTTPError, urlopen
+
+import records_server
+
+
+class TestRecordsServer(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.records = {
+          "1": {"name": "Fakestudent, Alex", "gt_id": "afakestudent",
+                "A4": {"commitID": "aaaa", "commitID valid": True, "Submission Time": "Late", "Submission GitHub": "Ok", "Repo Sync": "Ok"},
+                "T_D2": {"commitID": "bbbb", "commitID valid": False, "Repo Sync": "Ok"}},
+          "2": {"name": "Fakestudent, Betty", "gt_id": "bfakestudent",
+                "A4": {"commitID": "Missing", "Repo Sync": "Timeout"},
+                "T_D2": {"commitID": "cccc", "commitID valid": True, "Repo Sync": "Ok"}},
+          "3": {"name": "Fakestudent, Chris", "gt_id": "cfakestudent",
+                "T_D2": {"commitID": "Missing", "Repo Sync": "Ok"}}}
+        self.write("student_records.json", self.records)
+        self.write("student_aliases.json", {"afakestudent": "1", "bfakestudent": "2", "cfakestudent": "3"})
+        self.write("student_records_teams.json", {"afakestudent": "Team01", "bfakestudent": "Team01", "cfakestudent": "Team02"})
+        self.write("student_records_team_members.json", {"Team01": ["afakestudent", "bfakestudent"], "Team02": ["cfakestudent"]})
+
+        self.index = records_server.RecordsIndex(*[os.path.join(self.temp_dir, filename) for filename in [
+          "student_records.json", "student_aliases.json", "student_records_teams.json", "student_records_team_members.json"]])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, filename, data):
+        with open(os.path.join(self.temp_dir, filename), "w") as json_file:
+            json.dump(data, json_file)
+
+    def test_queries(self):
+        self.assertEqual(self.index.list_assignments(), {"A4": 2, "T_D2": 3})
+        self.assertEqual(self.index.get_assignment("A4", "late"), {"afakestudent": ["late", "valid"]})
+        self.assertEqual(self.index.get_assignment("A4", "timeout"), {"bfakestudent": ["missing", "timeout"]})
+
+        student = self.index.get_student("afakestudent", "A4")
+        self.assertEqual((student["team"], list(student["results"]), student["results"]["A4"]["statuses"]), ("Team01", ["A4"], ["late", "valid"]))
+        self.assertIsNone(self.index.get_student("nobody"))
+
+        self.assertEqual(list(self.index.get_teams("T_D2", "no_valid_commit")), ["Team02"])
+        self.assertEqual(self.index.get_teams("T_D2")["Team01"]["statuses"], ["bad_commit", "valid"])
+
+    def test_reload_only_indexes_changed_students(self):
+        self.records["2"]["A4"] = {"commitID": "dddd", "commitID valid": True, "Submission Time": "Late"}
+        self.write("student_records.json", self.records)
+
+        self.assertEqual(self.index.reload(), 1)
+        self.assertEqual(sorted(self.index.get_assignment("A4", "late")), ["afakestudent", "bfakestudent"])
+        self.assertEqual(self.index.get_assignment("A4", "timeout"), {})
+        self.assertEqual(self.index.reload(), 0, "Nothing changed since")
+
+    def test_http(self):
+        server = records_server.make_server(self.index, port=0)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        url = "http://localhost:%d" % server.server_address[1]
+
+        try:
+            body = json.loads(urlopen(url + "/assignments/A4?status=late").read().decode("utf-8"))
+            self.assertEqual(body["students"], {"afakestudent": ["late", "valid"]})
+
+            with self.assertRaises(HTTPError) as context:
+                urlopen(url + "/students/nobody")
+            self.assertEqual(context.exception.code, 404)
+
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
@@ -0,0 +1,98 @@
+from unittest import TestCase
+
+import os
+import shutil
+import subprocess
+import tempfile
+
+import repo_cache
+
+
+class TestRepoCache(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.repo_dir = os.path.join(self.temp_dir, "student_repo")
+        os.makedirs(self.repo_dir)
+
+        self.now = [1000.0]
+        self.cache = repo_cache.RepoCache(self.repo_dir, clock=lambda: self.now[0])
+
+        for name in ["6300Fall18afakestudent", "6300Fall18bfakestudent"]:
+            self.make_repo(name)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def git(self, cwd, *args):
+        subprocess.check_output(("git", "-c", "user.name=TA", "-c", "user.email=ta@example.com") + args,
+                                cwd=cwd, stderr=subprocess.STDOUT)
+
+    def make_repo(self, name):
+        path = os.path.join(self.repo_dir, name)
+        os.makedirs(path)
+        self.git(path, "init", "--quiet")
+        with open(os.path.join(path, "README.md"), "w") as readme:
+            readme.write("x" * 10000)
+        self.git(path, "add", "README.md")
+        self.git(path, "commit", "--quiet", "-m", "A3 submission")
+        self.git(path, "tag", "A3")
+        self.git(path, "remote", "add", "origin", "https://github.gatech.edu/course/%s.git" % name)
+
+    def test_parse_size(self):
+        self.assertEqual(repo_cache.parse_size("1048576"), 1048576)
+        self.assertEqual(repo_cache.parse_size("500M"), 500 * 1024 ** 2)
+        self.assertEqual(repo_cache.parse_size("1.5g"), int(1.5 * 1024 ** 3))
+        self.assertRaises(ValueError, repo_cache.parse_size, "lots")
+
+    def test_evict_and_rehydrate(self):
+        name = "6300Fall18afakestudent"
+
+        self.assertTrue(self.cache.evict(name))
+        self.assertTrue(self.cache.is_evicted(name))
+        self.assertFalse(os.path.isdir(os.path.join(self.repo_dir, name)))
+
+        self.assertTrue(self.cache.rehydrate(name))
+        self.assertFalse(self.cache.is_evicted(name))
+        self.assertFalse(os.path.isfile(self.cache.get_bundle_filename(name)))
+
+        # Tags survive and origin points back at the host
+        path = os.path.join(self.repo_dir, name)
+        self.assertEqual(subprocess.check_output(["git", "tag"], cwd=path).strip(), b"A3")
+        self.assertEqual(subprocess.check_output(["git", "config", "remote.origin.url"], cwd=path).strip(),
+                         b"https://github.gatech.edu/course/6300Fall18afakestudent.git")
+
+    def test_enforce_budget_evicts_least_recently_used(self):
+        self.cache.touch("6300Fall18bfakestudent")
+        self.now[0] += 60
+        self.cache.touch("6300Fall18afakestudent")
+
+        # Both repos do not fit, one does
+        evicted = self.cache.enforce_budget(
+          repo_cache.get_directory_size(os.path.join(self.repo_dir, "6300Fall18afakestudent")) + 5000)
+
+        self.assertEqual(evicted, ["6300Fall18bfakestudent"])
+        self.assertEqual(self.cache.list_repos(), ["6300Fall18afakestudent"])
+
+        # The index is saved for the next run
+        reloaded = repo_cache.RepoCache(self.repo_dir)
+        self.assertEqual(reloaded.get_last_access("6300Fall18afakestudent"), 1060.0)
+        self.assertTrue(reloaded.is_evicted("6300Fall18bfakestudent"))
+
+    def test_enforce_budget_within_budget(self):
+        self.assertEqual(self.cache.enforce_budget(repo_cache.parse_size("1G")), [])
+        self.assertEqual(len(self.cache.list_repos()), 2)
+
+    def test_enforce_budget_counts_worktrees(self):
+        repo_dir = os.path.join(self.repo_dir, "6300Fall18afakestudent")
+        worktree_dir = os.path.join(self.repo_dir, "worktrees", "A3", "6300Fall18afakestudent")
+        self.git(repo_dir, "worktree", "add", "--quiet", "--detach", worktree_dir, "A3")
+        self.cache.touch("6300Fall18afakestudent")
+        self.now[0] += 60
+        self.cache.touch("6300Fall18bfakestudent")
+
+        # Both repos fit, but not with the worktree
+        budget = sum(repo_cache.get_directory_size(os.path.join(self.repo_dir, name)) for name in self.cache.list_repos())
+
+        self.assertEqual(self.cache.enforce_budget(budget + 5000), ["6300Fall18afakestudent"])
+        self.assertFalse(os.path.isdir(worktree_dir))
+
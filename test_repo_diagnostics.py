@@ -0,0 +1,58 @@
+from unittest import TestCase
+
+import os
+import shutil
+import subprocess
+import tempfile
+
+import repo_diagnostics
+
+
+class TestRepoDiagnostics(TestCase):
+    def make_profile(self, name, pack_bytes, last_fetch_seconds=1.0):
+        return repo_diagnostics.RepoProfile(
+          name=name, pack_bytes=pack_bytes, object_count=50, loose_objects=0,
+          worktree_bytes=pack_bytes, last_fetch_seconds=last_fetch_seconds, last_fetch_bytes=None)
+
+    def test_outlier_flagged_against_median(self):
+        profiles = [self.make_profile("6300Fall18student%d" % i, 2 * 1024 ** 2) for i in range(5)]
+        profiles.append(self.make_profile("6300Fall18jars", 300 * 1024 ** 2, last_fetch_seconds=90.0))
+
+        medians, outliers = repo_diagnostics.find_outliers(profiles)
+
+        self.assertEqual(medians["pack_bytes"], 2 * 1024 ** 2)
+        self.assertEqual(sorted(outliers), ["6300Fall18jars"])
+        self.assertEqual(outliers["6300Fall18jars"], ["pack_bytes", "worktree_bytes", "last_fetch_seconds"])
+        self.assertNotIn("last_fetch_bytes", medians, "Metrics nobody has should be skipped")
+
+        report = repo_diagnostics.format_diagnostics(profiles)
+        self.assertIn("OUTLIERS, more than 3x the median (1):", report)
+        self.assertIn("6300Fall18jars: pack_bytes 300.0M (150.0x)", report)
+
+    def test_small_values_never_flagged(self):
+        # 40 loose objects against a median of 0 is not worth reporting
+        profiles = [self.make_profile("6300Fall18student%d" % i, 1024) for i in range(3)]
+        profiles.append(profiles[0]._replace(name="6300Fall18loose", loose_objects=40))
+
+        self.assertEqual(repo_diagnostics.find_outliers(profiles)[1], {})
+
+    def test_profile_repo(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            repo_dir = os.path.join(temp_dir, "6300Fall18afakestudent")
+            os.makedirs(repo_dir)
+            subprocess.check_output(["git", "init", "--quiet"], cwd=repo_dir)
+            with open(os.path.join(repo_dir, "data.csv"), "w") as data_file:
+                data_file.write("1,2,3\n" * 1000)
+            subprocess.check_output(["git", "add", "data.csv"], cwd=repo_dir)
+
+            profile = repo_diagnostics.profile_repo(repo_dir, cache_entry={"last_fetch_seconds": 2.5})
+        finally:
+            shutil.rmtree(temp_dir)
+
+        self.assertEqual(profile.name, "6300Fall18afakestudent")
+        self.assertEqual(profile.loose_objects, 1)
+        self.assertEqual(profile.pack_bytes, 0)
+        self.assertEqual(profile.worktree_bytes, 6000)
+        self.assertEqual(profile.last_fetch_seconds, 2.5)
+        self.assertIsNone(profile.last_fetch_bytes)
@@ -0,0 +1,47 @@
+from unittest import TestCase
+
+import os
+import shutil
+import subprocess
+import tempfile
+
+import repo_tools
+
+
+class TestRepoTools(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def git(self, *args):
+        return subprocess.check_output(["git", "-c", "user.name=s", "-c", "user.email=s@example.com"] + list(args), cwd=self.temp_dir)
+
+    def test_get_commit(self):
+        self.git("init", "--quiet")
+        with open(os.path.join(self.temp_dir, "Main.java"), "wb") as source_file:
+            source_file.write(b"a\n")
+        self.git("add", "-A")
+        self.git("commit", "--quiet", "-m", "A3")
+        self.git("tag", "-a", "-m", "A3", "A3")
+
+        sha = self.git("rev-parse", "HEAD").strip().decode("ascii")
+        self.assertEqual(repo_tools.get_commit(self.temp_dir, "A3"), sha)
+        self.assertIsNone(repo_tools.get_commit(self.temp_dir, "A4"))
+
+        with self.assertRaises(subprocess.CalledProcessError) as context:
+            repo_tools.run_git(self.temp_dir, ["cat-file", "-p", "A4"])
+        self.assertIn(b"A4", context.exception.output)
+
+    def test_template_files_match_git_blobs(self):
+        os.makedirs(os.path.join(self.temp_dir, "src", ".git"))
+        for filename in ("src/Main.java", "src/README", "src/.git/HEAD"):
+            with open(os.path.join(self.temp_dir, filename), "wb") as template_file:
+                template_file.write(b"class Main {}\n")
+
+        files = list(repo_tools.iter_template_files(self.temp_dir, include=lambda filename: filename.endswith(".java")))
+
+        self.assertEqual([path for path, _, _ in files], [os.path.join(self.temp_dir, "src", "Main.java")])
+        self.assertEqual(files[0][2], self.git("hash-object", "src/Main.java").strip().decode("ascii"))
+        self.assertEqual(list(repo_tools.iter_template_files(None)), [])
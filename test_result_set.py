@@ -0,0 +1,54 @@
+from unittest import TestCase
+
+import threading
+
+from result_set import ResultSet
+
+
+class TestResultSet(TestCase):
+    def setUp(self):
+        self.results = ResultSet()
+
+    def test_get_waits_for_pending_student(self):
+        self.results.start({"1": {"gt_id": "afakestudent"}, "2": {"gt_id": "bfakestudent"}}, pending_ids=["2"])
+
+        # not pending: available right away with its earlier results
+        self.assertEqual(self.results.get("1"), {"gt_id": "afakestudent"})
+
+        got = []
+        reader = threading.Thread(target=lambda: got.append(self.results.get("2")))
+        reader.start()
+        reader.join(0.2)
+        self.assertTrue(reader.is_alive(), "get should wait while the student is processed")
+
+        self.results.put("2", {"gt_id": "bfakestudent", "A3": {}})
+        reader.join(5)
+        self.assertEqual(got, [{"gt_id": "bfakestudent", "A3": {}}])
+
+    def test_close_releases_readers(self):
+        self.results.start({}, pending_ids=["3"])
+        self.results.close()
+
+        self.assertIsNone(self.results.get("3"))
+
+    def test_closed_without_records(self):
+        # e.g. process_repos failed before loading the records
+        self.results.close()
+
+        self.assertFalse(self.results.wait_started())
+        self.assertIsNone(self.results.get("1"))
+
+    def test_iter_completed_in_put_order(self):
+        self.results.start({}, pending_ids=["1", "2"])
+        completed = []
+        reader = threading.Thread(target=lambda: completed.extend(self.results.iter_completed()))
+        reader.start()
+
+        self.results.put("2", {"A3": {}})
+        self.results.put("1", {"A3": {}})
+        reader.join(0.2)
+        self.assertTrue(reader.is_alive(), "iter_completed should wait until the set is closed")
+
+        self.results.close()
+        reader.join(5)
+        self.assertEqual([platform_id for platform_id, _ in completed], ["2", "1"])
@@ -0,0 +1,73 @@
+from unittest import TestCase
+
+import json
+import os
+import shutil
+import tempfile
+
+import process_submissions
+import sharding
+
+
+class TestSharding(TestCase):
+    def setUp(self):
+        self.students = ["%sfakestudent" % letter for letter in "abcdefghijklmnop"]
+
+    def test_parse_shard(self):
+        self.assertEqual(sharding.parse_shard("2/4"), (2, 4))
+        self.assertRaises(ValueError, sharding.parse_shard, "0/4")
+        self.assertRaises(ValueError, sharding.parse_shard, "5/4")
+        self.assertRaises(ValueError, sharding.parse_shard, "two")
+
+    def test_shards_partition_students(self):
+        slices = [sharding.filter_shard(self.students, index, 3) for index in range(1, 4)]
+
+        self.assertEqual(sorted(sum(slices, [])), sorted(self.students))
+
+    def test_shard_is_stable(self):
+        # md5 based: must not change between runs or machines
+        self.assertEqual(sharding.get_shard("afakestudent", 4), sharding.get_shard("afakestudent", 4))
+        self.assertEqual([sharding.get_shard(student, 1) for student in self.students], [1] * len(self.students))
+
+    def test_shard_filename(self):
+        self.assertEqual(sharding.get_shard_filename("student_records.json", 2, 4), "student_records.shard2of4.json")
+
+
+class TestMergeShards(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.submissions = process_submissions.Submissions(is_team=False, should_pull_repo_flag=False)
+        self.submissions.STUDENT_RECORDS_FILENAME = os.path.join(self.temp_dir, "student_records.json")
+
+        self.records = {"11111": {"name": "Fakestudent, Alex", "gt_id": "afakestudent"},
+                        "22222": {"name": "Fakestudent, Betty", "gt_id": "bfakestudent"}}
+        self.write(self.submissions.STUDENT_RECORDS_FILENAME, self.records)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, filename, records):
+        with open(filename, 'w') as output_file:
+            json.dump(records, output_file)
+
+    def test_result_taken_from_owning_shard(self):
+        count = 2
+        for index in range(1, count + 1):
+            shard_records = json.loads(json.dumps(self.records))
+            for student in shard_records.values():
+                # every shard has a result for everyone, only the owner's counts
+                student["A3"] = {"shard": index}
+            self.write(sharding.get_shard_filename(self.submissions.STUDENT_RECORDS_FILENAME, index, count), shard_records)
+
+        missing = sharding.merge_shards(self.submissions, "A3", count)
+
+        merged = self.submissions._load_json_file(self.submissions.STUDENT_RECORDS_FILENAME)
+        self.assertEqual(missing, [])
+        for student in merged.values():
+            self.assertEqual(student["A3"]["shard"], sharding.get_shard(student["gt_id"], count))
+
+    def test_missing_shard_reported(self):
+        missing = sharding.merge_shards(self.submissions, "A3", 2)
+
+        self.assertEqual(missing, [1, 2])
+        self.assertEqual(self.submissions._load_json_file(self.submissions.STUDENT_RECORDS_FILENAME), self.records)
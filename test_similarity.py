@@ -0,0 +1,76 @@
+from unittest import TestCase
+
+import os
+import shutil
+import subprocess
+import tempfile
+
+import similarity
+
+
+STARTER = "public class Main {\n    public static void main(String[] args) {\n        System.out.println(\"TODO\");\n    }\n}\n"
+
+SOLUTION = "\n".join("    int step%d(int value) { return value * %d + helper(value, %d); }" % (i, i, i) for i in range(40))
+OTHER_SOLUTION = "\n".join("def transform_%d(items):\n    return [item ** %d for item in items if item > %d]" % (i, i, i) for i in range(40))
+
+
+class TestSimilarity(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.repo_dir = os.path.join(self.temp_dir, "student_repo")
+        self.template_dir = os.path.join(self.temp_dir, "template")
+        self.write(self.template_dir, "src/Main.java", STARTER)
+
+        self.make_repo("6300Fall18afakestudent", {"src/Main.java": STARTER, "src/Solution.java": "class Solution {\n%s\n}" % SOLUTION})
+        # same solution with a renamed comment and one extra method
+        self.make_repo("6300Fall18bfakestudent", {"src/Main.java": STARTER, "src/Solution.java": "// mine\nclass Solution {\n%s\n    int extra() { return 1; }\n}" % SOLUTION})
+        self.make_repo("6300Fall18cfakestudent", {"src/Main.java": STARTER, "solution.py": OTHER_SOLUTION})
+        # only starter code left
+        self.make_repo("6300Fall18dfakestudent", {"src/Main.java": STARTER})
+        self.make_repo("6300Fall18efakestudent", {"src/Main.java": STARTER}, tag=None)
+
+        self.cache = similarity.SignatureCache(os.path.join(self.temp_dir, "similarity_cache.json"))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, directory, path, text):
+        filename = os.path.join(directory, path)
+        if not os.path.isdir(os.path.dirname(filename)):
+            os.makedirs(os.path.dirname(filename))
+        with open(filename, "w") as source_file:
+            source_file.write(text)
+
+    def make_repo(self, name, files, tag="A3"):
+        path = os.path.join(self.repo_dir, name)
+        os.makedirs(path)
+        for filename, text in files.items():
+            self.write(path, filename, text)
+        for args in [["init", "--quiet"], ["add", "-A"], ["commit", "--quiet", "-m", "submission"]] + ([["tag", tag]] if tag else []):
+            subprocess.check_output(["git", "-c", "user.name=s", "-c", "user.email=s@example.com"] + args, cwd=path)
+
+    def test_shingles_ignore_comments_and_whitespace(self):
+        self.assertEqual(similarity.get_shingles("int  x = 1; // note\n"), similarity.get_shingles("int x=1;"))
+
+    def test_finds_copied_pair(self):
+        pairs, skipped = similarity.find_similar_repos(
+          "A3", main_repo_dir=self.repo_dir, template_dir=self.template_dir, cache=self.cache, max_workers=1)
+
+        self.assertEqual([pair[1:] for pair in pairs], [("6300Fall18afakestudent", "6300Fall18bfakestudent")])
+        self.assertGreater(pairs[0][0], 0.8)
+        self.assertEqual(skipped, ["6300Fall18dfakestudent", "6300Fall18efakestudent"])
+
+    def test_signatures_cached_by_commit(self):
+        similarity.find_similar_repos("A3", main_repo_dir=self.repo_dir, template_dir=self.template_dir, cache=self.cache, max_workers=2)
+        self.assertEqual(len(self.cache.entries), 4)
+
+        # a re-run only reads the cache
+        cached = similarity.SignatureCache(self.cache.filename)
+        original = similarity._compute_signature
+        similarity._compute_signature = None
+        try:
+            pairs, _ = similarity.find_similar_repos("A3", main_repo_dir=self.repo_dir, template_dir=self.template_dir, cache=cached, max_workers=1)
+        finally:
+            similarity._compute_signature = original
+
+        self.assertEqual(len(pairs), 1)
@@ -0,0 +1,92 @@
+from unittest import TestCase
+
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+
+import process_submissions
+import submission_source
+
+
+class TestSubmissionSource(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.folder_name = os.path.join(self.temp_dir, "A3")
+        self.zip_filename = self.folder_name + ".zip"
+
+        with zipfile.ZipFile(self.zip_filename, 'w') as zip_file:
+            zip_file.write("testing/A3/fakestudentalex_11111_text.html", "fakestudentalex_11111_text.html")
+            zip_file.writestr("Fakestudent, Betty(22222)/timestamp.txt", "20180224120000000")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_zip_found_next_to_folder_name(self):
+        source, folder_name = submission_source.open_submission_source(self.folder_name)
+
+        self.assertIsInstance(source, submission_source.ZipSource)
+        self.assertEqual(folder_name, self.folder_name)
+        source.close()
+
+    def test_zip_path_is_accepted(self):
+        source, folder_name = submission_source.open_submission_source(self.zip_filename)
+
+        self.assertEqual(folder_name, self.folder_name)
+        source.close()
+
+    def test_missing_source(self):
+        self.assertRaises(IOError, submission_source.open_submission_source, os.path.join(self.temp_dir, "A4"))
+
+    def test_read_member_and_list_folders(self):
+        source, folder_name = submission_source.open_submission_source(self.folder_name)
+
+        with source.open(os.path.join(folder_name, "Fakestudent, Betty(22222)", "timestamp.txt")) as timestamp_file:
+            self.assertEqual(timestamp_file.read(), "20180224120000000")
+
+        self.assertEqual(source.list_folders(folder_name), ["Fakestudent, Betty(22222)"])
+        self.assertRaises(IOError, source.open, os.path.join(folder_name, "missing.html"))
+        source.close()
+
+    def test_threads_read_with_their_own_handle(self):
+        source, _ = submission_source.open_submission_source(self.folder_name)
+        path = os.path.join(self.folder_name, "Fakestudent, Betty(22222)", "timestamp.txt")
+        contents = []
+
+        def read():
+            with source.open(path) as member:
+                contents.append((member.read(), source._get_zip_file()))
+
+        threads = [threading.Thread(target=read) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        source.close()
+
+        self.assertEqual([text for text, _ in contents], ["20180224120000000"] * 2)
+        self.assertNotEqual(contents[0][1], contents[1][1])
+        self.assertTrue(all(zip_file.fp is None for _, zip_file in contents), "close() should close every handle")
+
+    def test_wrapping_folder_is_stripped(self):
+        with zipfile.ZipFile(self.zip_filename, 'w') as zip_file:
+            zip_file.writestr("Assignment 3/name_1_text.html", "text")
+
+        source, folder_name = submission_source.open_submission_source(self.folder_name)
+
+        with source.open(os.path.join(folder_name, "name_1_text.html")) as submission_file:
+            self.assertEqual(submission_file.read(), "text")
+        source.close()
+
+    def test_commit_read_from_zip(self):
+        submissions = process_submissions.Submissions(is_team=False, should_pull_repo_flag=False)
+        submissions.submission_source, folder_name = submission_source.open_submission_source(self.zip_filename)
+        current_assignment = {}
+
+        submissions._check_submission_file(current_assignment, folder_name, "fakestudentalex_11111_text.html",
+                                           "Fakestudent, Alex", "11111")
+        submissions.submission_source.close()
+
+        self.assertEqual(current_assignment['commitID'], 'f556b4ba7e222de302b367b1dceeff89bd233191')
+        self.assertEqual(current_assignment['Timestamp Submission'], submissions.STR_OK)